@@ -1,34 +1,496 @@
+import asyncio
+import functools
+import hmac
+import json
+import threading
+import time
 import uvicorn
-from fastapi import FastAPI
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Union
+from fastapi import FastAPI, Header, HTTPException
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
-from .knowledge_base import KnowledgeBase
-from .llm_handler import LLMHandler
-from .config import API_HOST, API_PORT
+from .query_cache import QueryCache
+from .batching import MicroBatcher
+from .config import (
+    API_HOST, API_PORT, QUERY_BATCH_MAX_SIZE, LLM_BATCH_CONCURRENCY,
+    RETRIEVAL_WORKERS, LLM_MAX_CONCURRENCY, MICRO_BATCH_ENABLED,
+    STORE_WATCH_INTERVAL_SECONDS, ADMIN_TOKEN,
+)
+from .shards import filters_key
+from .store_versions import current_store_path
 
 app = FastAPI(title="MOSDAC AI Help Bot API")
 
-try:
-    kb = KnowledgeBase()
-    llm = LLMHandler()
-except FileNotFoundError as e:
-    print(f"FATAL ERROR: {e}")
-    kb = None
-    llm = None
+# The store generation (knowledge base + micro-batcher) and the LLM are created by
+# the background warm-up (see warm_up below), so the server accepts connections
+# immediately and reports readiness through /readyz instead of blocking at import time.
+generation = None
+llm = None
+startup_status = {"status": "starting", "stage": None, "error": None, "timings_ms": {}}
+
+NOT_READY_MESSAGE = "Backend services are still starting up or failed to start. Check /readyz and the server logs."
+
+# Repeated (or near-identical) questions are answered from here without
+# touching the vector store or the LLM.
+query_cache = QueryCache()
+
+# CPU-bound encoder and FAISS work runs on its own sized pool, so it never queues
+# behind (or blocks) the event loop. LLM calls are awaited on the event loop and
+# capped by a semaphore instead of holding threads.
+retrieval_executor = ThreadPoolExecutor(max_workers=RETRIEVAL_WORKERS, thread_name_prefix="retrieval")
+llm_semaphore = None
+
+class StoreGeneration:
+    """
+    One loaded vector store version together with its micro-batcher. Requests take
+    a lease on the generation that is current when they start and use it until they
+    finish, so a hot-swap never changes the store under a running request. A retired
+    generation is closed once its last lease is returned, on a background thread, so
+    the event loop never waits for it.
+    """
+    def __init__(self, kb):
+        self.kb = kb
+        # Coalesces concurrent single queries into one encoder call and one FAISS search.
+        self.micro_batcher = MicroBatcher(kb, executor=retrieval_executor) if MICRO_BATCH_ENABLED else None
+        self.in_flight = 0
+        self.retired = False
+        self._closing = False
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+            drained = self.retired and self.in_flight == 0
+        if drained:
+            self._start_close()
+
+    def retire(self):
+        with self._lock:
+            self.retired = True
+            drained = self.in_flight == 0
+        if drained:
+            self._start_close()
+
+    def _start_close(self):
+        with self._lock:
+            if self._closing:
+                return
+            self._closing = True
+        threading.Thread(target=self._close, name=f"close-{self.kb.version}", daemon=True).start()
+
+    def _close(self):
+        # Batches already queued still search this store, so they finish before it is closed.
+        if self.micro_batcher is not None:
+            self.micro_batcher.close()
+        self.kb.close()
+        draining_generations.discard(self)
+        print(f"Vector store version {self.kb.version} drained and closed.")
+
+# Guards swapping `generation`, so a lease is never taken on an already retired generation.
+generation_lock = threading.Lock()
+# Serialises reloads (admin endpoint and file watch).
+reload_lock = threading.Lock()
+draining_generations = set()
+store_status = {"last_reload": None, "last_error": None, "failed_path": None}
+
+@contextmanager
+def lease_generation():
+    """Pins the current store generation for the duration of a request."""
+    with generation_lock:
+        gen = generation
+        gen.acquire()
+    try:
+        yield gen
+    finally:
+        gen.release()
+
+def run_warmup_query(kb):
+    """Runs a dummy query through the encoder, the indexes and MMR so the first real one is fast."""
+    # A unique text, so the warm-up really runs the encoder rather than hitting the embedding cache.
+    text = f"MOSDAC warm-up query {time.time_ns()}"
+    kb.search_by_vectors(kb.embed_queries([text]), query_texts=[text])
+
+def reload_store(retry_failed: bool = True) -> bool:
+    """
+    Loads the currently published store version if it differs from the one being
+    served, warms it up, and swaps it in atomically. In-flight requests finish on
+    the old version, which is closed once drained; the query cache is cleared since
+    its answers came from the old version, and the draining version no longer reads
+    from or writes to it.
+
+    Args:
+        retry_failed (bool): Whether to try again a version that failed to load before.
+
+    Returns:
+        bool: True if a new version was swapped in, False if already up to date.
+    """
+    global generation
+    with reload_lock:
+        old = generation
+        path = current_store_path()
+        if path == old.kb.path or (not retry_failed and str(path) == store_status["failed_path"]):
+            return False
+        try:
+            from .knowledge_base import KnowledgeBase
+            # The embedding model is unchanged between versions, so it is shared.
+            new_kb = KnowledgeBase(embeddings=old.kb.embeddings, path=path)
+            run_warmup_query(new_kb)
+        except Exception as e:
+            print(f"ERROR: Could not load vector store version at {path}: {e}")
+            store_status.update(last_error=str(e), failed_path=str(path))
+            return False
+
+        new_generation = StoreGeneration(new_kb)
+        with generation_lock:
+            generation = new_generation
+        query_cache.set_version(new_kb.version)
+        draining_generations.add(old)
+        old.retire()
+        store_status.update(last_reload=time.time(), last_error=None, failed_path=None)
+        print(f"Switched to vector store version {new_kb.version} (was {old.kb.version}).")
+        return True
+
+def watch_store():
+    """Polls the published store version and hot-swaps newer versions in."""
+    while True:
+        time.sleep(STORE_WATCH_INTERVAL_SECONDS)
+        try:
+            reload_store(retry_failed=False)
+        except Exception as e:
+            print(f"ERROR: Vector store watch failed: {e}")
+
+def warm_up():
+    """
+    Loads everything the API needs, one timed stage at a time: the heavy
+    LangChain/torch imports, the embedding model, the vector store, the LLM client,
+    and finally a dummy query that exercises the encoder and the index so the first
+    real request does not pay for lazy initialisation.
+    """
+    global generation, llm
+    timings = startup_status["timings_ms"]
+
+    def stage(name, func):
+        startup_status["stage"] = name
+        start = time.perf_counter()
+        result = func()
+        timings[name] = round((time.perf_counter() - start) * 1000, 1)
+        print(f"Startup: {name} took {timings[name]:.0f} ms")
+        return result
+
+    try:
+        def import_modules():
+            from .embeddings import build_embeddings
+            from .knowledge_base import KnowledgeBase
+            from .llm_handler import LLMHandler
+            return build_embeddings, KnowledgeBase, LLMHandler
+
+        build_embeddings, KnowledgeBase, LLMHandler = stage("imports", import_modules)
+        embeddings = stage("embedding_model", build_embeddings)
+        new_kb = stage("vector_store", lambda: KnowledgeBase(embeddings=embeddings))
+        new_llm = stage("llm_client", LLMHandler)
+        stage("warmup_query", lambda: run_warmup_query(new_kb))
+    except Exception as e:
+        print(f"FATAL ERROR during startup ({startup_status['stage']}): {e}")
+        startup_status.update(status="failed", error=str(e))
+        return
+
+    generation, llm = StoreGeneration(new_kb), new_llm
+    query_cache.set_version(new_kb.version)
+    timings["total"] = round(sum(timings.values()), 1)
+    startup_status.update(status="ready", stage=None)
+    print(f"Startup complete in {timings['total']:.0f} ms; the API is ready to serve queries.")
+    if STORE_WATCH_INTERVAL_SECONDS > 0:
+        threading.Thread(target=watch_store, name="store-watch", daemon=True).start()
+
+@app.on_event("startup")
+async def start_background_warm_up():
+    # Created on the server's event loop (older Pythons bind semaphores to a loop at creation).
+    global llm_semaphore
+    llm_semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+    threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+
+def is_ready() -> bool:
+    return startup_status["status"] == "ready"
+
+def llm_error_answer() -> str:
+    """The user-facing message for a failed LLM call (llm_handler is loaded by warm-up)."""
+    from .llm_handler import ERROR_ANSWER
+    return ERROR_ANSWER
+
+@app.get("/healthz")
+def healthz():
+    """Liveness probe: the process is up and serving HTTP."""
+    return {"status": "ok"}
+
+@app.get("/readyz")
+def readyz():
+    """
+    Readiness probe: 200 once the model and index are loaded and warm, 503 while
+    starting up or after a failed startup. Includes per-stage cold-start timings.
+    """
+    return JSONResponse(status_code=200 if is_ready() else 503, content=startup_status)
+
+async def run_retrieval(gen: StoreGeneration, func, *args, **kwargs):
+    """
+    Runs a blocking embedding/search call on `gen` on the retrieval executor. The call
+    holds a lease of its own until it returns, so a cancelled request that has already
+    given back its lease cannot get the store closed under a search still running.
+    """
+    gen.acquire()
+
+    def call():
+        try:
+            return func(*args, **kwargs)
+        finally:
+            gen.release()
+
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(retrieval_executor, call)
+
+async def retrieve(gen: StoreGeneration, query: str, filters: Optional[dict] = None, scope: str = ""):
+    """
+    Embeds one query and looks it up in the semantic cache, searching only on a
+    miss. Returns (query_vector, context_docs, cached_answer); context_docs is None
+    when a cached answer was found.
+    """
+    lookup = functools.partial(query_cache.get_semantic, version=gen.kb.version, scope=scope)
+    if gen.micro_batcher is not None:
+        return await gen.micro_batcher.aquery(query, filters=filters, lookup=lookup)
+    query_vector = await run_retrieval(gen, gen.kb.embed_query, query)
+    answer = lookup(query_vector)
+    if answer is not None:
+        return query_vector, None, answer
+    context_docs = await run_retrieval(gen, gen.kb.search_by_vector, query_vector, filters=filters, query_text=query)
+    return query_vector, context_docs, None
+
+def cache_answer(gen: StoreGeneration, query: str, query_vector, answer: str, scope: str):
+    """Caches an answer, unless its store version was swapped out while it was generated."""
+    if not gen.retired:
+        query_cache.put(query, query_vector, answer, gen.kb.version, scope=scope)
+
+def cache_scope(filters: Optional[dict]) -> str:
+    """The query cache scope for a set of filters; rejects unsupported filters with a 400."""
+    try:
+        return filters_key(filters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+async def generate_answer(query: str, context_docs: list) -> str:
+    """Calls the LLM asynchronously, waiting for a free slot under LLM_MAX_CONCURRENCY."""
+    async with llm_semaphore:
+        return await llm.agenerate(query, context_docs)
+
+# Metadata filters, e.g. {"content_type": "pdf"} or {"section": ["insat-3d", "faq-page"]}.
+Filters = Optional[Dict[str, Union[str, List[str]]]]
 
 class QueryRequest(BaseModel):
     query: str
+    filters: Filters = None
 
 class QueryResponse(BaseModel):
     answer: str
 
+class BatchQueryRequest(BaseModel):
+    queries: List[str]
+    filters: Filters = None
+
+class BatchQueryItem(BaseModel):
+    answer: Optional[str] = None
+    error: Optional[str] = None
+
+class BatchQueryResponse(BaseModel):
+    results: List[BatchQueryItem]
+
 @app.post("/query", response_model=QueryResponse)
-def handle_query(request: QueryRequest):
-    if not kb or not llm:
-        return {"answer": "Error: Backend services are not initialized. Please check the server logs."}
-    
-    context_docs = kb.query(request.query)
-    answer = llm.get_response(request.query, context_docs)
-    return {"answer": answer}
+async def handle_query(request: QueryRequest):
+    if not is_ready():
+        raise HTTPException(status_code=503, detail=NOT_READY_MESSAGE)
+    scope = cache_scope(request.filters)
+
+    with lease_generation() as gen:
+        answer = query_cache.get_exact(request.query, gen.kb.version, scope=scope)
+        if answer is not None:
+            return {"answer": answer}
+
+        # The query is embedded once and the vector is shared by the semantic cache and retrieval.
+        query_vector, context_docs, answer = await retrieve(gen, request.query, request.filters, scope)
+        if answer is not None:
+            return {"answer": answer}
+
+        try:
+            answer = await generate_answer(request.query, context_docs)
+        except Exception as e:
+            # Catch potential API errors (e.g., rate limits, network issues) from Google AI.
+            # Failures are returned to the user but never cached.
+            print(f"ERROR: An error occurred while calling the Google Gemini API: {e}")
+            return {"answer": llm_error_answer()}
+        cache_answer(gen, request.query, query_vector, answer, scope)
+        return {"answer": answer}
+
+def sse_event(data: dict, event: Optional[str] = None) -> str:
+    """Formats one server-sent event."""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+@app.post("/query/stream")
+async def handle_query_stream(request: QueryRequest):
+    """
+    Streams the answer as server-sent events. Each `data:` event carries a
+    {"token": ...} fragment as soon as Gemini produces it; a final `done` event
+    reports time-to-first-token and total latency in milliseconds, and an
+    `error` event is sent instead if generation fails.
+    """
+    started = time.perf_counter()
+    scope = cache_scope(request.filters)
+
+    async def events():
+        if not is_ready():
+            yield sse_event({"error": NOT_READY_MESSAGE}, event="error")
+            return
+
+        # The lease is held until the stream ends or the client disconnects.
+        with lease_generation() as gen:
+            answer = query_cache.get_exact(request.query, gen.kb.version, scope=scope)
+            if answer is None:
+                query_vector, context_docs, answer = await retrieve(gen, request.query, request.filters, scope)
+            if answer is not None:
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                yield sse_event({"token": answer})
+                yield sse_event({"ttfb_ms": elapsed_ms, "total_ms": elapsed_ms, "cached": True}, event="done")
+                return
+
+            tokens = []
+            ttfb_ms = None
+            try:
+                async with llm_semaphore:
+                    async for token in llm.astream(request.query, context_docs):
+                        if ttfb_ms is None:
+                            ttfb_ms = (time.perf_counter() - started) * 1000
+                        tokens.append(token)
+                        yield sse_event({"token": token})
+            except Exception as e:
+                print(f"ERROR: An error occurred while calling the Google Gemini API: {e}")
+                yield sse_event({"error": llm_error_answer()}, event="error")
+                return
+
+            total_ms = (time.perf_counter() - started) * 1000
+            print(f"Streamed answer: time to first token {ttfb_ms or total_ms:.0f} ms, total {total_ms:.0f} ms.")
+            cache_answer(gen, request.query, query_vector, "".join(tokens), scope)
+            yield sse_event({"ttfb_ms": ttfb_ms or total_ms, "total_ms": total_ms, "cached": False}, event="done")
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.post("/query/batch", response_model=BatchQueryResponse)
+async def handle_batch_query(request: BatchQueryRequest):
+    """
+    Answers many queries at once. All queries that miss the cache are embedded in
+    one encoder call and searched with one FAISS call; the LLM calls then run
+    concurrently (up to LLM_BATCH_CONCURRENCY per batch). Results are returned in
+    input order, and a failing item reports its own error without failing the batch.
+    """
+    if not is_ready():
+        raise HTTPException(status_code=503, detail=NOT_READY_MESSAGE)
+    if len(request.queries) > QUERY_BATCH_MAX_SIZE:
+        raise HTTPException(status_code=413, detail=f"A batch may contain at most {QUERY_BATCH_MAX_SIZE} queries.")
+    scope = cache_scope(request.filters)
+
+    with lease_generation() as gen:
+        queries = request.queries
+        results = [BatchQueryItem() for _ in queries]
+        pending = []
+        for i, query in enumerate(queries):
+            answer = query_cache.get_exact(query, gen.kb.version, scope=scope)
+            if answer is not None:
+                results[i].answer = answer
+            else:
+                pending.append(i)
+        if not pending:
+            return {"results": results}
+
+        query_vectors = await run_retrieval(gen, gen.kb.embed_queries, [queries[i] for i in pending])
+        to_retrieve = []
+        for i, query_vector in zip(pending, query_vectors):
+            answer = query_cache.get_semantic(query_vector, gen.kb.version, scope=scope)
+            if answer is not None:
+                results[i].answer = answer
+            else:
+                to_retrieve.append((i, query_vector))
+        if not to_retrieve:
+            return {"results": results}
+
+        all_context_docs = await run_retrieval(
+            gen, gen.kb.search_by_vectors, [query_vector for _, query_vector in to_retrieve],
+            filters=request.filters, query_texts=[queries[i] for i, _ in to_retrieve],
+        )
+        batch_semaphore = asyncio.Semaphore(LLM_BATCH_CONCURRENCY)
+
+        async def answer_one(i, query_vector, context_docs):
+            async with batch_semaphore:
+                try:
+                    answer = await generate_answer(queries[i], context_docs)
+                except Exception as e:
+                    print(f"ERROR: An error occurred while calling the Google Gemini API: {e}")
+                    results[i].error = llm_error_answer()
+                    return
+            cache_answer(gen, queries[i], query_vector, answer, scope)
+            results[i].answer = answer
+
+        await asyncio.gather(*(
+            answer_one(i, query_vector, context_docs)
+            for (i, query_vector), context_docs in zip(to_retrieve, all_context_docs)
+        ))
+        return {"results": results}
+
+@app.get("/cache/stats")
+def cache_stats():
+    """Hit/miss counters and size of the query answer cache."""
+    return query_cache.get_stats()
+
+@app.get("/batching/stats")
+def batching_stats():
+    """Batch-size histogram of the query micro-batcher."""
+    micro_batcher = generation.micro_batcher if generation is not None else None
+    if micro_batcher is None:
+        return {"enabled": False}
+    return {"enabled": True, **micro_batcher.get_stats()}
+
+@app.post("/admin/reload", status_code=202)
+def admin_reload(x_admin_token: Optional[str] = Header(None)):
+    """
+    Starts loading the currently published vector store version in the background.
+    Queries keep being served from the current version until the new one is warm.
+    Disabled unless ADMIN_TOKEN is set.
+    """
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="The reload endpoint is disabled; set ADMIN_TOKEN to enable it.")
+    if not hmac.compare_digest((x_admin_token or "").encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Invalid admin token.")
+    if not is_ready():
+        raise HTTPException(status_code=503, detail=NOT_READY_MESSAGE)
+    if current_store_path() == generation.kb.path:
+        return {"status": "up_to_date", "version": generation.kb.version}
+    threading.Thread(target=reload_store, name="store-reload", daemon=True).start()
+    return {"status": "reloading", "path": str(current_store_path())}
+
+@app.get("/admin/store")
+def admin_store():
+    """The vector store version being served, and older versions still draining."""
+    if generation is None:
+        return {"version": None, **store_status}
+    return {
+        "version": generation.kb.version,
+        "path": str(generation.kb.path),
+        "in_flight": generation.in_flight,
+        "draining": [{"version": gen.kb.version, "in_flight": gen.in_flight} for gen in list(draining_generations)],
+        "reloading": reload_lock.locked(),
+        **store_status,
+    }
 
 if __name__ == "__main__":
-    uvicorn.run(app, host=API_HOST, port=API_PORT)
\ No newline at end of file
+    uvicorn.run(app, host=API_HOST, port=API_PORT)
@@ -0,0 +1,144 @@
+import asyncio
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future, wait
+from .config import MICRO_BATCH_WINDOW_MS, MICRO_BATCH_MAX_SIZE
+from .shards import filters_key
+
+class _PendingQuery:
+    __slots__ = ("text", "k", "fetch_k", "filters", "lookup", "future")
+
+    def __init__(self, text, k, fetch_k, filters, lookup):
+        self.text = text
+        self.k = k
+        self.fetch_k = fetch_k
+        self.filters = filters
+        self.lookup = lookup
+        self.future = Future()
+
+class MicroBatcher:
+    """
+    Coalesces queries that arrive close together into a single encoder forward pass
+    and a single multi-query FAISS search.
+
+    A background thread waits for the first query, then keeps collecting until
+    `window_ms` has passed or `max_batch_size` queries are waiting, and hands the
+    whole batch to KnowledgeBase.embed_queries / search_by_vectors, on `executor`
+    if given (the API's retrieval pool, so batched and unbatched requests share
+    its RETRIEVAL_WORKERS threads) or else on the collecting thread itself.
+
+    A query may bring a `lookup` callable, which gets its vector once the batch is
+    embedded and returns a cached answer or None (the API's semantic cache); a
+    query with a cached answer is not searched. Each caller gets back its own
+    (query_vector, [(Document, score), ...] or None, cached answer or None)
+    result, either blocking (query) or awaiting (aquery).
+    """
+    def __init__(self, kb, window_ms=MICRO_BATCH_WINDOW_MS, max_batch_size=MICRO_BATCH_MAX_SIZE, executor=None):
+        self.kb = kb
+        self.window = window_ms / 1000
+        self.max_batch_size = max_batch_size
+        self.executor = executor
+        self._queue = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._batch_sizes = Counter()
+        # Batches handed to the executor and not finished yet; close() waits for them.
+        self._running = set()
+        self._running_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, query_text: str, k: int = 4, fetch_k: int = 20, filters: dict = None, lookup=None) -> Future:
+        """Queues a query and returns a Future for its (query_vector, context_docs, cached_answer) result."""
+        pending = _PendingQuery(query_text, k, fetch_k, filters, lookup)
+        self._queue.put(pending)
+        return pending.future
+
+    def query(self, query_text: str, k: int = 4, fetch_k: int = 20, filters: dict = None, lookup=None):
+        """Blocking variant for synchronous callers."""
+        return self.submit(query_text, k=k, fetch_k=fetch_k, filters=filters, lookup=lookup).result()
+
+    async def aquery(self, query_text: str, k: int = 4, fetch_k: int = 20, filters: dict = None, lookup=None):
+        """Awaitable variant for async callers; does not block the event loop."""
+        return await asyncio.wrap_future(self.submit(query_text, k=k, fetch_k=fetch_k, filters=filters, lookup=lookup))
+
+    def _collect_batch(self, first):
+        batch = [first]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                pending = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if pending is None:
+                self._queue.put(None)  # Let the main loop see the shutdown signal.
+                break
+            batch.append(pending)
+        return batch
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = self._collect_batch(first)
+            if self.executor is None:
+                self._process(batch)
+            else:
+                future = self.executor.submit(self._process, batch)
+                with self._running_lock:
+                    self._running.add(future)
+                future.add_done_callback(self._finished)
+
+    def _finished(self, future):
+        with self._running_lock:
+            self._running.discard(future)
+
+    def _process(self, batch):
+        with self._stats_lock:
+            self._batch_sizes[len(batch)] += 1
+        try:
+            query_vectors = self.kb.embed_queries([pending.text for pending in batch])
+            # Queries asking for different k/fetch_k/filters are searched separately.
+            groups = {}
+            for i, pending in enumerate(batch):
+                answer = pending.lookup(query_vectors[i]) if pending.lookup is not None else None
+                if answer is not None:
+                    pending.future.set_result((query_vectors[i], None, answer))
+                    continue
+                groups.setdefault((pending.k, pending.fetch_k, filters_key(pending.filters)), []).append(i)
+            for (k, fetch_k, _), indices in groups.items():
+                all_docs = self.kb.search_by_vectors(
+                    query_vectors[indices], k=k, fetch_k=fetch_k, filters=batch[indices[0]].filters,
+                    query_texts=[batch[i].text for i in indices],
+                )
+                for i, docs in zip(indices, all_docs):
+                    batch[i].future.set_result((query_vectors[i], docs, None))
+        except Exception as e:
+            for pending in batch:
+                if not pending.future.done():
+                    pending.future.set_exception(e)
+
+    def get_stats(self) -> dict:
+        """Number of batches and queries processed, and a histogram of batch sizes."""
+        with self._stats_lock:
+            batches = sum(self._batch_sizes.values())
+            queries = sum(size * count for size, count in self._batch_sizes.items())
+            return {
+                "batches": batches,
+                "queries": queries,
+                "mean_batch_size": queries / batches if batches else 0.0,
+                "batch_size_histogram": {str(size): self._batch_sizes[size] for size in sorted(self._batch_sizes)},
+            }
+
+    def close(self):
+        """Stops collecting queries and waits until every batch queued before has been processed."""
+        self._queue.put(None)
+        self._thread.join()
+        with self._running_lock:
+            running = list(self._running)
+        wait(running)
@@ -0,0 +1,139 @@
+"""
+A sentence- and heading-aware chunker that measures chunks in embedding model tokens.
+
+The character-based RecursiveCharacterTextSplitter produces chunks whose token
+counts vary widely, and anything past the encoder's window (256 tokens for
+all-MiniLM-L6-v2) is silently truncated at embedding time. This chunker:
+
+1. cuts each document into segments at sentence ends and line breaks, marking
+   short unpunctuated lines as headings (only scrapes that keep line breaks have
+   them; flattened PDF text is split on sentences alone),
+2. tokenizes the segments of many documents in one batched call to the model's
+   fast (Rust) tokenizer,
+3. packs whole segments into chunks that fit the window, carrying the last
+   sentences of a chunk over as overlap and starting a new chunk at a heading.
+
+Chunks are contiguous slices of the document text, so their "start_index"
+metadata locates them in the source page.
+"""
+from langchain.docstore.document import Document
+from transformers import AutoTokenizer
+
+try:
+    # Try relative import first (when run as module)
+    from .config import (
+        EMBEDDING_MODEL_NAME, CHUNK_MAX_TOKENS, CHUNK_OVERLAP_TOKENS, CHUNK_MIN_TOKENS, CHUNK_TOKENIZE_BATCH,
+    )
+    from .segments import split_segments
+except ImportError:
+    # Fall back to absolute import (when run directly)
+    from config import (
+        EMBEDDING_MODEL_NAME, CHUNK_MAX_TOKENS, CHUNK_OVERLAP_TOKENS, CHUNK_MIN_TOKENS, CHUNK_TOKENIZE_BATCH,
+    )
+    from segments import split_segments
+
+def load_tokenizer(model_name: str = EMBEDDING_MODEL_NAME):
+    """Loads the fast tokenizer of a sentence-transformers model (short names resolve like the encoder's)."""
+    repo = model_name if "/" in model_name else f"sentence-transformers/{model_name}"
+    return AutoTokenizer.from_pretrained(repo, use_fast=True)
+
+class TokenChunker:
+    """
+    Splits LangChain documents into chunks of at most `max_tokens` model tokens
+    (special tokens included). Drop-in for a LangChain text splitter's
+    split_documents.
+    """
+    def __init__(self, tokenizer=None, max_tokens: int = CHUNK_MAX_TOKENS,
+                 overlap_tokens: int = CHUNK_OVERLAP_TOKENS, min_tokens: int = CHUNK_MIN_TOKENS,
+                 batch_size: int = CHUNK_TOKENIZE_BATCH):
+        self.tokenizer = tokenizer or load_tokenizer()
+        # The encoder adds [CLS] and [SEP]; the text itself gets the rest of the window.
+        self.max_tokens = max_tokens - self.tokenizer.num_special_tokens_to_add(pair=False)
+        self.overlap_tokens = min(overlap_tokens, self.max_tokens // 2)
+        self.min_tokens = min_tokens
+        self.batch_size = batch_size
+
+    def split_documents(self, documents) -> list:
+        documents = list(documents)
+        chunks = []
+        for i in range(0, len(documents), self.batch_size):
+            chunks.extend(self._split_batch(documents[i:i + self.batch_size]))
+        return chunks
+
+    def _split_batch(self, documents):
+        segments = [split_segments(doc.page_content) for doc in documents]
+        texts = [doc.page_content[start:end] for doc, spans in zip(documents, segments) for start, end, _ in spans]
+        if not texts:
+            return []
+        encoded = self.tokenizer(
+            texts, add_special_tokens=False, return_offsets_mapping=True,
+            return_attention_mask=False, return_token_type_ids=False, verbose=False,
+        )
+        offsets = iter(encoded["offset_mapping"])
+        chunks = []
+        for doc, spans in zip(documents, segments):
+            units = []
+            for start, end, heading in spans:
+                units.extend(self._units(start, heading, next(offsets)))
+            chunks.extend(self._pack(doc, units))
+        return chunks
+
+    def _units(self, start, heading, token_offsets):
+        """
+        Turns one segment into (start, end, n_tokens, is_heading) units. A segment
+        longer than the window is cut into window-sized pieces, at word starts
+        where possible.
+        """
+        n = len(token_offsets)
+        if n == 0:
+            return []
+        if n <= self.max_tokens:
+            return [(start + token_offsets[0][0], start + token_offsets[-1][1], n, heading)]
+        units, first = [], 0
+        while first < n:
+            last = min(first + self.max_tokens, n)
+            if last < n:
+                # Back up to a token that follows whitespace, so no word is cut in two.
+                cut = last
+                while cut > first + 1 and token_offsets[cut][0] == token_offsets[cut - 1][1]:
+                    cut -= 1
+                if cut > first + 1:
+                    last = cut
+            units.append((start + token_offsets[first][0], start + token_offsets[last - 1][1], last - first, heading))
+            heading, first = False, last
+        return units
+
+    def _pack(self, doc, units):
+        chunks, current, total = [], [], 0
+        for unit in units:
+            n_tokens, heading = unit[2], unit[3]
+            if current and (total + n_tokens > self.max_tokens or (heading and total >= self.min_tokens)):
+                chunks.append(self._chunk(doc, current))
+                if heading:
+                    # A new section starts clean, without overlap from the previous one.
+                    current, total = [], 0
+                else:
+                    current, total = self._overlap(current, n_tokens)
+            current.append(unit)
+            total += n_tokens
+        if current:
+            chunks.append(self._chunk(doc, current))
+        return chunks
+
+    def _overlap(self, units, next_tokens):
+        """The trailing units of a full chunk that are repeated at the start of the next one."""
+        tail, total = [], 0
+        for unit in reversed(units):
+            if total + unit[2] > self.overlap_tokens or total + unit[2] + next_tokens > self.max_tokens:
+                break
+            tail.append(unit)
+            total += unit[2]
+        return tail[::-1], total
+
+    @staticmethod
+    def _chunk(doc, units):
+        start, end = units[0][0], units[-1][1]
+        return Document(
+            page_content=doc.page_content[start:end],
+            metadata={**doc.metadata, "start_index": start},
+        )
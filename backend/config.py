@@ -1,3 +1,5 @@
+import os
+import sys
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -12,11 +14,188 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # --- Data and Model Paths ---
 MOSDAC_SCRAPER_DIR = BASE_DIR / "mosdac_scraper"
 SCRAPED_DATA_FILE = MOSDAC_SCRAPER_DIR / "scraped_data.jsonl"
+# Gzip shards and manifest written by the scraper's item pipeline (see crawl_output.py).
+CRAWL_OUTPUT_DIR = MOSDAC_SCRAPER_DIR / "crawl_output"
+# What ingestion reads (data_ingestion.py --source): "jsonl" for SCRAPED_DATA_FILE, or
+# "crawl_output" for the last completed crawl in CRAWL_OUTPUT_DIR.
+INGEST_SOURCES = ("jsonl", "crawl_output")
+INGEST_SOURCE = os.getenv("INGEST_SOURCE", "jsonl")
 VECTOR_STORE_PATH = BASE_DIR / "vector_store"
+# Each ingestion run publishes a new version under VECTOR_STORE_PATH/versions/;
+# this many recent versions are kept for rollback and for API processes still
+# serving an older one.
+STORE_VERSIONS_TO_KEEP = 3
 
 # --- Model Configuration ---
 EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2"
 
+# --- Embedding Backend ---
+# How the embedding model is run: "torch" (full-precision PyTorch through
+# sentence-transformers), "onnx" (the same model exported to ONNX and run with ONNX
+# Runtime) or "onnx_int8" (the ONNX export with dynamically quantized int8 weights,
+# the fastest on CPU). Exports are created under ONNX_MODEL_DIR on first use, or with
+# python -m backend.onnx_embeddings export. "torch" and "onnx" produce the same
+# vectors; "onnx_int8" vectors differ slightly, so a store must be rebuilt when
+# switching to or from it, and the API refuses to load one built with the other.
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+ONNX_MODEL_DIR = BASE_DIR / "onnx_models"
+# ONNX Runtime intra-op threads per encoder; 0 lets it use every core.
+ONNX_THREADS = 0
+
+# --- Embedding Cache ---
+# Vectors for texts that were already embedded (chunks on re-ingestion, repeated
+# user queries) are reused from this file. It is shared by ingestion and the API and
+# is capped at EMBEDDING_CACHE_MAX_ENTRIES vectors (least recently used are evicted).
+# Vectors are keyed by model and vector space, so processes running different models or
+# EMBEDDING_BACKENDs share it without mixing vectors.
+EMBEDDING_CACHE_ENABLED = True
+EMBEDDING_CACHE_PATH = Path(os.getenv("EMBEDDING_CACHE_PATH", BASE_DIR / "embedding_cache" / "embeddings.sqlite3"))
+EMBEDDING_CACHE_MAX_ENTRIES = 500_000
+
+# --- Multi-worker Serving ---
+# Load the FAISS index with mmap/read-only flags so the OS shares its pages between
+# uvicorn workers instead of each worker holding a private copy.
+INDEX_MMAP = os.getenv("INDEX_MMAP", "1") == "1"
+# When enabled, API workers do not load the embedding model themselves but send
+# texts to one shared embedding process (python -m backend.embedding_server).
+EMBEDDING_SERVER_ENABLED = os.getenv("EMBEDDING_SERVER_ENABLED", "0") == "1"
+# The server's Unix socket and generated authkey live in EMBEDDING_SERVER_DIR, which the
+# server creates (or fixes up) with mode 0700 so that only its own user can reach them.
+EMBEDDING_SERVER_DIR = Path(os.getenv("EMBEDDING_SERVER_DIR", BASE_DIR / "embedding_server"))
+EMBEDDING_SERVER_ADDRESS = (
+    r"\\.\pipe\mosdac-embeddings" if sys.platform == "win32"
+    else str(EMBEDDING_SERVER_DIR / "embeddings.sock")
+)
+# Connections exchange pickles, so whoever holds the authkey can run code in the server.
+# Set EMBEDDING_SERVER_AUTHKEY to a secret shared by the server and the API, or leave it
+# unset for the server to generate a random key into EMBEDDING_SERVER_AUTHKEY_FILE
+# (mode 0600), which API workers running as the same user read.
+EMBEDDING_SERVER_AUTHKEY = os.getenv("EMBEDDING_SERVER_AUTHKEY")
+EMBEDDING_SERVER_AUTHKEY_FILE = EMBEDDING_SERVER_DIR / "authkey"
+
+# --- Ingestion Configuration ---
+# Chunks are embedded and added to the index in batches, so peak memory depends on
+# the batch rather than the corpus size. A batch is flushed as soon as it reaches
+# either limit.
+INGEST_BATCH_SIZE = 64
+INGEST_MAX_BATCH_MB = 16
+# Number of encoder processes used to embed chunks. 1 embeds in the ingestion process
+# itself; larger values shard each batch across a process pool (one model per worker).
+INGEST_EMBED_WORKERS = 1
+# Number of texts each encoder worker embeds per task when running in parallel.
+EMBED_SHARD_SIZE = 32
+# Documents are split on sentence and line boundaries into chunks of at most
+# CHUNK_MAX_TOKENS tokens, counted with the embedding model's own tokenizer, so the
+# encoder never silently truncates a chunk. Consecutive chunks share up to
+# CHUNK_OVERLAP_TOKENS tokens of whole sentences, and a heading line starts a new
+# chunk once the current one holds CHUNK_MIN_TOKENS. "recursive" restores the
+# previous 800-character splitter. Changing the chunker changes every chunk, so
+# the next incremental run re-embeds the whole corpus.
+CHUNKER = "token"
+CHUNK_MAX_TOKENS = 256    # all-MiniLM-L6-v2's max_seq_length, special tokens included
+CHUNK_OVERLAP_TOKENS = 32
+CHUNK_MIN_TOKENS = 64
+# Documents whose sentences are tokenized together in one batched tokenizer call.
+CHUNK_TOKENIZE_BATCH = 32
+# Near-duplicate chunks (SimHash fingerprints of DEDUPE_SHINGLE_SIZE-word shingles
+# differing in at most DEDUPE_MAX_HAMMING of 64 bits) are embedded once; the kept
+# chunk lists every page it appeared on in its "sources" metadata.
+DEDUPE_ENABLED = True
+DEDUPE_MAX_HAMMING = 3
+DEDUPE_SHINGLE_SIZE = 3
+# FAISS index built by ingestion: "flat" (exact), "ivf_flat", "hnsw" or "ivf_pq".
+# Approximate indexes trade a little recall for much faster search on large corpora.
+INDEX_TYPE = "flat"
+INDEX_PARAMS = {
+    "nlist": 1024,            # IVF: number of k-means cells (clamped for small corpora)
+    "pq_m": 16,               # IVF-PQ: sub-vectors per vector (must divide the embedding size)
+    "pq_nbits": 8,            # IVF-PQ: bits per sub-vector code
+    "hnsw_m": 32,             # HNSW: links per node
+    "ef_construction": 200,   # HNSW: candidate list size while building
+}
+# Number of vectors buffered to train IVF indexes before the rest are streamed in.
+INDEX_TRAIN_SIZE = 50_000
+# Query-time tuning: IVF cells probed per search, HNSW candidate list size.
+INDEX_NPROBE = 16
+INDEX_EF_SEARCH = 64
+# The store is partitioned into one shard per distinct value of these chunk metadata
+# keys ("content_type" = html/pdf, "section" = first URL path segment). Queries that
+# filter on them only search the matching shards. () keeps everything in one shard.
+SHARD_KEYS = ("content_type",)
+# Threads used to search several shards of one query in parallel.
+SHARD_SEARCH_WORKERS = 4
+# When a filter is not a shard key, candidates are checked chunk by chunk, so each
+# shard returns this many times fetch_k candidates to leave enough after filtering.
+FILTER_OVERFETCH = 4
+# Chunk text and metadata are also written to a memory-mapped docstore file, read
+# by position on demand. Records are grouped into blocks of this many chunks,
+# each optionally zlib-compressed ("zlib" or "none").
+DOCSTORE_BLOCK_SIZE = 16
+DOCSTORE_COMPRESSION = "zlib"
+# How often (in seconds) ingestion prints a progress/throughput line.
+INGEST_PROGRESS_INTERVAL = 10
+
+# --- Hybrid Retrieval ---
+# Ingestion also writes a BM25 index (lexical.bin) next to each shard's FAISS index.
+# In "hybrid" mode the KnowledgeBase fuses the BM25 and vector rankings with
+# reciprocal rank fusion, so exact identifiers (INSAT-3DR, SCATSAT-1, HDF5) are
+# found without raising fetch_k; "vector" searches embeddings only. Each shard's BM25
+# statistics (IDF, average length) cover that shard alone, so every shard's BM25
+# ranking is fused by rank on its own rather than merged with the others by score.
+RETRIEVAL_MODE = "hybrid"
+BM25_K1 = 1.5
+BM25_B = 0.75
+# Reciprocal rank fusion constant: larger values flatten the influence of top ranks.
+HYBRID_RRF_K = 60
+
+# --- Context Packing ---
+# Retrieved chunks are packed into at most CONTEXT_TOKEN_BUDGET tokens of prompt
+# context: overlapping or adjacent chunks of the same page are merged, sentences
+# already included are dropped and passages are ordered by retrieval score. Tokens
+# are estimated as CONTEXT_CHARS_PER_TOKEN characters each (about right for Gemini
+# on English text), so packing needs no API call. Disabled, every chunk is sent in full.
+CONTEXT_PACKING_ENABLED = True
+CONTEXT_TOKEN_BUDGET = 1500
+CONTEXT_CHARS_PER_TOKEN = 4
+
+# --- Query Cache ---
+# Answers are cached per normalized query (exact tier) and reused for new queries
+# whose embedding has at least this cosine similarity to a cached one (semantic tier).
+QUERY_CACHE_MAX_ENTRIES = 1000
+QUERY_CACHE_TTL_SECONDS = 3600
+QUERY_CACHE_SEMANTIC_THRESHOLD = 0.95
+
+# --- Batch Queries ---
+# Maximum number of queries accepted by one POST /query/batch request, and how many
+# of their LLM calls may be in flight at the same time.
+QUERY_BATCH_MAX_SIZE = 500
+LLM_BATCH_CONCURRENCY = 8
+
+# --- Request Concurrency ---
+# Embedding and FAISS searches run on a dedicated thread pool of this size, separate
+# from the event loop and from the LLM calls.
+RETRIEVAL_WORKERS = 4
+# Maximum number of LLM calls in flight across all requests. Further requests wait
+# (without holding a thread) until a slot frees up.
+LLM_MAX_CONCURRENCY = 64
+
+# --- Micro-batching ---
+# Concurrent /query requests arriving within MICRO_BATCH_WINDOW_MS of each other
+# (up to MICRO_BATCH_MAX_SIZE) share one encoder forward pass and one FAISS search.
+# Batches run on the RETRIEVAL_WORKERS pool, and queries answered by the semantic
+# query cache after the forward pass are left out of the search.
+MICRO_BATCH_ENABLED = True
+MICRO_BATCH_WINDOW_MS = 3
+MICRO_BATCH_MAX_SIZE = 32
+
+# --- Store Hot-swap ---
+# The API checks the published store version this often and swaps a newer one in
+# without a restart (0 disables the watch; POST /admin/reload still works).
+STORE_WATCH_INTERVAL_SECONDS = 10
+# POST /admin/reload requires this value in the X-Admin-Token header; while it is
+# not set, the endpoint is disabled (the file watch still picks up new versions).
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
 # --- API Configuration ---
 API_HOST = "127.0.0.1"
 API_PORT = 8000
\ No newline at end of file
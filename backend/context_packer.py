@@ -0,0 +1,168 @@
+"""
+Packs retrieved chunks into a token-budgeted prompt context for the LLM.
+
+Retrieval returns whole chunks, and neighbouring chunks of the same page share
+their overlap, so concatenating them sends the same sentences to the model
+several times. The packer:
+
+1. merges chunks of the same source that overlap or touch, located by their
+   "start_index" metadata, or by matching text for stores built before chunks
+   recorded their position,
+2. drops sentences already included in a higher-scored passage,
+3. orders passages by their best retrieval score and adds them until the token
+   budget is spent, cutting the last one at a sentence boundary.
+
+Token counts are estimated from character counts, so packing needs no call to
+the model's tokenizer API.
+"""
+import re
+from .segments import split_segments
+from .config import CONTEXT_TOKEN_BUDGET, CONTEXT_CHARS_PER_TOKEN
+
+PASSAGE_SEPARATOR = "\n\n---\n\n"
+# Chunks of one page separated by at most this many characters (the whitespace
+# between two sentences) are adjacent.
+_ADJACENT_GAP = 3
+# Shortest shared text that counts as overlap when chunks have no start_index.
+_MIN_TEXT_OVERLAP = 20
+# Sentences shorter than this many words ("Yes.", headings) are never dropped as redundant.
+_MIN_REDUNDANT_WORDS = 3
+# A passage that does not fit is only cut down if at least this many tokens remain.
+_MIN_PARTIAL_TOKENS = 40
+_NON_WORD = re.compile(r"\W+")
+
+def estimate_tokens(text: str, chars_per_token: int = CONTEXT_CHARS_PER_TOKEN) -> int:
+    return -(-len(text) // chars_per_token)
+
+def format_passage(metadata: dict, content: str) -> str:
+    """Formats one passage with its source and title, as the prompt expects."""
+    return f"Source: {metadata.get('source', 'N/A')} (Title: {metadata.get('title', 'No Title')})\nContent: {content}"
+
+def format_unpacked(docs_with_scores: list) -> str:
+    """Concatenates every retrieved chunk in full, in retrieval order (packing disabled)."""
+    return PASSAGE_SEPARATOR.join(format_passage(doc.metadata, doc.page_content) for doc, _ in docs_with_scores)
+
+def _text_overlap(first: str, second: str) -> int:
+    """Length of the longest suffix of `first` that is a prefix of `second` (0 if too short)."""
+    for length in range(min(len(first), len(second)), _MIN_TEXT_OVERLAP - 1, -1):
+        if first.endswith(second[:length]):
+            return length
+    return 0
+
+def _merge_source(chunks: list) -> list:
+    """
+    Merges the (doc, score) chunks of one source into passages.
+
+    Returns:
+        list: {"metadata", "text", "score"} passages, each scored with the best
+        score of the chunks merged into it.
+    """
+    located = sorted((c for c in chunks if "start_index" in c[0].metadata), key=lambda c: c[0].metadata["start_index"])
+    passages = []
+    for doc, score in located:
+        start = doc.metadata["start_index"]
+        end = start + len(doc.page_content)
+        last = passages[-1] if passages else None
+        if last is not None and start <= last["end"] + _ADJACENT_GAP:
+            if end > last["end"]:
+                new_text = doc.page_content[max(0, last["end"] - start):]
+                last["text"] += (" " if start > last["end"] else "") + new_text
+                last["end"] = end
+            last["score"] = max(last["score"], score)
+        else:
+            passages.append({"metadata": doc.metadata, "text": doc.page_content, "score": score, "end": end})
+
+    for doc, score in (c for c in chunks if "start_index" not in c[0].metadata):
+        for passage in passages:
+            text = doc.page_content
+            if text in passage["text"]:
+                break
+            overlap = _text_overlap(passage["text"], text)
+            if overlap:
+                passage["text"] += text[overlap:]
+                break
+            overlap = _text_overlap(text, passage["text"])
+            if overlap:
+                passage["text"] = text + passage["text"][overlap:]
+                break
+        else:
+            passages.append({"metadata": doc.metadata, "text": doc.page_content, "score": score, "end": None})
+            continue
+        passage["score"] = max(passage["score"], score)
+    return passages
+
+def _sentence_key(sentence: str) -> str:
+    return _NON_WORD.sub(" ", sentence.lower()).strip()
+
+def _sentence_keys(text: str):
+    """Yields (sentence, key) for the sentences of `text`; key is None for sentences too short to drop."""
+    for start, end, _ in split_segments(text):
+        sentence = text[start:end].strip()
+        key = _sentence_key(sentence)
+        yield sentence, key if len(key.split()) >= _MIN_REDUNDANT_WORDS else None
+
+def _drop_seen_sentences(text: str, seen: set) -> tuple:
+    """Removes the sentences of `text` whose key is in `seen`. Returns (text, dropped count)."""
+    kept, dropped = [], 0
+    for sentence, key in _sentence_keys(text):
+        if key is not None and key in seen:
+            dropped += 1
+        else:
+            kept.append(sentence)
+    return (text if not dropped else " ".join(kept)), dropped
+
+def _truncate(text: str, max_tokens: int) -> str:
+    """The longest run of leading sentences of `text` within `max_tokens`, or a hard cut if none fits."""
+    end = 0
+    for _, segment_end, _ in split_segments(text):
+        if estimate_tokens(text[:segment_end].rstrip()) > max_tokens:
+            break
+        end = segment_end
+    return text[:end].rstrip() if end else text[:max_tokens * CONTEXT_CHARS_PER_TOKEN]
+
+def pack_context(docs_with_scores: list, budget_tokens: int = CONTEXT_TOKEN_BUDGET) -> tuple:
+    """
+    Packs retrieved (Document, score) tuples, score higher-is-better, into a
+    prompt context of at most `budget_tokens` estimated tokens.
+
+    Returns:
+        tuple: (context string, stats dict with the number of chunks, passages
+        and dropped sentences, and the estimated tokens of the packed and of the
+        unpacked context).
+    """
+    by_source = {}
+    for doc, score in docs_with_scores:
+        by_source.setdefault(doc.metadata.get("source", "N/A"), []).append((doc, score))
+    passages = [passage for chunks in by_source.values() for passage in _merge_source(chunks)]
+    passages.sort(key=lambda passage: passage["score"], reverse=True)
+
+    parts, used, seen, dropped = [], 0, set(), 0
+    separator_tokens = estimate_tokens(PASSAGE_SEPARATOR)
+    for passage in passages:
+        text, n_dropped = _drop_seen_sentences(passage["text"], seen)
+        dropped += n_dropped
+        if not text:
+            continue
+        part = format_passage(passage["metadata"], text)
+        cost = estimate_tokens(part) + (separator_tokens if parts else 0)
+        if used + cost > budget_tokens:
+            remaining = budget_tokens - used - (cost - estimate_tokens(text))
+            if parts and remaining < _MIN_PARTIAL_TOKENS:
+                continue
+            # The best passage is always included, if only in part.
+            text = _truncate(text, max(remaining, _MIN_PARTIAL_TOKENS))
+            part = format_passage(passage["metadata"], text)
+            cost = estimate_tokens(part) + (separator_tokens if parts else 0)
+        parts.append(part)
+        used += cost
+        seen.update(key for _, key in _sentence_keys(text) if key is not None)
+
+    context = PASSAGE_SEPARATOR.join(parts)
+    stats = {
+        "chunks": len(docs_with_scores),
+        "passages": len(parts),
+        "dropped_sentences": dropped,
+        "unpacked_tokens": estimate_tokens(format_unpacked(docs_with_scores)),
+        "context_tokens": estimate_tokens(context),
+    }
+    return context, stats
@@ -0,0 +1,165 @@
+"""
+Sharded, compressed crawl output.
+
+The scraper's CrawlOutputPipeline writes every crawl into a new run directory
+of gzip-compressed JSON Lines shards listed in a manifest:
+
+    crawl_output/
+        CURRENT
+        runs/
+            20250101-120000-000000/
+                manifest.json
+                part-00000.jsonl.gz
+                part-00001.jsonl.gz
+                ...
+
+Each record is an item of scraped_data.jsonl (url, title, content_type,
+content), or one chunk of an item (plus its "start_index") when the crawl
+chunked them; the manifest's "chunker" then records the chunking settings.
+A shard is written under a temporary name and only listed in the manifest,
+which is replaced atomically, once it is complete. A crawl that finishes is
+published by atomically replacing the CURRENT pointer file, like the vector
+store versions (see store_versions.py); an interrupted one stays unpublished.
+Readers resolve the run once, so a new crawl never changes or deletes the
+files of the run they are reading, and ingestion only reads a run that is not
+complete (e.g. one still running) when asked to explicitly.
+"""
+import gzip
+import json
+import os
+import shutil
+import time
+from datetime import datetime
+from pathlib import Path
+
+MANIFEST_FILE = "manifest.json"
+CURRENT_FILE = "CURRENT"
+RUNS_DIR = "runs"
+# Runs kept besides running crawls, so a reader of the previous crawl can finish.
+_RUNS_TO_KEEP = 2
+_SHARD_NAME = "part-{:05d}.jsonl.gz"
+_PARTIAL_SUFFIX = ".partial"
+
+def is_crawl_output(path) -> bool:
+    """Whether `path` is a crawl output directory (rather than a JSON Lines file)."""
+    return (Path(path) / MANIFEST_FILE).is_file()
+
+def crawl_output_path(directory, partial=False):
+    """
+    Returns the run to read from the crawl output `directory`: the last published
+    (complete) crawl, or with `partial` the newest crawl even if it has not
+    finished. Returns None if there is no such run.
+    """
+    directory = Path(directory)
+    if partial and (directory / RUNS_DIR).is_dir():
+        runs = [run for run in sorted((directory / RUNS_DIR).iterdir()) if is_crawl_output(run)]
+        if runs:
+            return runs[-1]
+    pointer = directory / CURRENT_FILE
+    if not pointer.exists():
+        return None
+    return directory / RUNS_DIR / pointer.read_text(encoding="utf-8").strip()
+
+def load_manifest(directory):
+    """Returns the manifest of a crawl output directory, or None if there is none."""
+    manifest_file = Path(directory) / MANIFEST_FILE
+    if not manifest_file.exists():
+        return None
+    with open(manifest_file, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def iter_records(directory):
+    """Yields the records of every complete shard of a crawl output directory, one line at a time."""
+    directory = Path(directory)
+    manifest = load_manifest(directory)
+    if manifest is None:
+        raise FileNotFoundError(f"No crawl output manifest found in {directory}.")
+    for shard in manifest["shards"]:
+        with gzip.open(directory / shard["file"], 'rt', encoding='utf-8') as f:
+            for line in f:
+                yield json.loads(line)
+
+class CrawlOutputWriter:
+    """
+    Writes records into a new run under the crawl output directory `base`, in
+    rotating gzip shards of at most `max_records` records or `max_mb` megabytes of
+    uncompressed JSON, whichever limit is reached first. The run replaces the
+    previously published crawl only once publish() is called.
+    """
+    def __init__(self, base, max_records=10_000, max_mb=32, chunker=None, compresslevel=6):
+        self.base = Path(base)
+        self.directory = self.base / RUNS_DIR / datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        self.max_records = max_records
+        self.max_bytes = max_mb * 1024 * 1024
+        self.compresslevel = compresslevel
+        self.directory.mkdir(parents=True)
+        self.manifest = {
+            "started": time.time(),
+            "complete": False,
+            "chunker": chunker,
+            "records": 0,
+            "duplicates": 0,
+            "shards": [],
+        }
+        self._file = None
+        self._records = self._bytes = 0
+        self._save_manifest()
+
+    def write(self, record: dict):
+        if self._file is None:
+            self._open_shard()
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        self._file.write(line)
+        self._records += 1
+        self._bytes += len(line.encode("utf-8"))
+        if self._records >= self.max_records or self._bytes >= self.max_bytes:
+            self._close_shard()
+
+    def close(self, duplicates: int = 0):
+        """Completes the last shard. The run stays unpublished (and incomplete) until publish()."""
+        self._close_shard()
+        self.manifest["duplicates"] = duplicates
+        self._save_manifest()
+
+    def publish(self):
+        """Marks the run as complete, makes it the current crawl and prunes old runs."""
+        self.manifest["complete"] = True
+        self.manifest["finished"] = time.time()
+        self._save_manifest()
+        tmp_pointer = self.base / (CURRENT_FILE + ".tmp")
+        tmp_pointer.write_text(self.directory.name, encoding="utf-8")
+        os.replace(tmp_pointer, self.base / CURRENT_FILE)
+        # Runs newer than this one belong to crawls still running.
+        older = [run for run in sorted((self.base / RUNS_DIR).iterdir()) if run.name < self.directory.name]
+        for run in older[:max(0, len(older) - (_RUNS_TO_KEEP - 1))]:
+            shutil.rmtree(run, ignore_errors=True)
+
+    def _shard_path(self):
+        return self.directory / _SHARD_NAME.format(len(self.manifest["shards"]))
+
+    def _open_shard(self):
+        partial = self._shard_path().with_name(self._shard_path().name + _PARTIAL_SUFFIX)
+        self._file = gzip.open(partial, 'wt', encoding='utf-8', compresslevel=self.compresslevel)
+        self._records = self._bytes = 0
+
+    def _close_shard(self):
+        if self._file is None:
+            return
+        self._file.close()
+        self._file = None
+        path = self._shard_path()
+        path.with_name(path.name + _PARTIAL_SUFFIX).replace(path)
+        self.manifest["shards"].append({
+            "file": path.name,
+            "records": self._records,
+            "bytes": path.stat().st_size,
+            "raw_bytes": self._bytes,
+        })
+        self.manifest["records"] += self._records
+        self._save_manifest()
+
+    def _save_manifest(self):
+        tmp_path = self.directory / (MANIFEST_FILE + ".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(tmp_path, self.directory / MANIFEST_FILE)
@@ -1,70 +1,668 @@
+import argparse
+import functools
+import hashlib
 import json
+import shutil
+import time
+import faiss
+import numpy as np
 from langchain.docstore.document import Document
 from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_community.docstore.in_memory import InMemoryDocstore
 from langchain_community.vectorstores import FAISS
-from langchain_community.embeddings import HuggingFaceEmbeddings
 
 try:
     # Try relative import first (when run as module)
-    from .config import SCRAPED_DATA_FILE, VECTOR_STORE_PATH, EMBEDDING_MODEL_NAME
+    from .config import (
+        SCRAPED_DATA_FILE, CRAWL_OUTPUT_DIR, INGEST_SOURCE, INGEST_SOURCES, VECTOR_STORE_PATH, EMBEDDING_MODEL_NAME, EMBEDDING_BACKEND,
+        INGEST_BATCH_SIZE, INGEST_MAX_BATCH_MB, INGEST_PROGRESS_INTERVAL,
+        INGEST_EMBED_WORKERS, INDEX_TYPE, INDEX_PARAMS, INDEX_TRAIN_SIZE, SHARD_KEYS,
+        DEDUPE_ENABLED, CHUNKER, CHUNK_MAX_TOKENS, CHUNK_OVERLAP_TOKENS, CHUNK_MIN_TOKENS, CHUNK_TOKENIZE_BATCH,
+    )
+    from .chunking import TokenChunker
+    from .crawl_output import crawl_output_path, is_crawl_output, iter_records, load_manifest
+    from .dedupe import NearDuplicateIndex
+    from .docstore import DOCSTORE_FILE, write_docstore_from_vector_store
+    from .embeddings import build_embeddings, embedding_space
+    from .lexical_index import LEXICAL_INDEX_FILE, write_lexical_index_from_vector_store
+    from .shards import FILTER_KEYS, SHARDS_DIR, url_section, shard_values, shard_name, save_shard_list, load_shard_list
+    from .store_versions import (
+        current_store_path, new_version_path, publish_version, prune_versions, discard_version, link_files,
+    )
+    from .index_factory import (
+        INDEX_TYPES, create_index, min_training_size, delete_from_vector_store,
+        save_index_meta,
+    )
 except ImportError:
     # Fall back to absolute import (when run directly)
-    from config import SCRAPED_DATA_FILE, VECTOR_STORE_PATH, EMBEDDING_MODEL_NAME
+    from config import (
+        SCRAPED_DATA_FILE, CRAWL_OUTPUT_DIR, INGEST_SOURCE, INGEST_SOURCES, VECTOR_STORE_PATH, EMBEDDING_MODEL_NAME, EMBEDDING_BACKEND,
+        INGEST_BATCH_SIZE, INGEST_MAX_BATCH_MB, INGEST_PROGRESS_INTERVAL,
+        INGEST_EMBED_WORKERS, INDEX_TYPE, INDEX_PARAMS, INDEX_TRAIN_SIZE, SHARD_KEYS,
+        DEDUPE_ENABLED, CHUNKER, CHUNK_MAX_TOKENS, CHUNK_OVERLAP_TOKENS, CHUNK_MIN_TOKENS, CHUNK_TOKENIZE_BATCH,
+    )
+    from chunking import TokenChunker
+    from crawl_output import crawl_output_path, is_crawl_output, iter_records, load_manifest
+    from dedupe import NearDuplicateIndex
+    from docstore import DOCSTORE_FILE, write_docstore_from_vector_store
+    from embeddings import build_embeddings, embedding_space
+    from lexical_index import LEXICAL_INDEX_FILE, write_lexical_index_from_vector_store
+    from shards import FILTER_KEYS, SHARDS_DIR, url_section, shard_values, shard_name, save_shard_list, load_shard_list
+    from store_versions import (
+        current_store_path, new_version_path, publish_version, prune_versions, discard_version, link_files,
+    )
+    from index_factory import (
+        INDEX_TYPES, create_index, min_training_size, delete_from_vector_store,
+        save_index_meta,
+    )
 
-def load_docs_from_jsonl(file_path):
-    """Loads documents from a JSON Lines file."""
-    documents = []
+# The manifest records which chunks (by content hash) each source URL contributed
+# to a saved vector store, so a later run can work out what actually changed.
+MANIFEST_FILE = "manifest.json"
+# Directory inside a version being built where the chunks are spooled, one file per shard.
+SPOOL_DIR = ".spool"
+
+def _iter_jsonl_records(file_path):
     with open(file_path, 'r', encoding='utf-8') as f:
         for line in f:
-            data = json.loads(line)
-            doc = Document(
-                page_content=data.get("content", ""),
-                metadata={
-                    "source": data.get("url", ""),
-                    "title": data.get("title", "No Title"),
-                }
-            )
-            if doc.page_content:
-                documents.append(doc)
-    return documents
+            yield json.loads(line)
 
-def create_and_save_vector_store():
+def iter_docs_from_jsonl(file_path):
     """
-    Loads data from the scraped JSONL, creates embeddings using an improved
-    chunking strategy, and saves them to a FAISS vector store.
+    Yields documents one record at a time from a JSON Lines file, or from the gzip
+    shards of a crawl output directory (see crawl_output.py). Chunks written by a
+    chunking crawl keep their "start_index" in the page.
+    """
+    records = iter_records(file_path) if is_crawl_output(file_path) else _iter_jsonl_records(file_path)
+    for data in records:
+        url = data.get("url", "")
+        doc = Document(
+            page_content=data.get("content", ""),
+            metadata={
+                "source": url,
+                "title": data.get("title", "No Title"),
+                # Older scrapes did not record a content type; PDFs are recognisable by their URL.
+                "content_type": data.get("content_type") or ("pdf" if url.lower().endswith(".pdf") else "html"),
+                "section": url_section(url),
+            }
+        )
+        if "start_index" in data:
+            doc.metadata["start_index"] = data["start_index"]
+        if doc.page_content:
+            yield doc
+
+def load_docs_from_jsonl(file_path):
+    """Loads documents from a JSON Lines file or a crawl output directory."""
+    return list(iter_docs_from_jsonl(file_path))
+
+def scraped_data_source(source=INGEST_SOURCE, allow_partial=False):
     """
-    print(f"Loading documents from {SCRAPED_DATA_FILE}...")
-    if not SCRAPED_DATA_FILE.exists():
+    Returns the path of the scraped data to ingest: SCRAPED_DATA_FILE for the
+    "jsonl" `source`, or for "crawl_output" the last completed crawl in
+    CRAWL_OUTPUT_DIR. With `allow_partial`, the newest crawl is taken even if it
+    is still running or was interrupted.
+    """
+    if source == "jsonl":
+        return SCRAPED_DATA_FILE
+    if source != "crawl_output":
+        raise ValueError(f"Unknown ingestion source '{source}'; expected one of {INGEST_SOURCES}.")
+    path = crawl_output_path(CRAWL_OUTPUT_DIR, partial=allow_partial)
+    if path is None:
         raise FileNotFoundError(
-            f"Scraped data file not found at {SCRAPED_DATA_FILE}. "
+            f"No {'' if allow_partial else 'completed '}crawl output found in {CRAWL_OUTPUT_DIR}. "
             "Please run the scraper first."
         )
-    documents = load_docs_from_jsonl(SCRAPED_DATA_FILE)
-    print(f"Loaded {len(documents)} documents from the website.")
+    return path
 
+def make_text_splitter(chunker=CHUNKER):
+    """Returns a new splitter for `chunker`; threads chunking in parallel each use their own."""
+    if chunker == "token":
+        # Sentence-aware chunks sized in model tokens to fit the encoder's window.
+        return TokenChunker()
+    if chunker != "recursive":
+        raise ValueError(f"Unknown chunker '{chunker}'. Expected 'token' or 'recursive'.")
     # --- IMPROVEMENT: More effective chunking strategy ---
     # A smaller chunk size ensures each vector represents a more specific topic.
     # A small overlap helps maintain context between chunks so sentences aren't cut in half.
-    text_splitter = RecursiveCharacterTextSplitter(
+    return RecursiveCharacterTextSplitter(
         chunk_size=800,
         chunk_overlap=100,
         length_function=len,
         is_separator_regex=False,
     )
-    split_docs = text_splitter.split_documents(documents)
-    print(f"Split documents into {len(split_docs)} more focused chunks.")
 
-    if not split_docs:
+@functools.lru_cache(maxsize=None)
+def _get_text_splitter(chunker=CHUNKER):
+    return make_text_splitter(chunker)
+
+def chunker_settings():
+    """
+    The settings that determine how documents are chunked. A crawl that chunks its
+    items records them, and its chunks are only reused while they still match.
+    """
+    settings = {"chunker": CHUNKER, "embedding_model": EMBEDDING_MODEL_NAME}
+    if CHUNKER == "token":
+        settings.update(max_tokens=CHUNK_MAX_TOKENS, overlap_tokens=CHUNK_OVERLAP_TOKENS, min_tokens=CHUNK_MIN_TOKENS)
+    return settings
+
+def iter_chunks(documents, text_splitter, batch_size=CHUNK_TOKENIZE_BATCH):
+    """
+    Splits documents a few at a time (so the token chunker can tokenize them in
+    one batch), yielding their chunks as they are produced.
+    """
+    batch = []
+    for doc in documents:
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            yield from text_splitter.split_documents(batch)
+            batch = []
+    if batch:
+        yield from text_splitter.split_documents(batch)
+
+def iter_batches(chunks, batch_size=INGEST_BATCH_SIZE, max_batch_mb=INGEST_MAX_BATCH_MB):
+    """
+    Groups chunks into lists of at most `batch_size` items and roughly
+    `max_batch_mb` megabytes of text, whichever limit is reached first.
+    """
+    max_batch_bytes = max_batch_mb * 1024 * 1024
+    batch, batch_bytes = [], 0
+    for chunk in chunks:
+        batch.append(chunk)
+        batch_bytes += len(chunk.page_content.encode("utf-8"))
+        if len(batch) >= batch_size or batch_bytes >= max_batch_bytes:
+            yield batch
+            batch, batch_bytes = [], 0
+    if batch:
+        yield batch
+
+def _chunk_id(doc):
+    """
+    Returns a stable ID for a chunk, derived from its source URL and content.
+    The same text on the same page always hashes to the same ID, so unchanged
+    chunks can be recognised (and their vectors reused) across runs.
+    """
+    key = f"{doc.metadata.get('source', '')}\n{doc.page_content}"
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+def _load_manifest(store_path):
+    manifest_file = store_path / MANIFEST_FILE
+    if not manifest_file.exists():
+        return None
+    with open(manifest_file, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def _save_manifest(store_path, chunk_ids_by_source):
+    manifest = {
+        "embedding_model": EMBEDDING_MODEL_NAME,
+        "sources": {source: list(ids) for source, ids in chunk_ids_by_source.items()},
+    }
+    with open(store_path / MANIFEST_FILE, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+
+def _is_prechunked(source):
+    """Whether `source` holds chunks made with the current chunker settings."""
+    return is_crawl_output(source) and load_manifest(source)["chunker"] == chunker_settings()
+
+def _is_partial(source):
+    """Whether `source` is a crawl output that is not complete (still running or interrupted)."""
+    return is_crawl_output(source) and not load_manifest(source)["complete"]
+
+def _check_source(source):
+    """Fails early if `source` does not exist, and reports how a crawl output will be read."""
+    if not source.exists():
+        raise FileNotFoundError(
+            f"Scraped data file not found at {source}. "
+            "Please run the scraper first."
+        )
+    if is_crawl_output(source):
+        manifest = load_manifest(source)
+        if not manifest["complete"]:
+            print(f"This crawl has not finished; ingesting the {len(manifest['shards'])} shards written so far.")
+        if manifest["chunker"] is not None and not _is_prechunked(source):
+            print("The crawl chunked its items with different chunker settings. Re-chunking them; "
+                  "crawl again to chunk the pages themselves.")
+
+def _iter_scraped_chunks(source):
+    """Chunks the scraped documents in `source`."""
+    docs = iter_docs_from_jsonl(source)
+    if _is_prechunked(source):
+        # Chunked by the crawl already.
+        return docs
+    return iter_chunks(docs, _get_text_splitter())
+
+def _spool_shards(source, shard_keys, spool_dir):
+    """
+    Reads and chunks `source` once, writing every chunk to the JSON Lines spool file
+    of its shard in `spool_dir`, so each shard is then built from its own chunks
+    without another pass over the whole source.
+
+    Returns:
+        dict: {shard name: (shard key values, spool file)} in order of appearance.
+    """
+    print(f"Streaming documents from {source}...")
+    spool_dir.mkdir(parents=True, exist_ok=True)
+    shards, files = {}, {}
+    try:
+        for chunk in _iter_scraped_chunks(source):
+            values = shard_values(chunk.metadata, shard_keys)
+            name = shard_name(values)
+            f = files.get(name)
+            if f is None:
+                path = spool_dir / f"{name}.jsonl"
+                shards[name] = (values, path)
+                f = files[name] = open(path, 'w', encoding='utf-8')
+            f.write(json.dumps({"content": chunk.page_content, "metadata": chunk.metadata}, ensure_ascii=False) + "\n")
+    finally:
+        for f in files.values():
+            f.close()
+    return shards
+
+def _iter_spooled_chunks(path):
+    for record in _iter_jsonl_records(path):
+        yield Document(page_content=record["content"], metadata=record["metadata"])
+
+def _create_trained_store(embeddings, index_type, buffered):
+    """
+    Creates a LangChain FAISS store around a new index of `index_type`, trains the
+    index on the buffered vectors if it needs training, and adds them.
+    """
+    vectors = np.asarray([vector for batch in buffered for vector in batch[3]], dtype=np.float32)
+    if len(vectors) < min_training_size(index_type, INDEX_PARAMS):
+        print(f"Only {len(vectors)} chunks, too few to train a '{index_type}' index. Using a flat index instead.")
+        index_type = "flat"
+    index = create_index(index_type, vectors.shape[1], INDEX_PARAMS, n_train=len(vectors))
+    if not index.is_trained:
+        print(f"Training the '{index_type}' index on {len(vectors)} vectors...")
+        index.train(vectors)
+
+    vector_store = FAISS(
+        embedding_function=embeddings,
+        index=index,
+        docstore=InMemoryDocstore(),
+        index_to_docstore_id={},
+    )
+    for ids, texts, metadatas, batch_vectors in buffered:
+        vector_store.add_embeddings(list(zip(texts, batch_vectors)), metadatas=metadatas, ids=ids)
+    return vector_store
+
+def _stream_into_vector_store(chunks, embeddings, vector_store=None, known_ids=frozenset(),
+                              batch_size=INGEST_BATCH_SIZE, index_type=INDEX_TYPE, dedupe=DEDUPE_ENABLED):
+    """
+    Drives the read -> chunk -> dedupe -> embed -> index pipeline batch by batch.
+
+    Chunks whose ID is in `known_ids` are already in `vector_store` and are only
+    recorded, not embedded again. With `dedupe`, a chunk that is a near-duplicate
+    of an earlier one is not embedded at all: its page is recorded against the
+    earlier (canonical) chunk, whose "sources" metadata lists every page of the
+    cluster. Only one batch of chunks and vectors is held in memory at any time,
+    except that a new index needing training (IVF types) first buffers up to
+    INDEX_TRAIN_SIZE vectors to train on.
+
+    Returns:
+        tuple: (vector_store, {source: {chunk_id: None}}, number of chunks embedded,
+                number of near-duplicate chunks collapsed)
+    """
+    chunk_ids_by_source = {}
+    duplicates = NearDuplicateIndex() if dedupe else None
+    cluster_sources = {}  # canonical chunk_id -> further sources of its near-duplicates
+    embedded = 0
+    started = last_report = time.perf_counter()
+    needs_training = index_type in ("ivf_flat", "ivf_pq")
+    buffered, buffered_count = [], 0
+
+    def new_chunks():
+        for chunk in chunks:
+            chunk_id = _chunk_id(chunk)
+            source = chunk.metadata.get("source", "")
+            source_ids = chunk_ids_by_source.setdefault(source, {})
+            if chunk_id in source_ids:
+                continue  # The same text repeated on one page only needs one vector.
+            if duplicates is not None:
+                canonical_id = duplicates.add(chunk_id, chunk.page_content)
+                if canonical_id != chunk_id:
+                    source_ids[canonical_id] = None
+                    cluster_sources.setdefault(canonical_id, []).append(source)
+                    continue
+            source_ids[chunk_id] = None
+            if chunk_id not in known_ids:
+                yield chunk_id, chunk
+
+    for batch in iter_batches(new_chunks(), batch_size=batch_size):
+        ids = [chunk_id for chunk_id, _ in batch]
+        texts = [chunk.page_content for _, chunk in batch]
+        metadatas = [chunk.metadata for _, chunk in batch]
+        vectors = embeddings.embed_documents(texts)
+        if vector_store is None:
+            buffered.append((ids, texts, metadatas, vectors))
+            buffered_count += len(batch)
+            if not needs_training or buffered_count >= INDEX_TRAIN_SIZE:
+                vector_store = _create_trained_store(embeddings, index_type, buffered)
+                buffered = []
+        else:
+            vector_store.add_embeddings(list(zip(texts, vectors)), metadatas=metadatas, ids=ids)
+        embedded += len(batch)
+
+        now = time.perf_counter()
+        if now - last_report >= INGEST_PROGRESS_INTERVAL:
+            print(f"  ... {embedded} chunks embedded ({embedded / (now - started):.1f} chunks/sec)")
+            last_report = now
+
+    if vector_store is None and buffered:
+        # The whole corpus fit in the training buffer.
+        vector_store = _create_trained_store(embeddings, index_type, buffered)
+
+    if vector_store is not None and duplicates is not None:
+        _set_cluster_sources(vector_store, cluster_sources)
+
+    elapsed = time.perf_counter() - started
+    if embedded:
+        print(f"Embedded {embedded} chunks in {elapsed:.1f}s ({embedded / elapsed:.1f} chunks/sec).")
+    if duplicates is not None and duplicates.duplicates:
+        print(f"Collapsed {duplicates.duplicates} of {duplicates.seen} chunks as near-duplicates "
+              f"({duplicates.ratio:.1%}).")
+    return vector_store, chunk_ids_by_source, embedded, (duplicates.duplicates if duplicates else 0)
+
+def _set_cluster_sources(vector_store, cluster_sources):
+    """
+    Records on every stored chunk the pages it stands for: its own source plus those
+    of the near-duplicates collapsed onto it in this run (reused chunks included,
+    since their clusters can change between runs).
+    """
+    for doc_id in vector_store.index_to_docstore_id.values():
+        doc = vector_store.docstore.search(doc_id)
+        sources = [doc.metadata.get("source", "")] + cluster_sources.get(doc_id, [])
+        doc.metadata["sources"] = list(dict.fromkeys(sources))
+
+def _write_store(vector_store, index_type, chunk_ids_by_source, store_path):
+    """Writes one complete store (index, docstore, BM25 index, metadata and manifest) into `store_path`."""
+    store_path.mkdir(parents=True, exist_ok=True)
+    # index.pkl keeps the editable docstore for incremental runs; the API serves
+    # chunk text from the memory-mapped docstore.bin instead.
+    vector_store.save_local(str(store_path))
+    write_docstore_from_vector_store(vector_store, store_path / DOCSTORE_FILE)
+    # BM25 postings for hybrid search, rebuilt in full because deletions renumber positions.
+    write_lexical_index_from_vector_store(vector_store, store_path / LEXICAL_INDEX_FILE)
+    # Record what was actually built (small corpora fall back to a flat index).
+    saved_type = "flat" if isinstance(vector_store.index, faiss.IndexFlat) else index_type
+    save_index_meta(store_path, saved_type, INDEX_PARAMS, EMBEDDING_MODEL_NAME, EMBEDDING_BACKEND)
+    _save_manifest(store_path, chunk_ids_by_source)
+
+def _build_shard(embeddings, batch_size, index_type, chunks, shard_path, old_path=None):
+    """
+    Builds one shard from `chunks` into `shard_path`. With `old_path` (the same
+    shard in the previous version), only new or changed chunks are embedded, stale
+    ones are deleted, and an unchanged shard is hard-linked instead of rewritten.
+
+    Returns:
+        dict: Counts of chunks 'added', 'removed', 'reused' and collapsed as
+              'duplicates', the shard's total number of 'chunks' (0 if it ended up
+              empty and was not written), and whether it was 'rewritten'.
+    """
+    vector_store, known_ids = None, frozenset()
+    if old_path is not None:
+        old_manifest = _load_manifest(old_path)
+        known_ids = {chunk_id for ids in old_manifest["sources"].values() for chunk_id in ids}
+        vector_store = FAISS.load_local(
+            str(old_path),
+            embeddings,
+            allow_dangerous_deserialization=True
+        )
+
+    vector_store, chunk_ids_by_source, embedded, duplicates = _stream_into_vector_store(
+        chunks, embeddings, vector_store=vector_store,
+        known_ids=known_ids, batch_size=batch_size, index_type=index_type,
+    )
+    new_ids = {chunk_id for ids in chunk_ids_by_source.values() for chunk_id in ids}
+    ids_to_remove = list(known_ids - new_ids)
+    report = {
+        "added": embedded,
+        "removed": len(ids_to_remove),
+        "reused": len(known_ids & new_ids),
+        "duplicates": duplicates,
+        "chunks": len(new_ids),
+        "rewritten": False,
+    }
+    if not new_ids:
+        return report
+    # Pages can also just move between near-duplicate clusters, which changes the
+    # chunks' "sources" without adding or removing any chunk.
+    sources_unchanged = old_path is not None and {
+        source: list(ids) for source, ids in chunk_ids_by_source.items()
+    } == old_manifest["sources"]
+    if sources_unchanged and not embedded and not ids_to_remove:
+        link_files(old_path, shard_path)
+        return report
+
+    if ids_to_remove:
+        print(f"Deleting {len(ids_to_remove)} stale chunks from the shard...")
+        delete_from_vector_store(vector_store, ids_to_remove)
+    _write_store(vector_store, index_type, chunk_ids_by_source, shard_path)
+    report["rewritten"] = True
+    return report
+
+def _build_shards(embeddings, batch_size, index_type, source, shard_keys, store_path, old_shards=None):
+    """
+    Builds every shard of a new store version from `source` into `store_path` and writes its
+    shard list. The source is read once, spooling each shard's chunks (see _spool_shards).
+    Shards present in `old_shards` ({name: directory of the previous build}) are
+    updated incrementally; the others are built from scratch.
+
+    Returns:
+        tuple: ({'added', 'removed', 'reused', 'duplicates'} counts over all shards,
+                list of shard infos, whether anything differs from `old_shards`)
+    """
+    old_shards = old_shards or {}
+    totals = {"added": 0, "removed": 0, "reused": 0, "duplicates": 0}
+    built = []
+    changed = False
+    spool_dir = store_path / SPOOL_DIR
+    try:
+        shards = _spool_shards(source, shard_keys, spool_dir)
+        for name, (values, spool_path) in shards.items():
+            print(f"Building shard '{name}'...")
+            report = _build_shard(
+                embeddings, batch_size, index_type, _iter_spooled_chunks(spool_path),
+                store_path / SHARDS_DIR / name, old_path=old_shards.get(name),
+            )
+            spool_path.unlink()
+            for key in totals:
+                totals[key] += report[key]
+            changed = changed or report["rewritten"]
+            if report["chunks"]:
+                built.append({"name": name, **values, "chunks": report["chunks"]})
+                print(f"Shard '{name}': {report['chunks']} chunks "
+                      f"({report['added']} added, {report['removed']} removed, {report['reused']} reused, "
+                      f"{report['duplicates']} near-duplicates collapsed).")
+    finally:
+        shutil.rmtree(spool_dir, ignore_errors=True)
+    # Shards whose documents all disappeared are dropped as a whole.
+    for name, old_path in old_shards.items():
+        if name not in shards:
+            totals["removed"] += len({
+                chunk_id for ids in _load_manifest(old_path)["sources"].values() for chunk_id in ids
+            })
+    changed = changed or {shard["name"] for shard in built} != set(old_shards)
+    save_shard_list(store_path, shard_keys, index_type, EMBEDDING_MODEL_NAME, EMBEDDING_BACKEND, built)
+    return totals, built, changed
+
+def _open_embeddings(workers):
+    """Returns (embeddings, batch_size) for the given number of encoder workers."""
+    if workers > 1:
+        print(f"Embedding with {workers} parallel encoder processes.")
+    # Give every worker a full batch of its own, otherwise the pool mostly idles.
+    # Ingestion always encodes locally, even when the API uses the shared embedding server.
+    return build_embeddings(workers=workers, remote=False), INGEST_BATCH_SIZE * max(1, workers)
+
+def _close_embeddings(embeddings):
+    close = getattr(embeddings, "close", None)
+    if close is not None:
+        close()
+
+def create_and_save_vector_store(workers=INGEST_EMBED_WORKERS, index_type=INDEX_TYPE, shard_keys=SHARD_KEYS,
+                                 source=INGEST_SOURCE, allow_partial=False):
+    """
+    Loads the scraped data from `source` (see scraped_data_source), creates embeddings using an improved
+    chunking strategy, and saves them to a FAISS vector store.
+
+    Documents are streamed through chunking and embedding in fixed-size batches
+    (see INGEST_BATCH_SIZE / INGEST_MAX_BATCH_MB), so memory use does not grow
+    with the size of the scraped corpus. With `workers` > 1 each batch is
+    embedded by a pool of encoder processes. `index_type` selects the FAISS
+    index (see INDEX_TYPES), which is recorded next to the index for the
+    KnowledgeBase to pick up. The store is partitioned into one shard per
+    distinct value of the `shard_keys` metadata (see SHARD_KEYS). A crawl output
+    that has not finished is only ingested with `allow_partial`.
+    """
+    return _build_full(scraped_data_source(source, allow_partial), workers, index_type, shard_keys)
+
+def _build_full(path, workers, index_type, shard_keys):
+    """Builds and publishes a new store version from scratch from the scraped data at `path`."""
+    print(f"Creating embeddings for all chunks into a '{index_type}' index (this may take a while)...")
+    _check_source(path)
+    store_path = new_version_path(VECTOR_STORE_PATH)
+    embeddings, batch_size = _open_embeddings(workers)
+    try:
+        report, built, _ = _build_shards(embeddings, batch_size, index_type, path, shard_keys, store_path)
+    except BaseException:
+        discard_version(store_path)
+        raise
+    finally:
+        _close_embeddings(embeddings)
+
+    if not built:
+        discard_version(store_path)
         raise ValueError("No chunks were created. Check if the scraped data file is empty or content is too short.")
 
-    print("Creating embeddings for all chunks (this may take a while)...")
-    embeddings = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL_NAME)
-    
-    print("Creating and saving the FAISS vector store...")
-    vector_store = FAISS.from_documents(split_docs, embeddings)
-    VECTOR_STORE_PATH.mkdir(exist_ok=True)
-    vector_store.save_local(str(VECTOR_STORE_PATH))
-    print(f"Vector store successfully created and saved at {VECTOR_STORE_PATH}")
+    _publish(store_path)
+    print(f"Vector store successfully created and saved at {store_path} ({len(built)} shards)")
+    if report["duplicates"]:
+        print(f"Near-duplicate chunks collapsed: {report['duplicates']} "
+              f"({report['duplicates'] / (report['added'] + report['duplicates']):.1%} of all chunks).")
+    return {"added": report["added"], "removed": 0, "reused": 0, "duplicates": report["duplicates"]}
+
+def update_vector_store(workers=INGEST_EMBED_WORKERS, index_type=INDEX_TYPE, shard_keys=SHARD_KEYS,
+                        source=INGEST_SOURCE):
+    """
+    Incrementally brings the saved FAISS vector store in line with the scraped data.
+
+    Chunks are identified by a content hash and tracked per source URL in a manifest
+    per shard. Only new or changed chunks are embedded, vectors of chunks that
+    disappeared are deleted, and everything else is reused as-is; shards without
+    any change are carried over to the new version untouched. Falls back to a full
+    rebuild when there is no usable store yet, or the embedding model, index type,
+    shard keys or the embedding backend's vectors have changed. Never reads a crawl
+    that has not finished, whose missing pages would be deleted from the store.
+
+    Returns:
+        dict: Counts of chunks that were 'added', 'removed', 'reused' and
+              collapsed as near-'duplicates'.
+    """
+    path = scraped_data_source(source)
+    if _is_partial(path):
+        raise ValueError(f"{path} is an unfinished crawl; an incremental update would delete every page "
+                         "it has not reached yet. Wait for the crawl to finish.")
+    old_path = current_store_path(VECTOR_STORE_PATH)
+    shard_list = load_shard_list(old_path)
+    if shard_list is None:
+        print("No existing sharded vector store found. Performing a full build.")
+        return _build_full(path, workers, index_type, shard_keys)
+    if shard_list.get("embedding_model") != EMBEDDING_MODEL_NAME:
+        print("Embedding model has changed since the last build. Performing a full build.")
+        return _build_full(path, workers, index_type, shard_keys)
+    # Stores built before the backend was recorded were built with torch.
+    old_backend = shard_list.get("embedding_backend", "torch")
+    if embedding_space(old_backend) != embedding_space(EMBEDDING_BACKEND):
+        print(f"Embedding backend has changed from '{old_backend}' to '{EMBEDDING_BACKEND}', whose vectors "
+              "are not interchangeable. Performing a full build.")
+        return _build_full(path, workers, index_type, shard_keys)
+    if shard_list["index_type"] != index_type:
+        print(f"Index type has changed from '{shard_list['index_type']}' to '{index_type}'. Performing a full build.")
+        return _build_full(path, workers, index_type, shard_keys)
+    if tuple(shard_list["shard_keys"]) != tuple(shard_keys):
+        print(f"Shard keys have changed from {shard_list['shard_keys']} to {list(shard_keys)}. Performing a full build.")
+        return _build_full(path, workers, index_type, shard_keys)
+
+    # Shards without a manifest cannot be diffed and are rebuilt from scratch.
+    old_shards = {
+        shard["name"]: old_path / SHARDS_DIR / shard["name"] for shard in shard_list["shards"]
+        if (old_path / SHARDS_DIR / shard["name"] / MANIFEST_FILE).exists()
+    }
+    _check_source(path)
+    store_path = new_version_path(VECTOR_STORE_PATH)
+    embeddings, batch_size = _open_embeddings(workers)
+    try:
+        print("Embedding new or changed chunks...")
+        report, built, changed = _build_shards(
+            embeddings, batch_size, index_type, path, shard_keys, store_path, old_shards=old_shards
+        )
+    except BaseException:
+        discard_version(store_path)
+        raise
+    finally:
+        _close_embeddings(embeddings)
+
+    if not changed:
+        discard_version(store_path)
+        print(f"Vector store is already up to date ({report['reused']} chunks reused).")
+        return report
+
+    # The updated store is published as a new version; the previous one stays
+    # untouched until it is pruned, so a running API can keep serving it.
+    _publish(store_path)
+    print(
+        f"Vector store updated at {store_path}: "
+        f"{report['added']} added, {report['removed']} removed, {report['reused']} reused, "
+        f"{report['duplicates']} near-duplicates collapsed."
+    )
+    return report
+
+def _publish(store_path):
+    publish_version(store_path, VECTOR_STORE_PATH)
+    prune_versions(VECTOR_STORE_PATH)
 
 if __name__ == "__main__":
-    create_and_save_vector_store()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Build the MOSDAC FAISS vector store.")
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only embed new or changed chunks and publish the result as a new store version.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=INGEST_EMBED_WORKERS,
+        help="Number of encoder processes to embed chunks with (default: %(default)s).",
+    )
+    parser.add_argument(
+        "--index-type",
+        choices=INDEX_TYPES,
+        default=INDEX_TYPE,
+        help="FAISS index to build (default: %(default)s).",
+    )
+    parser.add_argument(
+        "--shard-keys",
+        nargs="*",
+        choices=FILTER_KEYS,
+        default=list(SHARD_KEYS),
+        help="Chunk metadata to partition the store by; none for a single shard (default: %(default)s).",
+    )
+    parser.add_argument(
+        "--source",
+        choices=INGEST_SOURCES,
+        default=INGEST_SOURCE,
+        help="Scraped data to ingest: scraped_data.jsonl or the last completed crawl output (default: %(default)s).",
+    )
+    parser.add_argument(
+        "--allow-partial",
+        action="store_true",
+        help="Ingest the newest crawl output even if the crawl has not finished (full builds only).",
+    )
+    args = parser.parse_args()
+    if args.allow_partial and args.incremental:
+        parser.error("--allow-partial cannot be combined with --incremental.")
+    shard_keys = tuple(args.shard_keys)
+    if args.incremental:
+        update_vector_store(workers=args.workers, index_type=args.index_type, shard_keys=shard_keys, source=args.source)
+    else:
+        create_and_save_vector_store(workers=args.workers, index_type=args.index_type, shard_keys=shard_keys,
+                                     source=args.source, allow_partial=args.allow_partial)
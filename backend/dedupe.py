@@ -0,0 +1,76 @@
+"""
+Near-duplicate chunk detection for ingestion, based on SimHash.
+
+Each chunk gets a 64-bit SimHash fingerprint of its word shingles. Chunks whose
+fingerprints differ in at most `max_hamming` bits are near-duplicates (repeated
+boilerplate, the same PDF published twice, re-crawled pages with a changed date).
+Candidates are found with the pigeonhole trick: the fingerprint is cut into
+max_hamming + 1 bands, and two fingerprints within the distance must agree
+exactly on at least one band, so only chunks sharing a band are compared.
+"""
+import hashlib
+import re
+import numpy as np
+
+try:
+    # Try relative import first (when run as module)
+    from .config import DEDUPE_MAX_HAMMING, DEDUPE_SHINGLE_SIZE
+except ImportError:
+    # Fall back to absolute import (when run directly)
+    from config import DEDUPE_MAX_HAMMING, DEDUPE_SHINGLE_SIZE
+
+_WORD_PATTERN = re.compile(r"\w+")
+
+def simhash(text: str, shingle_size: int = DEDUPE_SHINGLE_SIZE) -> int:
+    """Returns the 64-bit SimHash of the lowercased word shingles of `text`."""
+    words = _WORD_PATTERN.findall(text.lower())
+    if len(words) <= shingle_size:
+        shingles = [" ".join(words)]
+    else:
+        shingles = [" ".join(words[i:i + shingle_size]) for i in range(len(words) - shingle_size + 1)]
+    hashes = np.frombuffer(
+        b"".join(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest() for shingle in shingles),
+        dtype=np.uint8,
+    )
+    # Every fingerprint bit is set where the majority of shingle hashes have it set.
+    bit_counts = np.unpackbits(hashes).reshape(len(shingles), 64).sum(axis=0)
+    bits = (bit_counts * 2 > len(shingles)).astype(np.uint8)
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+class NearDuplicateIndex:
+    """
+    Collapses near-duplicate chunks onto the first one seen (the canonical chunk).
+
+    Usage: call add(chunk_id, text) for every chunk in a stable order; it returns
+    the chunk's own ID if it is new, or the canonical chunk's ID if it duplicates
+    one seen before.
+    """
+    def __init__(self, max_hamming: int = DEDUPE_MAX_HAMMING, shingle_size: int = DEDUPE_SHINGLE_SIZE):
+        self.max_hamming = max_hamming
+        self.shingle_size = shingle_size
+        n_bands = max_hamming + 1
+        width = 64 // n_bands
+        # (shift, mask) per band; the last band takes the remaining bits.
+        self._bands = [
+            (i * width, (1 << (width if i < n_bands - 1 else 64 - i * width)) - 1) for i in range(n_bands)
+        ]
+        self._buckets = [{} for _ in self._bands]  # band value -> [(fingerprint, chunk_id), ...]
+        self.seen = 0
+        self.duplicates = 0
+
+    def add(self, chunk_id: str, text: str) -> str:
+        self.seen += 1
+        fingerprint = simhash(text, self.shingle_size)
+        for (shift, mask), buckets in zip(self._bands, self._buckets):
+            for other, other_id in buckets.get((fingerprint >> shift) & mask, ()):
+                if bin(fingerprint ^ other).count("1") <= self.max_hamming:
+                    self.duplicates += 1
+                    return other_id
+        for (shift, mask), buckets in zip(self._bands, self._buckets):
+            buckets.setdefault((fingerprint >> shift) & mask, []).append((fingerprint, chunk_id))
+        return chunk_id
+
+    @property
+    def ratio(self) -> float:
+        """Share of the chunks seen that were near-duplicates."""
+        return self.duplicates / self.seen if self.seen else 0.0
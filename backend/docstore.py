@@ -0,0 +1,165 @@
+"""
+A compact, memory-mapped document store for the chunks behind a FAISS index.
+
+File layout (all integers little-endian):
+
+    header   magic "MOSDOCS1", u32 format version, u32 compression flag,
+             u64 record count, u32 records per block, u64 offset table position
+    blocks   records grouped into blocks; each block is a JSON array of
+             {"id", "text", "metadata"} objects, zlib-compressed if enabled
+    offsets  (n_blocks + 1) u64 file offsets, so block b spans offsets[b]:offsets[b+1]
+
+Record i is the chunk stored at position i of the FAISS index. The file is opened
+with mmap, so only the blocks that are actually read are paged in, and those pages
+are shared between every process serving the same vector store.
+"""
+import argparse
+import json
+import mmap
+import pickle
+import struct
+import zlib
+from functools import lru_cache
+from pathlib import Path
+import numpy as np
+from langchain.docstore.document import Document
+
+try:
+    # Try relative import first (when run as module)
+    from .config import DOCSTORE_BLOCK_SIZE, DOCSTORE_COMPRESSION
+    from .shards import store_dirs
+    from .store_versions import current_store_path
+except ImportError:
+    # Fall back to absolute import (when run directly)
+    from config import DOCSTORE_BLOCK_SIZE, DOCSTORE_COMPRESSION
+    from shards import store_dirs
+    from store_versions import current_store_path
+
+DOCSTORE_FILE = "docstore.bin"
+_MAGIC = b"MOSDOCS1"
+_FORMAT_VERSION = 1
+_HEADER = struct.Struct("<8sIIQIQ")
+# Decompressed blocks kept per open docstore; a query touches at most fetch_k blocks.
+_BLOCK_CACHE_SIZE = 256
+
+def write_docstore(path, records, compression=DOCSTORE_COMPRESSION, block_size=DOCSTORE_BLOCK_SIZE):
+    """
+    Writes (doc_id, Document) pairs, in FAISS position order, to a docstore file.
+    The file is written next to its final location and moved into place when
+    complete, so readers never see a partial file.
+
+    Returns:
+        int: The number of records written.
+    """
+    path = Path(path)
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    compress = compression == "zlib"
+    offsets, count, block = [], 0, []
+
+    with open(tmp_path, "wb") as f:
+        f.write(b"\0" * _HEADER.size)
+
+        def flush_block():
+            data = json.dumps(block, ensure_ascii=False).encode("utf-8")
+            offsets.append(f.tell())
+            f.write(zlib.compress(data) if compress else data)
+            block.clear()
+
+        for doc_id, doc in records:
+            block.append({"id": doc_id, "text": doc.page_content, "metadata": doc.metadata})
+            count += 1
+            if len(block) >= block_size:
+                flush_block()
+        if block:
+            flush_block()
+        offsets.append(f.tell())
+
+        offset_table_position = f.tell()
+        f.write(np.asarray(offsets, dtype="<u8").tobytes())
+        f.seek(0)
+        f.write(_HEADER.pack(_MAGIC, _FORMAT_VERSION, int(compress), count, block_size, offset_table_position))
+
+    tmp_path.replace(path)
+    return count
+
+def write_docstore_from_vector_store(vector_store, path):
+    """Writes the documents of a LangChain FAISS vector store in index order."""
+    def records():
+        for position in range(vector_store.index.ntotal):
+            doc_id = vector_store.index_to_docstore_id[position]
+            yield doc_id, vector_store.docstore.search(doc_id)
+    return write_docstore(path, records())
+
+class MmapDocstore:
+    """Read-only, position-addressed access to a docstore file written by write_docstore."""
+    def __init__(self, path):
+        self.path = Path(path)
+        self._file = open(self.path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, compressed, self._count, self._block_size, table_position = _HEADER.unpack_from(self._mmap, 0)
+        if magic != _MAGIC or version != _FORMAT_VERSION:
+            raise ValueError(f"{self.path} is not a supported docstore file.")
+        self._compressed = bool(compressed)
+        n_blocks = -(-self._count // self._block_size)
+        # A zero-copy view of the offset table inside the mapping.
+        self._offsets = np.frombuffer(self._mmap, dtype="<u8", count=n_blocks + 1, offset=table_position)
+        self._read_block = lru_cache(maxsize=_BLOCK_CACHE_SIZE)(self._load_block)
+
+    def __len__(self):
+        return self._count
+
+    def _load_block(self, block_number):
+        data = self._mmap[int(self._offsets[block_number]):int(self._offsets[block_number + 1])]
+        if self._compressed:
+            data = zlib.decompress(data)
+        return json.loads(data)
+
+    def _record(self, position):
+        if not 0 <= position < self._count:
+            raise IndexError(f"Docstore position {position} out of range.")
+        return self._read_block(position // self._block_size)[position % self._block_size]
+
+    def get(self, position: int) -> Document:
+        """Returns the Document stored at a FAISS index position."""
+        record = self._record(position)
+        return Document(page_content=record["text"], metadata=dict(record["metadata"]))
+
+    def get_id(self, position: int) -> str:
+        """Returns the docstore ID of the chunk stored at a FAISS index position."""
+        return self._record(position)["id"]
+
+    def close(self):
+        self._read_block.cache_clear()
+        self._offsets = None
+        self._mmap.close()
+        self._file.close()
+
+def migrate_vector_store(path=None):
+    """
+    Writes docstore.bin for an existing store directory (by default the currently
+    published one, every shard of it if sharded) from its pickled LangChain docstore
+    (index.pkl). The pickle is left in place for incremental ingestion, but the
+    KnowledgeBase no longer needs to load it.
+    """
+    path = Path(path) if path is not None else current_store_path()
+    count = 0
+    for _, store_path in store_dirs(path):
+        with open(store_path / "index.pkl", "rb") as f:
+            docstore, index_to_docstore_id = pickle.load(f)
+        records = (
+            (index_to_docstore_id[position], docstore.search(index_to_docstore_id[position]))
+            for position in range(len(index_to_docstore_id))
+        )
+        written = write_docstore(store_path / DOCSTORE_FILE, records)
+        print(f"Wrote {written} documents to {store_path / DOCSTORE_FILE}")
+        count += written
+    return count
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage the memory-mapped MOSDAC docstore.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    migrate_parser = subparsers.add_parser("migrate", help="Create docstore.bin from an existing index.pkl.")
+    migrate_parser.add_argument("path", nargs="?", default=None)
+    args = parser.parse_args()
+    if args.command == "migrate":
+        migrate_vector_store(args.path)
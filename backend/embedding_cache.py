@@ -0,0 +1,170 @@
+import hashlib
+import sqlite3
+import threading
+import time
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+try:
+    # Try relative import first (when run as module)
+    from .config import EMBEDDING_MODEL_NAME, EMBEDDING_CACHE_PATH, EMBEDDING_CACHE_MAX_ENTRIES
+except ImportError:
+    # Fall back to absolute import (when run directly)
+    from config import EMBEDDING_MODEL_NAME, EMBEDDING_CACHE_PATH, EMBEDDING_CACHE_MAX_ENTRIES
+
+# SQLite limits the number of parameters in one statement, so lookups are chunked.
+_LOOKUP_CHUNK = 500
+# Hits refresh last_used in batches: once this many keys are waiting, or after
+# _TOUCH_FLUSH_SECONDS, rather than with a write transaction per lookup.
+_TOUCH_FLUSH_KEYS = 256
+_TOUCH_FLUSH_SECONDS = 5
+# The size is tracked in memory between puts and recounted from the file at least this
+# often, to account for entries other processes added or evicted.
+_RECOUNT_SECONDS = 60
+
+class EmbeddingCache:
+    """
+    A persistent, size-capped cache of embedding vectors.
+
+    Vectors are stored as raw float32 blobs in a single SQLite file, keyed by a hash
+    of (model name, whitespace-normalized text). SQLite gives us a compact on-disk
+    B-tree index, memory-mapped reads and safe concurrent access from the ingestion
+    process and every API worker. The least recently used entries are evicted once
+    the cache holds more than `max_entries` vectors; hits record their use in
+    batches, so a lookup rarely writes. `model_name` names the vector
+    space (see embeddings.embedding_space) and is part of every key, so processes
+    using different models or backends share the file without ever seeing each
+    other's vectors; entries no process asks for any more simply age out.
+    """
+    def __init__(self, path=EMBEDDING_CACHE_PATH, model_name=EMBEDDING_MODEL_NAME, max_entries=EMBEDDING_CACHE_MAX_ENTRIES):
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), check_same_thread=False, timeout=30)
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("PRAGMA mmap_size=268435456")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS vectors ("
+                "key BLOB PRIMARY KEY, vector BLOB NOT NULL, last_used INTEGER NOT NULL"
+                ") WITHOUT ROWID"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS vectors_last_used ON vectors (last_used)")
+        self._touched = {}  # key -> time it was last looked up, not yet written
+        self._touched_since = time.monotonic()
+        self._count = self._recount()
+
+    def _key(self, text: str) -> bytes:
+        normalized = " ".join(text.split())
+        return hashlib.sha1(f"{self.model_name}\0{normalized}".encode("utf-8")).digest()
+
+    def get_many(self, texts: list) -> list:
+        """Returns a list with a float32 vector for every cached text and None for misses."""
+        keys = [self._key(text) for text in texts]
+        found = {}
+        with self._lock:
+            for i in range(0, len(keys), _LOOKUP_CHUNK):
+                chunk = keys[i:i + _LOOKUP_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM vectors WHERE key IN ({placeholders})", chunk
+                ).fetchall()
+                found.update(rows)
+            if found:
+                now = time.time_ns()
+                self._touched.update(dict.fromkeys(found, now))
+                if (len(self._touched) >= _TOUCH_FLUSH_KEYS
+                        or time.monotonic() - self._touched_since >= _TOUCH_FLUSH_SECONDS):
+                    self._flush_touched()
+        return [
+            np.frombuffer(found[key], dtype=np.float32) if key in found else None
+            for key in keys
+        ]
+
+    def put_many(self, texts: list, vectors: list):
+        """Stores vectors for the given texts, evicting the least recently used entries if needed."""
+        now = time.time_ns()
+        rows = [
+            (self._key(text), np.asarray(vector, dtype=np.float32).tobytes(), now)
+            for text, vector in zip(texts, vectors)
+        ]
+        with self._lock:
+            with self._conn:
+                # A text's vector never changes, so existing rows are kept and only new ones counted.
+                inserted = self._conn.executemany("INSERT OR IGNORE INTO vectors VALUES (?, ?, ?)", rows)
+                self._count += inserted.rowcount
+            if time.monotonic() - self._counted_at >= _RECOUNT_SECONDS:
+                self._count = self._recount()
+            if self._count > self.max_entries:
+                # Recently used entries must not be evicted for their last_used still being stale.
+                self._flush_touched()
+                self._count = self._recount()
+                if self._count > self.max_entries:
+                    with self._conn:
+                        self._conn.execute(
+                            "DELETE FROM vectors WHERE key IN "
+                            "(SELECT key FROM vectors ORDER BY last_used LIMIT ?)",
+                            (self._count - self.max_entries,),
+                        )
+                    self._count = self.max_entries
+
+    def _recount(self) -> int:
+        self._counted_at = time.monotonic()
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM vectors").fetchone()
+        return count
+
+    def _flush_touched(self):
+        """Writes the pending last_used updates in one transaction. Called with the lock held."""
+        if self._touched:
+            with self._conn:
+                self._conn.executemany(
+                    "UPDATE vectors SET last_used = ? WHERE key = ?",
+                    [(now, key) for key, now in self._touched.items()],
+                )
+            self._touched = {}
+        self._touched_since = time.monotonic()
+
+    def close(self):
+        with self._lock:
+            self._flush_touched()
+            self._conn.close()
+
+class CachedEmbeddings(Embeddings):
+    """
+    Wraps an Embeddings model so texts that were embedded before (by any process
+    sharing the cache file) are served from the EmbeddingCache instead of the encoder.
+    """
+    def __init__(self, embeddings: Embeddings, cache: EmbeddingCache):
+        self.embeddings = embeddings
+        self.cache = cache
+
+    def embed_documents(self, texts: list) -> list:
+        vectors = self.cache.get_many(texts)
+        missing = {}
+        for i, vector in enumerate(vectors):
+            if vector is None:
+                missing.setdefault(texts[i], []).append(i)
+        if missing:
+            # Each distinct missing text is encoded once, in a single batched call.
+            missing_texts = list(missing)
+            new_vectors = self.embeddings.embed_documents(missing_texts)
+            self.cache.put_many(missing_texts, new_vectors)
+            for text, vector in zip(missing_texts, new_vectors):
+                for i in missing[text]:
+                    vectors[i] = vector
+        return [np.asarray(vector, dtype=np.float32).tolist() for vector in vectors]
+
+    def embed_query(self, text: str) -> list:
+        (vector,) = self.cache.get_many([text])
+        if vector is None:
+            vector = self.embeddings.embed_query(text)
+            self.cache.put_many([text], [vector])
+        return np.asarray(vector, dtype=np.float32).tolist()
+
+    def close(self):
+        close = getattr(self.embeddings, "close", None)
+        if close is not None:
+            close()
+        self.cache.close()
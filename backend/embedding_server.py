@@ -0,0 +1,153 @@
+"""
+A local embedding service shared by all API worker processes.
+
+Instead of every uvicorn worker loading its own copy of the sentence-transformers
+model, one server process loads it (together with the embedding cache) and the
+workers send it texts over a local IPC channel: a Unix domain socket, or a named
+pipe on Windows.
+
+Run it before starting the API with EMBEDDING_SERVER_ENABLED=1:
+    python -m backend.embedding_server
+
+Messages are pickled, so both ends authenticate with a shared key (see
+EMBEDDING_SERVER_AUTHKEY) and the socket is kept in a directory only the
+service's user can access.
+"""
+import os
+import secrets
+import sys
+import threading
+from multiprocessing.connection import Client, Listener
+from pathlib import Path
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+try:
+    # Try relative import first (when run as module)
+    from .config import (
+        EMBEDDING_SERVER_ADDRESS, EMBEDDING_SERVER_AUTHKEY, EMBEDDING_SERVER_AUTHKEY_FILE,
+    )
+except ImportError:
+    # Fall back to absolute import (when run directly)
+    from config import (
+        EMBEDDING_SERVER_ADDRESS, EMBEDDING_SERVER_AUTHKEY, EMBEDDING_SERVER_AUTHKEY_FILE,
+    )
+
+def _private_dir(path):
+    """Creates `path` as a directory only its owner can access, or makes an existing one so."""
+    path.mkdir(mode=0o700, parents=True, exist_ok=True)
+    if sys.platform == "win32":
+        return
+    if path.stat().st_uid != os.getuid():
+        raise PermissionError(f"{path} belongs to another user; refusing to use it for the embedding server.")
+    os.chmod(path, 0o700)
+
+def load_authkey(create: bool = False) -> bytes:
+    """
+    Returns the key connections authenticate with: EMBEDDING_SERVER_AUTHKEY if set,
+    otherwise the one in EMBEDDING_SERVER_AUTHKEY_FILE, which is generated first
+    with `create` (the server does so on startup).
+    """
+    if EMBEDDING_SERVER_AUTHKEY:
+        return EMBEDDING_SERVER_AUTHKEY.encode("utf-8")
+    path = EMBEDDING_SERVER_AUTHKEY_FILE
+    if not path.exists():
+        if not create:
+            raise RuntimeError(
+                f"No embedding server authkey: set EMBEDDING_SERVER_AUTHKEY, or start the embedding "
+                f"server first so it generates {path}."
+            )
+        _private_dir(path.parent)
+        try:
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        except FileExistsError:
+            pass
+        else:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(secrets.token_hex(32))
+    return path.read_text(encoding='utf-8').strip().encode("utf-8")
+
+class RemoteEmbeddings(Embeddings):
+    """
+    Embeddings client for the shared embedding server. Each thread keeps its own
+    connection, so concurrent requests in one worker never interleave messages.
+    """
+    def __init__(self, address=EMBEDDING_SERVER_ADDRESS, authkey=None):
+        self.address = address
+        self.authkey = authkey
+        self._local = threading.local()
+
+    def _call(self, method, payload):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            if self.authkey is None:
+                # Read on first use, as the server may only have generated it after this client was created.
+                self.authkey = load_authkey()
+            conn = self._local.conn = Client(self.address, authkey=self.authkey)
+        try:
+            conn.send((method, payload))
+            status, result = conn.recv()
+        except (EOFError, OSError):
+            # The server restarted; drop the stale connection so the next call reconnects.
+            self._local.conn = None
+            raise
+        if status == "error":
+            raise RuntimeError(f"Embedding server error: {result}")
+        return result
+
+    def embedding_space(self) -> str:
+        """The vector space of the server's embeddings (see embeddings.embedding_space)."""
+        return self._call("embedding_space", None)
+
+    def embed_documents(self, texts: list) -> list:
+        return self._call("embed_documents", list(texts)).tolist()
+
+    def embed_query(self, text: str) -> list:
+        return self._call("embed_query", text).tolist()
+
+def _serve_connection(conn, embeddings, space, encode_lock):
+    with conn:
+        while True:
+            try:
+                method, payload = conn.recv()
+            except EOFError:
+                return
+            if method == "embedding_space":
+                conn.send(("ok", space))
+                continue
+            try:
+                # One forward pass at a time; the model already uses every core.
+                with encode_lock:
+                    if method == "embed_documents":
+                        result = embeddings.embed_documents(payload)
+                    elif method == "embed_query":
+                        result = embeddings.embed_query(payload)
+                    else:
+                        raise ValueError(f"Unknown method '{method}'")
+                conn.send(("ok", np.asarray(result, dtype=np.float32)))
+            except Exception as e:
+                conn.send(("error", str(e)))
+
+def serve(address=EMBEDDING_SERVER_ADDRESS, authkey=None):
+    """Loads the embedding model once and serves embedding requests until interrupted."""
+    try:
+        from .embeddings import build_embeddings, embedding_space
+    except ImportError:
+        from embeddings import build_embeddings, embedding_space
+
+    authkey = authkey or load_authkey(create=True)
+    embeddings = build_embeddings(remote=False)
+    space = embedding_space()
+    encode_lock = threading.Lock()
+    if sys.platform != "win32":
+        _private_dir(Path(address).parent)
+        if os.path.exists(address):
+            os.remove(address)  # A stale socket left behind by a previous run.
+    with Listener(address, authkey=authkey) as listener:
+        print(f"Embedding server listening on {address} ({space})")
+        while True:
+            conn = listener.accept()
+            threading.Thread(target=_serve_connection, args=(conn, embeddings, space, encode_lock), daemon=True).start()
+
+if __name__ == "__main__":
+    serve()
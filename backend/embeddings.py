@@ -0,0 +1,120 @@
+import math
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from langchain_core.embeddings import Embeddings
+from langchain_community.embeddings import HuggingFaceEmbeddings
+
+try:
+    # Try relative import first (when run as module)
+    from .config import (
+        EMBEDDING_MODEL_NAME, EMBEDDING_BACKEND, EMBED_SHARD_SIZE, EMBEDDING_CACHE_ENABLED, EMBEDDING_SERVER_ENABLED,
+        ONNX_THREADS,
+    )
+    from .embedding_cache import EmbeddingCache, CachedEmbeddings
+    from .embedding_server import RemoteEmbeddings
+    from .onnx_embeddings import OnnxEmbeddings, export_model
+except ImportError:
+    # Fall back to absolute import (when run directly)
+    from config import (
+        EMBEDDING_MODEL_NAME, EMBEDDING_BACKEND, EMBED_SHARD_SIZE, EMBEDDING_CACHE_ENABLED, EMBEDDING_SERVER_ENABLED,
+        ONNX_THREADS,
+    )
+    from embedding_cache import EmbeddingCache, CachedEmbeddings
+    from embedding_server import RemoteEmbeddings
+    from onnx_embeddings import OnnxEmbeddings, export_model
+
+# The vectors each backend produces. Backends of the same space are interchangeable;
+# a store can only be queried with a backend of the space it was built with.
+EMBEDDING_BACKENDS = {"torch": "fp32", "onnx": "fp32", "onnx_int8": "int8"}
+
+# Each worker process keeps its own copy of the encoder in this global,
+# created once by the pool initializer rather than once per shard.
+_worker_embeddings = None
+
+def embedding_space(backend: str = EMBEDDING_BACKEND, model_name: str = EMBEDDING_MODEL_NAME) -> str:
+    """
+    Names the vectors `backend` produces for `model_name`: the model name itself for
+    full precision, with the quantization appended otherwise (e.g. "all-MiniLM-L6-v2@int8").
+    """
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Unknown embedding backend '{backend}'. Expected one of {list(EMBEDDING_BACKENDS)}.")
+    space = EMBEDDING_BACKENDS[backend]
+    return model_name if space == "fp32" else f"{model_name}@{space}"
+
+def create_encoder(backend: str = EMBEDDING_BACKEND, model_name: str = EMBEDDING_MODEL_NAME, threads: int = 0) -> Embeddings:
+    """Loads `model_name` with `backend`, limited to `threads` intra-op threads if given."""
+    embedding_space(backend, model_name)  # Rejects unknown backends.
+    if backend == "torch":
+        if threads:
+            import torch
+            torch.set_num_threads(threads)
+        return HuggingFaceEmbeddings(model_name=model_name)
+    return OnnxEmbeddings(model_name, int8=backend == "onnx_int8", threads=threads or ONNX_THREADS)
+
+def _init_worker(backend, model_name, threads):
+    global _worker_embeddings
+    # Split the machine's cores between the workers instead of letting every
+    # worker's intra-op thread pool fight over all of them.
+    _worker_embeddings = create_encoder(backend, model_name, threads)
+
+def _embed_shard(texts):
+    return _worker_embeddings.embed_documents(texts)
+
+class ParallelEmbeddings(Embeddings):
+    """
+    An Embeddings implementation that shards texts across a pool of encoder
+    processes. Shards are contiguous slices of the input and results are merged
+    back in input order, so the output matches a single-process encoder.
+    """
+    def __init__(self, model_name: str = EMBEDDING_MODEL_NAME, workers: int = 2, shard_size: int = EMBED_SHARD_SIZE,
+                 backend: str = EMBEDDING_BACKEND):
+        self.model_name = model_name
+        self.workers = workers
+        self.shard_size = shard_size
+        if backend != "torch":
+            # Export once here, rather than in every worker at the same time.
+            export_model(model_name, int8=backend == "onnx_int8")
+        # 'spawn' avoids forking a parent that may already hold torch thread pools,
+        # and matches the only start method available on Windows.
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(backend, model_name, max(1, (os.cpu_count() or 1) // workers)),
+        )
+
+    def embed_documents(self, texts: list) -> list:
+        if not texts:
+            return []
+        # Use small shards so every worker stays busy, but never more shards than needed.
+        shard_size = min(self.shard_size, math.ceil(len(texts) / self.workers))
+        shards = [texts[i:i + shard_size] for i in range(0, len(texts), shard_size)]
+        # Executor.map yields results in submission order, which keeps the merge deterministic.
+        return [vector for shard in self._executor.map(_embed_shard, shards) for vector in shard]
+
+    def embed_query(self, text: str) -> list:
+        return self.embed_documents([text])[0]
+
+    def close(self):
+        self._executor.shutdown()
+
+def build_embeddings(workers: int = 1, cache: bool = EMBEDDING_CACHE_ENABLED, remote: bool = EMBEDDING_SERVER_ENABLED,
+                     backend: str = EMBEDDING_BACKEND) -> Embeddings:
+    """
+    Returns the embedding model used to build and query the vector store, run
+    with `backend` (see EMBEDDING_BACKEND). With `remote`, texts are sent to the
+    shared embedding server (which applies its own cache and backend). Otherwise,
+    with more than one worker, encoding is spread over a process pool, and with
+    `cache` enabled, previously seen texts skip the encoder entirely.
+    """
+    if remote:
+        return RemoteEmbeddings()
+    if workers > 1:
+        embeddings = ParallelEmbeddings(model_name=EMBEDDING_MODEL_NAME, workers=workers, backend=backend)
+    else:
+        embeddings = create_encoder(backend, EMBEDDING_MODEL_NAME)
+    if cache:
+        # Keyed by vector space, so quantized and full-precision vectors never mix.
+        return CachedEmbeddings(embeddings, EmbeddingCache(model_name=embedding_space(backend)))
+    return embeddings
@@ -0,0 +1,184 @@
+import json
+import faiss
+import numpy as np
+
+INDEX_TYPES = ("flat", "ivf_flat", "hnsw", "ivf_pq")
+INDEX_META_FILE = "index_meta.json"
+
+# Vectors copied per step when rebuilding an index without some of its entries.
+_COPY_CHUNK = 10_000
+
+def factory_string(index_type: str, params: dict, n_train: int = 0) -> str:
+    """
+    Returns the faiss.index_factory description for an index type.
+
+    - flat:     exact search. No training.
+    - ivf_flat: inverted file over `nlist` k-means cells, full vectors in each cell.
+    - hnsw:     HNSW graph with `hnsw_m` links per node.
+    - ivf_pq:   inverted file whose vectors are product-quantized into `pq_m`
+                sub-vectors of `pq_nbits` bits each.
+
+    IVF types are trained on `n_train` vectors, so `nlist` is clamped to what that
+    many vectors can support (FAISS wants ~39 training points per cell).
+    """
+    nlist = max(1, min(params.get("nlist", 1024), n_train // 39))
+    if index_type == "flat":
+        return "Flat"
+    if index_type == "ivf_flat":
+        return f"IVF{nlist},Flat"
+    if index_type == "hnsw":
+        return f"HNSW{params.get('hnsw_m', 32)}"
+    if index_type == "ivf_pq":
+        return f"IVF{nlist},PQ{params.get('pq_m', 16)}x{params.get('pq_nbits', 8)}"
+    raise ValueError(f"Unknown index type '{index_type}'. Choose one of: {', '.join(INDEX_TYPES)}.")
+
+def create_index(index_type: str, dim: int, params: dict, n_train: int = 0):
+    """
+    Creates an empty (untrained) FAISS index of the requested type. IVF indexes
+    get a hashtable direct map so vectors can be reconstructed (for MMR) and
+    removed by ID.
+    """
+    index = faiss.index_factory(dim, factory_string(index_type, params, n_train))
+    if index_type == "hnsw":
+        index.hnsw.efConstruction = params.get("ef_construction", 200)
+    if index_type in ("ivf_flat", "ivf_pq"):
+        faiss.extract_index_ivf(index).set_direct_map_type(faiss.DirectMap.Hashtable)
+    return index
+
+def min_training_size(index_type: str, params: dict) -> int:
+    """The fewest vectors an index of this type can sensibly be trained on."""
+    if index_type == "ivf_pq":
+        return 2 ** params.get("pq_nbits", 8)
+    if index_type == "ivf_flat":
+        return 1
+    return 0
+
+def set_search_params(index, nprobe=None, ef_search=None):
+    """Applies query-time tuning knobs where the index type supports them."""
+    if nprobe is not None:
+        try:
+            faiss.extract_index_ivf(index).nprobe = nprobe
+        except RuntimeError:
+            pass  # Not an IVF index.
+    if ef_search is not None and hasattr(index, "hnsw"):
+        index.hnsw.efSearch = ef_search
+
+def _renumber_ivf(ivf, keep):
+    """
+    After remove_ids, renumbers the surviving vectors of an IVF index (whose IDs
+    are their old positions `keep`) to 0..n-1 in their original order. Only the
+    IDs in the inverted lists change; the stored codes are written back as they are.
+    """
+    invlists = ivf.invlists
+    remap = np.full(int(keep[-1]) + 1 if len(keep) else 0, -1, dtype=np.int64)
+    remap[keep] = np.arange(len(keep), dtype=np.int64)
+    for list_no in range(ivf.nlist):
+        size = invlists.list_size(list_no)
+        if not size:
+            continue
+        ids = remap[faiss.rev_swig_ptr(invlists.get_ids(list_no), size)]
+        codes = faiss.rev_swig_ptr(invlists.get_codes(list_no), size * invlists.code_size).copy()
+        invlists.update_entries(list_no, 0, size, faiss.swig_ptr(ids), faiss.swig_ptr(codes))
+    # The hashtable still maps the old IDs, and setting the type it already has is a
+    # no-op; dropping it first makes FAISS rebuild it from the renumbered lists.
+    ivf.set_direct_map_type(faiss.DirectMap.NoMap)
+    ivf.set_direct_map_type(faiss.DirectMap.Hashtable)
+
+def _stores_exact_vectors(index) -> bool:
+    """Whether reconstruct() returns the vectors exactly as they were added."""
+    return isinstance(index, (faiss.IndexFlat, faiss.IndexHNSWFlat, faiss.IndexIVFFlat))
+
+def remove_positions(index, positions, original_vectors=None):
+    """
+    Returns an index without the vectors at `positions`, with the remaining vectors
+    renumbered 0..n-1 in their original order.
+
+    Flat indexes compact themselves on remove_ids. IVF indexes remove the vectors
+    through their hashtable direct map and then have the survivors' IDs renumbered,
+    so IVF-PQ codes are never decoded and quantized again. HNSW cannot remove at
+    all; its surviving vectors (stored exactly) are added to a fresh clone instead.
+    Any other index is rebuilt the same way from `original_vectors(positions)`,
+    which returns the unquantized vectors at the given positions.
+    """
+    positions = np.asarray(sorted(positions), dtype=np.int64)
+    if len(positions) == 0:
+        return index
+    if isinstance(index, faiss.IndexFlat):
+        index.remove_ids(positions)
+        return index
+
+    keep = np.setdiff1d(np.arange(index.ntotal, dtype=np.int64), positions)
+    if isinstance(index, faiss.IndexIVF):
+        index.remove_ids(positions)
+        _renumber_ivf(index, keep)
+        return index
+
+    if not _stores_exact_vectors(index) and original_vectors is None:
+        raise ValueError(f"Removing from a {type(index).__name__} needs the original vectors.")
+    new_index = faiss.clone_index(index)
+    new_index.reset()
+    for start in range(0, len(keep), _COPY_CHUNK):
+        chunk = keep[start:start + _COPY_CHUNK]
+        if _stores_exact_vectors(index):
+            vectors = np.vstack([index.reconstruct(int(i)) for i in chunk])
+        else:
+            vectors = np.asarray(original_vectors(chunk), dtype=np.float32)
+        new_index.add(vectors)
+    return new_index
+
+def delete_from_vector_store(vector_store, ids):
+    """
+    Deletes documents by docstore ID from a LangChain FAISS vector store, for any
+    index type created by create_index. (LangChain's own delete assumes remove_ids
+    renumbers vectors, which only holds for flat indexes.) Where an index has to be
+    rebuilt from unquantized vectors, they come from the store's embedding function,
+    which answers from the embedding cache for texts embedded before.
+    """
+    ids = set(ids)
+    positions = [i for i, doc_id in vector_store.index_to_docstore_id.items() if doc_id in ids]
+
+    def original_vectors(keep):
+        texts = [vector_store.docstore.search(vector_store.index_to_docstore_id[int(i)]).page_content for i in keep]
+        return vector_store.embedding_function.embed_documents(texts)
+
+    vector_store.index = remove_positions(vector_store.index, positions, original_vectors)
+    vector_store.docstore.delete(list(ids))
+    remaining = [
+        doc_id for _, doc_id in sorted(vector_store.index_to_docstore_id.items()) if doc_id not in ids
+    ]
+    vector_store.index_to_docstore_id = dict(enumerate(remaining))
+
+def read_index(path, use_mmap: bool = True):
+    """
+    Reads a saved FAISS index. With `use_mmap`, the index data is memory-mapped
+    read-only where this FAISS build supports it for the index type, so several
+    processes serving the same file share its physical pages. Falls back to a
+    normal (private, in-memory) read otherwise.
+    """
+    if use_mmap:
+        # IO_FLAG_MMAP_IFC (newer FAISS) also covers flat indexes; IO_FLAG_MMAP covers IVF lists.
+        for flag_name in ("IO_FLAG_MMAP_IFC", "IO_FLAG_MMAP"):
+            flag = getattr(faiss, flag_name, None)
+            if flag is None:
+                continue
+            try:
+                return faiss.read_index(str(path), flag | faiss.IO_FLAG_READ_ONLY)
+            except RuntimeError:
+                continue
+        print(f"This FAISS build cannot memory-map {path}; loading it into memory instead.")
+    return faiss.read_index(str(path))
+
+def save_index_meta(path, index_type: str, params: dict, embedding_model: str, embedding_backend: str):
+    with open(path / INDEX_META_FILE, 'w', encoding='utf-8') as f:
+        json.dump({
+            "index_type": index_type, "params": params,
+            "embedding_model": embedding_model, "embedding_backend": embedding_backend,
+        }, f, indent=2)
+
+def load_index_meta(path) -> dict:
+    """Reads the index description saved next to index.faiss (stores built before it existed are flat)."""
+    meta_file = path / INDEX_META_FILE
+    if not meta_file.exists():
+        return {"index_type": "flat", "params": {}}
+    with open(meta_file, 'r', encoding='utf-8') as f:
+        return json.load(f)
@@ -1,63 +1,328 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
 from langchain_community.vectorstores import FAISS
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from .config import VECTOR_STORE_PATH, EMBEDDING_MODEL_NAME
+from .config import (
+    VECTOR_STORE_PATH, EMBEDDING_MODEL_NAME, EMBEDDING_BACKEND, INDEX_NPROBE, INDEX_EF_SEARCH, INDEX_MMAP,
+    SHARD_SEARCH_WORKERS, FILTER_OVERFETCH, RETRIEVAL_MODE, HYBRID_RRF_K,
+)
+from .docstore import DOCSTORE_FILE, MmapDocstore
+from .embeddings import build_embeddings, embedding_space
+from .index_factory import load_index_meta, read_index, set_search_params
+from .lexical_index import LEXICAL_INDEX_FILE, LexicalIndex
+from .retrieval import maximal_marginal_relevance, normalize_rows, reciprocal_rank_fusion
+from .shards import load_shard_list, store_dirs, normalize_filters, split_filters, matches_filters
+from .store_versions import VERSIONS_DIR, current_store_path
+
+class _PickledDocuments:
+    """Position-addressed access to the documents of a LangChain FAISS store (legacy index.pkl)."""
+    def __init__(self, vector_store):
+        self.vector_store = vector_store
+
+    def __len__(self):
+        return len(self.vector_store.index_to_docstore_id)
+
+    def get(self, position: int):
+        return self.vector_store.docstore.search(self.vector_store.index_to_docstore_id[position])
+
+    def close(self):
+        pass
+
+class _Shard:
+    """One FAISS index, its documents and BM25 index, plus the metadata values it was partitioned by."""
+    def __init__(self, info: dict, path: Path, embeddings):
+        self.info = info
+        self.name = info["name"]
+        docstore_file = path / DOCSTORE_FILE
+        if docstore_file.exists():
+            # Chunk text is read from the memory-mapped docstore on demand instead of
+            # unpickling every document into this process.
+            self.index = read_index(path / "index.faiss", use_mmap=INDEX_MMAP)
+            self.documents = MmapDocstore(docstore_file)
+            if len(self.documents) != self.index.ntotal:
+                raise ValueError(
+                    f"{docstore_file} holds {len(self.documents)} documents but the index has "
+                    f"{self.index.ntotal} vectors. Rebuild the vector store."
+                )
+        else:
+            print("No docstore.bin found, loading the pickled docstore. "
+                  "Run 'python -m backend.docstore migrate' to speed up startup.")
+            # We need to allow dangerous deserialization for FAISS with custom embeddings
+            vector_store = FAISS.load_local(
+                str(path),
+                embeddings,
+                allow_dangerous_deserialization=True
+            )
+            self.index = vector_store.index
+            self.documents = _PickledDocuments(vector_store)
+        self.index_type = load_index_meta(path)["index_type"]
+        lexical_file = path / LEXICAL_INDEX_FILE
+        self.lexical = LexicalIndex(lexical_file) if lexical_file.exists() else None
+
+    def search(self, query_vectors: np.ndarray, fetch_k: int):
+        return self.index.search(query_vectors, fetch_k)
+
+    def search_lexical(self, query_texts: list, fetch_k: int):
+        return [self.lexical.search(text, fetch_k) for text in query_texts]
+
+    def close(self):
+        self.documents.close()
+        if self.lexical is not None:
+            self.lexical.close()
+
+def _query_space(embeddings, backend: str) -> str:
+    """
+    The vector space of the queries `embeddings` produces: the shared embedding
+    server reports its own, since it runs whatever backend it was started with;
+    local embeddings run on `backend`.
+    """
+    report = getattr(embeddings, "embedding_space", None)
+    return report() if report is not None else embedding_space(backend)
+
+def _check_embedding_backend(path: Path, dirs: list, query_space: str):
+    """
+    Raises ValueError unless the store at `path` was built with vectors that queries
+    embedded in `query_space` can be compared with: the same model, and a backend of
+    the same vector space (see EMBEDDING_BACKENDS).
+    """
+    meta = load_shard_list(path) or load_index_meta(dirs[0][1])
+    # Stores built before these were recorded used the configured model with torch.
+    built_model = meta.get("embedding_model") or EMBEDDING_MODEL_NAME
+    built_backend = meta.get("embedding_backend", "torch")
+    if embedding_space(built_backend, built_model) != query_space:
+        raise ValueError(
+            f"The vector store at {path} was built with '{built_model}' on the '{built_backend}' embedding "
+            f"backend, whose vectors are not comparable with queries embedded as '{query_space}'. Rebuild the "
+            f"store (python backend/data_ingestion.py) or set EMBEDDING_BACKEND back to '{built_backend}' "
+            f"(for the embedding server too, if it is enabled)."
+        )
 
 class KnowledgeBase:
-    def __init__(self):
+    def __init__(self, embeddings=None, nprobe: int = INDEX_NPROBE, ef_search: int = INDEX_EF_SEARCH, path=None,
+                 mode: str = RETRIEVAL_MODE, embedding_backend: str = EMBEDDING_BACKEND):
         """
         Initializes the KnowledgeBase by loading the pre-computed FAISS vector store.
+        The index type (flat, IVF, HNSW, IVF-PQ) is read from the metadata saved by
+        ingestion, and its search-time parameters are applied. A sharded store is
+        loaded as one index per shard.
+
+        Args:
+            embeddings: Optional Embeddings model to use instead of the default
+                        one from build_embeddings().
+            nprobe (int): IVF cells to probe per search (IVF indexes only).
+            ef_search (int): HNSW candidate list size per search (HNSW only).
+            path: Store directory to load; defaults to the currently published version.
+            mode (str): "hybrid" fuses BM25 and vector rankings when a query's text
+                        is available; "vector" uses embeddings only.
+            embedding_backend (str): The backend local `embeddings` run on (the
+                        embedding server reports its own). A store built with
+                        vectors of another space is refused.
         """
-        if not VECTOR_STORE_PATH.exists():
+        path = Path(path) if path is not None else current_store_path(VECTOR_STORE_PATH)
+        dirs = store_dirs(path)
+        if not dirs:
             raise FileNotFoundError(
-                f"Vector store not found at {VECTOR_STORE_PATH}. "
+                f"Vector store not found at {path}. "
                 "Please run the data ingestion process first."
             )
-        
-        print("Loading knowledge base from disk...")
-        embeddings = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL_NAME)
-        # We need to allow dangerous deserialization for FAISS with custom embeddings
-        self.vector_store = FAISS.load_local(
-            str(VECTOR_STORE_PATH), 
-            embeddings, 
-            allow_dangerous_deserialization=True
-        )
-        print("Knowledge base loaded successfully.")
 
-    def query(self, query_text: str, k: int = 4):
+        # Shares the on-disk embedding cache with ingestion, so repeated queries skip the encoder.
+        embeddings = embeddings or build_embeddings()
+        _check_embedding_backend(path, dirs, _query_space(embeddings, embedding_backend))
+        print(f"Loading knowledge base from {path}...")
+        self.path = path
+        self.embeddings = embeddings
+        self.shards = [_Shard(info, shard_path, self.embeddings) for info, shard_path in dirs]
+        shard_list = load_shard_list(path)
+        self.index_type = shard_list["index_type"] if shard_list else self.shards[0].index_type
+        self.hybrid = mode == "hybrid" and all(shard.lexical is not None for shard in self.shards)
+        if mode == "hybrid" and not self.hybrid:
+            print("No lexical.bin found, using vector search only. "
+                  "Run 'python -m backend.lexical_index build' to enable hybrid search.")
+        self.set_search_params(nprobe=nprobe, ef_search=ef_search)
+        # FAISS releases the GIL while searching, so shards are searched on parallel threads.
+        self._executor = None
+        if len(self.shards) > 1:
+            self._executor = ThreadPoolExecutor(
+                max_workers=min(len(self.shards), SHARD_SEARCH_WORKERS), thread_name_prefix="shard-search"
+            )
+        # Identifies this build of the vector store; caches keyed on it go stale on rebuild.
+        # Published versions are named by their directory, legacy stores by index mtime.
+        if path.parent.name == VERSIONS_DIR:
+            self.version = path.name
+        else:
+            self.version = str((dirs[0][1] / "index.faiss").stat().st_mtime_ns)
+        self.ntotal = sum(shard.index.ntotal for shard in self.shards)
+        print(f"Knowledge base loaded successfully ({self.index_type} index, {len(self.shards)} shards, "
+              f"{self.ntotal} vectors, {'hybrid' if self.hybrid else 'vector'} search).")
+
+    def set_search_params(self, nprobe: int = None, ef_search: int = None):
+        """Tunes the recall/latency trade-off of approximate indexes at query time."""
+        for shard in self.shards:
+            set_search_params(shard.index, nprobe=nprobe, ef_search=ef_search)
+
+    def embed_query(self, query_text: str) -> np.ndarray:
+        """Embeds a query once, returning a float32 vector usable by search_by_vector."""
+        return np.asarray(self.embeddings.embed_query(query_text), dtype=np.float32)
+
+    def embed_queries(self, query_texts: list) -> np.ndarray:
+        """Embeds several queries in one batched encoder call, returning an (n, dim) float32 matrix."""
+        return np.asarray(self.embeddings.embed_documents(query_texts), dtype=np.float32)
+
+    def _search_shards(self, query_vectors: np.ndarray, fetch_k: int, filters: dict, query_texts: list = None):
+        """
+        Searches every shard that can match `filters` and merges their vector results.
+        With `query_texts`, each shard's BM25 index is searched as well.
+
+        Returns:
+            tuple: (vector rankings, lexical rankings or None). Per query, the vector
+                   ranking is one list of up to `fetch_k` (shard, position) candidates,
+                   best first; the lexical rankings are one such list per shard, since
+                   BM25 scores of different shards are not comparable.
+        """
+        plans = []
+        for shard in self.shards:
+            matches, residual = split_filters(shard.info, filters)
+            if matches:
+                plans.append((shard, residual))
+        if not plans:
+            empty = [[] for _ in query_vectors]
+            return empty, (empty if query_texts is not None else None)
+
+        def search(plan):
+            shard, residual = plan
+            n = fetch_k * FILTER_OVERFETCH if residual else fetch_k
+            distances, positions = shard.search(query_vectors, n)
+            lexical = shard.search_lexical(query_texts, n) if query_texts is not None else None
+            return distances, positions, lexical
+
+        if len(plans) == 1:
+            results = [search(plans[0])]
+        else:
+            results = list(self._executor.map(search, plans))
+
+        def keep(shard, residual, position):
+            return not residual or matches_filters(shard.documents.get(position).metadata, residual)
+
+        vector_rankings, lexical_rankings = [], []
+        for q in range(len(query_vectors)):
+            candidates, shard_lexical = [], []
+            for (shard, residual), (distances, positions, lexical) in zip(plans, results):
+                for distance, position in zip(distances[q], positions[q]):
+                    if position != -1 and keep(shard, residual, int(position)):
+                        candidates.append((float(distance), shard, int(position)))
+                if lexical is not None:
+                    # Each shard's BM25 has its own IDF and average length, so its matches
+                    # are only ranked among themselves and fused by rank, not by score.
+                    ranking = [(shard, int(position)) for position in lexical[q][0]
+                               if keep(shard, residual, int(position))]
+                    shard_lexical.append(ranking[:fetch_k])
+            # All shards use the same metric, so their distances merge into one global ranking.
+            candidates.sort(key=lambda candidate: candidate[0])
+            vector_rankings.append([(shard, position) for _, shard, position in candidates[:fetch_k]])
+            lexical_rankings.append(shard_lexical)
+        return vector_rankings, (lexical_rankings if query_texts is not None else None)
+
+    def search_by_vectors(self, query_vectors: np.ndarray, k: int = 4, fetch_k: int = 20, lambda_mult: float = 0.5,
+                          filters: dict = None, query_texts: list = None):
+        """
+        Runs one FAISS search for all query vectors, fetching `fetch_k` candidates
+        each, then re-ranks every query's candidates with Maximal Marginal Relevance
+        to pick `k` relevant but diverse documents.
+
+        With `filters` (e.g. {"content_type": "pdf"}), only shards that can hold
+        matching chunks are searched, and chunks not matching are skipped. Shards
+        are searched in parallel and merged into one global top `fetch_k`.
+
+        In hybrid mode, given the `query_texts` the vectors were embedded from, each
+        shard's top `fetch_k` BM25 matches are fetched too, and the vector ranking and
+        every shard's BM25 ranking are fused with reciprocal rank fusion; MMR then
+        uses the fused score as relevance.
+
+        Returns:
+            list: One list of (Document, score) tuples per query vector, where score
+                  is the cosine similarity between query and document (higher is better).
+
+        Raises:
+            ValueError: If a filter key is not supported (see shards.FILTER_KEYS).
+        """
+        filters = normalize_filters(filters)
+        query_vectors = np.asarray(query_vectors, dtype=np.float32).reshape(-1, self.shards[0].index.d)
+        if not self.hybrid:
+            query_texts = None
+        vector_rankings, lexical_rankings = self._search_shards(query_vectors, fetch_k, filters, query_texts)
+
+        all_results = []
+        for q, query_vector in enumerate(query_vectors):
+            relevance = None
+            if lexical_rankings is None:
+                candidates = vector_rankings[q]
+            else:
+                fused = reciprocal_rank_fusion([vector_rankings[q], *lexical_rankings[q]], k=HYBRID_RRF_K)[:fetch_k]
+                candidates = [candidate for candidate, _ in fused]
+                if fused:
+                    relevance = np.asarray([score for _, score in fused], dtype=np.float32) / fused[0][1]
+            if not candidates:
+                all_results.append([])
+                continue
+
+            candidate_vectors = np.vstack([shard.index.reconstruct(position) for shard, position in candidates])
+            selected = maximal_marginal_relevance(
+                query_vector, candidate_vectors, k=k, lambda_mult=lambda_mult, relevance=relevance
+            )
+            similarities = normalize_rows(candidate_vectors) @ normalize_rows(query_vector)
+
+            all_results.append([
+                (candidates[i][0].documents.get(candidates[i][1]), float(similarities[i])) for i in selected
+            ])
+        return all_results
+
+    def search_by_vector(self, query_vector: np.ndarray, k: int = 4, fetch_k: int = 20, lambda_mult: float = 0.5,
+                         filters: dict = None, query_text: str = None):
+        """
+        Runs a single FAISS search for `fetch_k` candidates, then re-ranks them with
+        Maximal Marginal Relevance to pick `k` relevant but diverse documents.
+
+        Returns:
+            list: A list of (Document, score) tuples, where score is the cosine
+                  similarity between the query and the document (higher is better).
+        """
+        return self.search_by_vectors(
+            query_vector.reshape(1, -1), k=k, fetch_k=fetch_k, lambda_mult=lambda_mult, filters=filters,
+            query_texts=[query_text] if query_text is not None else None,
+        )[0]
+
+    def query(self, query_text: str, k: int = 4, fetch_k: int = 20, filters: dict = None):
         """
         Performs a search on the vector store to find relevant documents
         using the Maximal Marginal Relevance (MMR) algorithm.
 
         MMR helps to select documents that are relevant to the query while also
         being as different from each other as possible, promoting diversity in the results.
+        The query is embedded once and the index is searched once (plus a BM25
+        lookup in hybrid mode); MMR then runs over the fetched candidates' vectors.
 
         Args:
             query_text (str): The user's question.
             k (int): The number of relevant documents to retrieve.
+            fetch_k (int): The number of candidates to fetch before applying MMR.
+                           It should be larger than k.
+            filters (dict): Optional metadata filters, e.g. {"content_type": "pdf"}
+                            or {"section": ["insat-3d", "insat-3dr"]}.
 
         Returns:
-            list: A list of (Document, score) tuples.
-        """
-        # We use the vector store's built-in MMR search method.
-        # fetch_k is the number of documents to initially fetch before applying MMR.
-        # It should be larger than k.
-        retrieved_docs_with_scores = self.vector_store.similarity_search_with_score(
-            query=query_text,
-            k=k,
-            # Note: Not all vector stores support MMR directly in this function.
-            # FAISS's similarity_search does not have a native 'mmr' type.
-            # A more robust way is to use the .as_retriever() method as shown below.
-        )
-        
-        # --- The more robust and correct way using as_retriever ---
-        retriever = self.vector_store.as_retriever(
-            search_type="mmr",
-            search_kwargs={'k': k, 'fetch_k': 20} # Fetch 20 docs, then select 4 diverse ones.
+            list: A list of (Document, score) tuples, scored by cosine similarity.
+        """
+        relevant_docs = self.search_by_vector(
+            self.embed_query(query_text), k=k, fetch_k=fetch_k, filters=filters, query_text=query_text
         )
-        
-        # The retriever returns Document objects, not scores.
-        # We will wrap them in a tuple with a dummy score to match our expected format.
-        relevant_docs = retriever.invoke(query_text)
-        
         print(f"Retrieved {len(relevant_docs)} documents using MMR.")
-        return [(doc, 0.0) for doc in relevant_docs] # Add dummy score of 0.0
\ No newline at end of file
+        return relevant_docs
+
+    def close(self):
+        """Releases the memory-mapped docstores. The KnowledgeBase must not be queried afterwards."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+        for shard in self.shards:
+            shard.close()
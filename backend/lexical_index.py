@@ -0,0 +1,216 @@
+"""
+A BM25 inverted index over the chunks behind a FAISS index, for exact terms
+(satellite names, product codes, file formats) that dense embeddings match poorly.
+
+File layout (all integers little-endian, every array 8-byte aligned):
+
+    header    magic "MOSLEX01", u32 document count, u32 term count,
+              u64 posting count, f64 average document length,
+              u64 offsets of the five sections below
+    lengths   u32 token count per document
+    starts    (n_terms + 1) u64 indexes into the postings, so term t's postings
+              span starts[t]:starts[t+1]
+    doc_ids   u32 document (FAISS position) per posting, ascending per term
+    tfs       u16 term frequency per posting
+    terms     the vocabulary, sorted, as newline-separated UTF-8
+
+Document i is the chunk stored at position i of the FAISS index. Opening the file
+only decodes the vocabulary; postings are zero-copy views into a read-only mmap,
+so they are paged in on demand and shared between processes.
+"""
+import argparse
+import mmap
+import re
+import struct
+from collections import Counter
+from pathlib import Path
+import numpy as np
+
+try:
+    # Try relative import first (when run as module)
+    from .config import BM25_K1, BM25_B
+    from .docstore import DOCSTORE_FILE, MmapDocstore
+    from .shards import store_dirs
+    from .store_versions import current_store_path
+except ImportError:
+    # Fall back to absolute import (when run directly)
+    from config import BM25_K1, BM25_B
+    from docstore import DOCSTORE_FILE, MmapDocstore
+    from shards import store_dirs
+    from store_versions import current_store_path
+
+LEXICAL_INDEX_FILE = "lexical.bin"
+_MAGIC = b"MOSLEX01"
+_HEADER = struct.Struct("<8sIIQd5Q")
+
+# Identifiers keep their inner separators: "INSAT-3DR", "3RIMG_L1B", "v1.5".
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[-_./][a-z0-9]+)*")
+_SEPARATORS = re.compile(r"[-_./]")
+_STOPWORDS = frozenset(
+    "a an and are as at be by can do for from how i in is it its of on or that the this "
+    "to was what when where which who why will with you your".split()
+)
+
+def tokenize(text: str) -> list:
+    """
+    Lowercases and splits text into terms. A compound identifier such as
+    "insat-3dr" yields the whole token, its parts ("insat", "3dr") and the parts
+    joined ("insat3dr"), so "INSAT 3DR", "INSAT-3DR" and "INSAT3DR" all match.
+    """
+    tokens = []
+    for match in _TOKEN_PATTERN.finditer(text.lower()):
+        token = match.group()
+        parts = _SEPARATORS.split(token)
+        if len(parts) > 1:
+            tokens.append(token)
+            tokens.extend(part for part in parts if part not in _STOPWORDS)
+            tokens.append("".join(parts))
+        elif token not in _STOPWORDS:
+            tokens.append(token)
+    return tokens
+
+def document_text(doc) -> str:
+    """The text indexed for a chunk: its page title followed by its content."""
+    return f"{doc.metadata.get('title', '')}\n{doc.page_content}"
+
+def _aligned(position: int) -> int:
+    return -(-position // 8) * 8
+
+def write_lexical_index(path, texts) -> int:
+    """
+    Builds a BM25 index over `texts`, in FAISS position order, and writes it to
+    `path`. The file is written next to its final location and moved into place
+    when complete, so readers never see a partial file.
+
+    Returns:
+        int: The number of documents indexed.
+    """
+    postings = {}
+    doc_lengths = []
+    for doc_id, text in enumerate(texts):
+        counts = Counter(tokenize(text))
+        doc_lengths.append(sum(counts.values()))
+        for term, tf in counts.items():
+            postings.setdefault(term, []).append((doc_id, min(tf, 0xFFFF)))
+
+    terms = sorted(postings)
+    starts = np.zeros(len(terms) + 1, dtype="<u8")
+    starts[1:] = np.cumsum([len(postings[term]) for term in terms])
+    n_postings = int(starts[-1])
+    doc_ids = np.empty(n_postings, dtype="<u4")
+    tfs = np.empty(n_postings, dtype="<u2")
+    for t, term in enumerate(terms):
+        entries = np.asarray(postings[term], dtype=np.int64).reshape(-1, 2)
+        doc_ids[starts[t]:starts[t + 1]] = entries[:, 0]
+        tfs[starts[t]:starts[t + 1]] = entries[:, 1]
+    lengths = np.asarray(doc_lengths, dtype="<u4")
+    avg_doc_len = float(lengths.mean()) if len(lengths) else 0.0
+
+    sections = [lengths.tobytes(), starts.tobytes(), doc_ids.tobytes(), tfs.tobytes(), "\n".join(terms).encode("utf-8")]
+    offsets, position = [], _aligned(_HEADER.size)
+    for data in sections:
+        offsets.append(position)
+        position = _aligned(position + len(data))
+
+    path = Path(path)
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, len(lengths), len(terms), n_postings, avg_doc_len, *offsets))
+        for offset, data in zip(offsets, sections):
+            f.write(b"\0" * (offset - f.tell()))
+            f.write(data)
+    tmp_path.replace(path)
+    return len(lengths)
+
+def write_lexical_index_from_vector_store(vector_store, path) -> int:
+    """Indexes the documents of a LangChain FAISS vector store in index order."""
+    def texts():
+        for position in range(vector_store.index.ntotal):
+            yield document_text(vector_store.docstore.search(vector_store.index_to_docstore_id[position]))
+    return write_lexical_index(path, texts())
+
+class LexicalIndex:
+    """Read-only BM25 search over a file written by write_lexical_index."""
+    def __init__(self, path, k1: float = BM25_K1, b: float = BM25_B):
+        self.path = Path(path)
+        self._file = open(self.path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, self._count, n_terms, n_postings, avg_doc_len,
+         lengths_at, starts_at, ids_at, tfs_at, terms_at) = _HEADER.unpack_from(self._mmap, 0)
+        if magic != _MAGIC:
+            raise ValueError(f"{self.path} is not a supported lexical index file.")
+        # Zero-copy views into the mapping.
+        self._starts = np.frombuffer(self._mmap, dtype="<u8", count=n_terms + 1, offset=starts_at)
+        self._doc_ids = np.frombuffer(self._mmap, dtype="<u4", count=n_postings, offset=ids_at)
+        self._tfs = np.frombuffer(self._mmap, dtype="<u2", count=n_postings, offset=tfs_at)
+        terms = self._mmap[terms_at:].decode("utf-8").split("\n") if n_terms else []
+        self._term_ids = {term: t for t, term in enumerate(terms)}
+        # The document-length part of the BM25 denominator, computed once per document.
+        lengths = np.frombuffer(self._mmap, dtype="<u4", count=self._count, offset=lengths_at)
+        self._length_norm = (k1 * (1 - b + b * lengths / max(avg_doc_len, 1e-9))).astype(np.float32)
+        self.k1 = k1
+
+    def __len__(self):
+        return self._count
+
+    def search(self, query_text: str, top_n: int):
+        """
+        Scores every document containing a query term with BM25.
+
+        Returns:
+            tuple: (positions, scores) of the best `top_n` documents, best first.
+        """
+        term_ids = {self._term_ids[term] for term in tokenize(query_text) if term in self._term_ids}
+        if not term_ids or top_n <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        scores = np.zeros(self._count, dtype=np.float32)
+        for t in term_ids:
+            start, end = int(self._starts[t]), int(self._starts[t + 1])
+            doc_ids = self._doc_ids[start:end]
+            tfs = self._tfs[start:end].astype(np.float32)
+            df = end - start
+            idf = np.log(1 + (self._count - df + 0.5) / (df + 0.5))
+            # Each document appears once per term, so plain fancy-index addition is safe.
+            scores[doc_ids] += idf * tfs * (self.k1 + 1) / (tfs + self._length_norm[doc_ids])
+
+        matched = np.flatnonzero(scores)
+        if len(matched) > top_n:
+            matched = matched[np.argpartition(-scores[matched], top_n - 1)[:top_n]]
+        order = np.argsort(-scores[matched], kind="stable")
+        return matched[order].astype(np.int64), scores[matched[order]]
+
+    def close(self):
+        self._starts = self._doc_ids = self._tfs = self._length_norm = None
+        self._mmap.close()
+        self._file.close()
+
+def build_for_store(path=None) -> int:
+    """
+    Writes lexical.bin for every shard of an existing store (by default the
+    currently published one) from its docstore.bin, for stores built before
+    ingestion produced lexical indexes.
+    """
+    path = Path(path) if path is not None else current_store_path()
+    count = 0
+    for _, store_path in store_dirs(path):
+        documents = MmapDocstore(store_path / DOCSTORE_FILE)
+        try:
+            written = write_lexical_index(
+                store_path / LEXICAL_INDEX_FILE,
+                (document_text(documents.get(position)) for position in range(len(documents))),
+            )
+        finally:
+            documents.close()
+        print(f"Indexed {written} documents into {store_path / LEXICAL_INDEX_FILE}")
+        count += written
+    return count
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage the MOSDAC BM25 lexical index.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build_parser = subparsers.add_parser("build", help="Create lexical.bin from an existing docstore.bin.")
+    build_parser.add_argument("path", nargs="?", default=None)
+    args = parser.parse_args()
+    if args.command == "build":
+        build_for_store(args.path)
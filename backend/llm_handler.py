@@ -1,8 +1,14 @@
 import os
+import time
+from operator import itemgetter
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import PromptTemplate
-from langchain_core.runnables import RunnablePassthrough
 from langchain_core.output_parsers import StrOutputParser
+from .config import CONTEXT_PACKING_ENABLED
+from .context_packer import estimate_tokens, format_unpacked, pack_context
+
+NO_CONTEXT_ANSWER = "I could not find any relevant information in the knowledge base to answer your question."
+ERROR_ANSWER = "Sorry, I encountered an error while communicating with the AI service. Please try your question again later."
 
 class LLMHandler:
     """
@@ -56,35 +62,97 @@ class LLMHandler:
         # --- 3. Create the RAG Chain using LangChain Expression Language (LCEL) ---
         # This chain defines the step-by-step data flow for processing a query.
         self.chain = (
-            # The input to the chain is a dictionary with 'question' and 'context_docs'.
-            # The 'context' key is populated by calling the _format_context method.
-            # The 'question' key is passed through directly.
-            {"context": self._format_context, "question": RunnablePassthrough()}
+            # The input to the chain is a dictionary with the 'question' and the
+            # already packed 'context' (see _prepare).
+            {"context": itemgetter("context"), "question": itemgetter("question")}
             | self.prompt_template
             | self.model
             | StrOutputParser() # Parses the LLM's chat message output into a simple string.
         )
 
-    def _format_context(self, context_data: dict) -> str:
+    def _format_context(self, docs_with_scores: list) -> tuple:
         """
-        A helper method to format the list of retrieved documents into a single,
-        readable string to be injected into the prompt's context.
+        Formats the retrieved documents into the string injected as the prompt's
+        context. With packing enabled, overlapping chunks of a page are merged,
+        repeated sentences dropped and the result kept within the token budget.
+
+        Returns:
+            tuple: (context string, packing stats from context_packer.pack_context).
         """
-        # The input is the dictionary passed from the chain, containing all input variables.
-        docs_with_scores = context_data.get('context_docs', [])
         if not docs_with_scores:
-            return "No context provided."
-            
-        context_parts = []
-        for doc, score in docs_with_scores:
-            source = doc.metadata.get('source', 'N/A')
-            title = doc.metadata.get('title', 'No Title')
-            content = doc.page_content
-            # Each document is clearly marked with its source and title.
-            context_parts.append(f"Source: {source} (Title: {title})\nContent: {content}")
-        
-        # Documents are separated by a clear line for the LLM to distinguish them.
-        return "\n\n---\n\n".join(context_parts)
+            return "No context provided.", {"chunks": 0, "passages": 0, "dropped_sentences": 0,
+                                             "unpacked_tokens": 0, "context_tokens": 0}
+        if CONTEXT_PACKING_ENABLED:
+            return pack_context(docs_with_scores)
+        # Each document is clearly marked with its source and title, separated by a clear line.
+        context = format_unpacked(docs_with_scores)
+        tokens = estimate_tokens(context)
+        return context, {"chunks": len(docs_with_scores), "passages": len(docs_with_scores),
+                         "dropped_sentences": 0, "unpacked_tokens": tokens, "context_tokens": tokens}
+
+    def _prepare(self, query: str, context_docs: list) -> tuple:
+        """Returns the chain input for a query and the packing stats to log with it."""
+        context, stats = self._format_context(context_docs)
+        prompt_overhead = estimate_tokens(self.prompt_template.format(context="", question=query))
+        stats["prompt_tokens"] = prompt_overhead + stats["context_tokens"]
+        stats["unpacked_prompt_tokens"] = prompt_overhead + stats["unpacked_tokens"]
+        return {"question": query, "context": context}, stats
+
+    @staticmethod
+    def _log_request(stats: dict, started: float):
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        print(f"LLM request: prompt ~{stats['prompt_tokens']} tokens (~{stats['unpacked_prompt_tokens']} unpacked), "
+              f"{stats['chunks']} chunks packed into {stats['passages']} passages, "
+              f"{stats['dropped_sentences']} repeated sentences dropped, {elapsed_ms:.0f} ms end-to-end.")
+
+    def generate(self, query: str, context_docs: list) -> str:
+        """
+        Invokes the RAG chain and returns the answer, letting API errors propagate.
+        Use this instead of get_response when the caller needs to tell a real
+        answer apart from a failure (e.g. before caching it).
+        """
+        if not context_docs:
+            return NO_CONTEXT_ANSWER
+
+        started = time.perf_counter()
+        # The chain is invoked with a dictionary matching the inputs defined in its construction.
+        chain_input, stats = self._prepare(query, context_docs)
+        try:
+            return self.chain.invoke(chain_input)
+        finally:
+            self._log_request(stats, started)
+
+    async def agenerate(self, query: str, context_docs: list) -> str:
+        """
+        Async counterpart of generate(). Uses the chain's native async invocation, so
+        waiting on Gemini does not tie up a worker thread.
+        """
+        if not context_docs:
+            return NO_CONTEXT_ANSWER
+
+        started = time.perf_counter()
+        chain_input, stats = self._prepare(query, context_docs)
+        try:
+            return await self.chain.ainvoke(chain_input)
+        finally:
+            self._log_request(stats, started)
+
+    async def astream(self, query: str, context_docs: list):
+        """
+        Streams the answer as an async iterator of text fragments, yielding each one
+        as soon as the model produces it. API errors propagate to the caller.
+        """
+        if not context_docs:
+            yield NO_CONTEXT_ANSWER
+            return
+
+        started = time.perf_counter()
+        chain_input, stats = self._prepare(query, context_docs)
+        try:
+            async for token in self.chain.astream(chain_input):
+                yield token
+        finally:
+            self._log_request(stats, started)
 
     def get_response(self, query: str, context_docs: list) -> str:
         """
@@ -98,18 +166,9 @@ class LLMHandler:
         Returns:
             str: The final, LLM-generated answer as a string.
         """
-        if not context_docs:
-            return "I could not find any relevant information in the knowledge base to answer your question."
-        
         try:
-            # The chain is invoked with a dictionary matching the inputs defined in its construction.
-            # The _format_context method expects 'context_docs', and the prompt expects 'question'.
-            # We pass the question through the `RunnablePassthrough` by providing it again at the top level.
-            return self.chain.invoke({
-                "question": query,
-                "context_docs": context_docs
-            })
+            return self.generate(query, context_docs)
         except Exception as e:
             # Catch potential API errors (e.g., rate limits, network issues) from Google AI.
             print(f"ERROR: An error occurred while calling the Google Gemini API: {e}")
-            return "Sorry, I encountered an error while communicating with the AI service. Please try your question again later."
\ No newline at end of file
+            return ERROR_ANSWER
\ No newline at end of file
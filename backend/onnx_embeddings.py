@@ -0,0 +1,166 @@
+"""
+The embedding model exported to ONNX and run with ONNX Runtime on CPU.
+
+A sentence-transformers model such as all-MiniLM-L6-v2 is a transformer encoder
+followed by mean pooling and (for this model) L2 normalization. Only the encoder
+is exported, once, with torch.onnx; pooling and normalization are done here in
+numpy, so the vectors match those of HuggingFaceEmbeddings. The int8 variant is
+the same export with its weights dynamically quantized to int8 by ONNX Runtime,
+which trades a little accuracy for much faster CPU inference
+(see benchmark_embedding_backend.py).
+
+Usage:
+    python -m backend.onnx_embeddings export [--int8]
+"""
+import argparse
+import json
+import threading
+from pathlib import Path
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+try:
+    # Try relative import first (when run as module)
+    from .config import EMBEDDING_MODEL_NAME, ONNX_MODEL_DIR, ONNX_THREADS
+except ImportError:
+    # Fall back to absolute import (when run directly)
+    from config import EMBEDDING_MODEL_NAME, ONNX_MODEL_DIR, ONNX_THREADS
+
+MODEL_FILE = "model.onnx"
+INT8_MODEL_FILE = "model_int8.onnx"
+# Pooling settings of the exported model, written next to it.
+POOLING_FILE = "pooling.json"
+# Texts encoded per forward pass; texts are sorted by length first to minimise padding.
+_BATCH_SIZE = 32
+
+def model_dir(model_name: str = EMBEDDING_MODEL_NAME) -> Path:
+    return ONNX_MODEL_DIR / model_name
+
+def export_model(model_name: str = EMBEDDING_MODEL_NAME, int8: bool = False) -> Path:
+    """
+    Exports the encoder of `model_name` to ONNX (and quantizes it with `int8`)
+    unless that was done before. Returns the path of the model file.
+    """
+    out_dir = model_dir(model_name)
+    fp32_path = out_dir / MODEL_FILE
+    if not fp32_path.exists():
+        import torch
+        from sentence_transformers import SentenceTransformer
+        from sentence_transformers.models import Normalize
+
+        print(f"Exporting '{model_name}' to ONNX in {out_dir}...")
+        out_dir.mkdir(parents=True, exist_ok=True)
+        # Resolved like HuggingFaceEmbeddings does: a bare name is a sentence-transformers model.
+        model = SentenceTransformer(model_name, device="cpu")
+        encoder = model[0].auto_model.eval()
+        model.tokenizer.save_pretrained(str(out_dir))
+        example = model.tokenizer(["An example sentence."], return_tensors="pt")
+        input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in example]
+
+        class Encoder(torch.nn.Module):
+            """The transformer returning only its last hidden state."""
+            def __init__(self):
+                super().__init__()
+                self.encoder = encoder
+
+            def forward(self, *inputs):
+                return self.encoder(**dict(zip(input_names, inputs))).last_hidden_state
+
+        tmp_path = out_dir / (MODEL_FILE + ".tmp")
+        with torch.no_grad():
+            torch.onnx.export(
+                Encoder(), tuple(example[name] for name in input_names), str(tmp_path),
+                input_names=input_names, output_names=["last_hidden_state"],
+                dynamic_axes={name: {0: "batch", 1: "sequence"} for name in input_names + ["last_hidden_state"]},
+                opset_version=14,
+            )
+        with open(out_dir / POOLING_FILE, 'w', encoding='utf-8') as f:
+            json.dump({
+                "max_seq_length": model.max_seq_length,
+                "normalize": any(isinstance(module, Normalize) for module in model),
+            }, f, indent=2)
+        tmp_path.replace(fp32_path)
+    if not int8:
+        return fp32_path
+
+    int8_path = out_dir / INT8_MODEL_FILE
+    if not int8_path.exists():
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        print(f"Quantizing {fp32_path} to int8...")
+        tmp_path = out_dir / (INT8_MODEL_FILE + ".tmp")
+        quantize_dynamic(str(fp32_path), str(tmp_path), weight_type=QuantType.QInt8)
+        tmp_path.replace(int8_path)
+    return int8_path
+
+class OnnxEmbeddings(Embeddings):
+    """
+    Embeddings computed by the ONNX export of `model_name` (int8-quantized with
+    `int8`), exporting it first if needed. Safe to share between threads.
+    """
+    def __init__(self, model_name: str = EMBEDDING_MODEL_NAME, int8: bool = False, threads: int = ONNX_THREADS):
+        try:
+            import onnxruntime
+        except ImportError as e:
+            raise ImportError(
+                "The ONNX embedding backends need ONNX Runtime: pip install onnxruntime"
+            ) from e
+        from transformers import AutoTokenizer
+
+        path = export_model(model_name, int8=int8)
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = onnxruntime.InferenceSession(str(path), options, providers=["CPUExecutionProvider"])
+        self.input_names = [model_input.name for model_input in self.session.get_inputs()]
+        self.tokenizer = AutoTokenizer.from_pretrained(str(path.parent))
+        with open(path.parent / POOLING_FILE, 'r', encoding='utf-8') as f:
+            pooling = json.load(f)
+        self.max_seq_length = pooling["max_seq_length"]
+        self.normalize = pooling["normalize"]
+        # Fast tokenizers must not be called from two threads at once.
+        self._tokenizer_lock = threading.Lock()
+
+    def _encode_batch(self, texts: list) -> np.ndarray:
+        with self._tokenizer_lock:
+            encoded = self.tokenizer(
+                texts, padding=True, truncation=True, max_length=self.max_seq_length, return_tensors="np"
+            )
+        hidden = self.session.run(None, {name: encoded[name].astype(np.int64) for name in self.input_names})[0]
+        # Mean pooling over the real (not padding) tokens.
+        mask = encoded["attention_mask"][..., None].astype(np.float32)
+        vectors = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        if self.normalize:
+            vectors /= np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+        return vectors
+
+    def encode(self, texts: list) -> np.ndarray:
+        """Returns the float32 vectors of `texts`, in input order."""
+        vectors = None
+        order = np.argsort([-len(text) for text in texts], kind="stable")
+        for start in range(0, len(order), _BATCH_SIZE):
+            positions = order[start:start + _BATCH_SIZE]
+            batch = self._encode_batch([texts[i] for i in positions])
+            if vectors is None:
+                vectors = np.empty((len(texts), batch.shape[1]), dtype=np.float32)
+            vectors[positions] = batch
+        return vectors
+
+    def embed_documents(self, texts: list) -> list:
+        if not texts:
+            return []
+        return self.encode(list(texts)).tolist()
+
+    def embed_query(self, text: str) -> list:
+        return self.encode([text])[0].tolist()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the embedding model to ONNX.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    export_parser = subparsers.add_parser("export", help="Export (and optionally quantize) the embedding model.")
+    export_parser.add_argument("--model", default=EMBEDDING_MODEL_NAME)
+    export_parser.add_argument("--int8", action="store_true", help="Also write the int8-quantized model.")
+    args = parser.parse_args()
+    if args.command == "export":
+        print(f"Model ready at {export_model(args.model, int8=args.int8)}")
@@ -0,0 +1,150 @@
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+from .config import QUERY_CACHE_MAX_ENTRIES, QUERY_CACHE_TTL_SECONDS, QUERY_CACHE_SEMANTIC_THRESHOLD
+from .retrieval import normalize_rows
+
+def normalize_query(query: str) -> str:
+    """Normalizes a query for exact matching: case, whitespace and trailing punctuation."""
+    return " ".join(query.lower().split()).rstrip("?!. ")
+
+class QueryCache:
+    """
+    A two-tier cache of generated answers sitting in front of retrieval and the LLM.
+
+    - The exact tier matches the normalized query text and needs no embedding.
+    - The semantic tier reuses an answer when the query embedding's cosine similarity
+      to a cached query is at least `semantic_threshold`.
+
+    Entries expire after `ttl_seconds` and the least recently used ones are evicted
+    beyond `max_entries`. Every entry is tied to the vector store version it was
+    answered from. `set_version` makes a version current and clears the cache once;
+    while older versions drain after a hot-swap, their lookups miss and their answers
+    are not stored, so they never reset the cache or mix with the current version.
+    Answers retrieved under different metadata filters are kept apart by `scope`
+    (see shards.filters_key); lookups only match entries of the same scope.
+    """
+    def __init__(self, max_entries=QUERY_CACHE_MAX_ENTRIES, ttl_seconds=QUERY_CACHE_TTL_SECONDS, semantic_threshold=QUERY_CACHE_SEMANTIC_THRESHOLD):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.semantic_threshold = semantic_threshold
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # (scope, normalized query) -> (answer, matrix row, expires_at)
+        # Entry vectors for the semantic tier, one preallocated row per entry and updated
+        # in place; rows of evicted entries have scope None and are reused.
+        self._matrix = None
+        self._row_keys = [None] * max_entries
+        self._row_scopes = np.full(max_entries, None, dtype=object)
+        self._free_rows = []
+        self._rows_used = 0
+        self._version = None
+        self.stats = {"exact_hits": 0, "semantic_hits": 0, "misses": 0, "invalidations": 0}
+
+    def set_version(self, version):
+        """Makes `version` the current store version, clearing the cache if it changed."""
+        with self._lock:
+            if version != self._version:
+                if self._entries:
+                    self.stats["invalidations"] += 1
+                self._reset()
+                self._version = version
+
+    def _is_current(self, version) -> bool:
+        # Until a version is set, the first one seen becomes current.
+        if self._version is None:
+            self._version = version
+        return version == self._version
+
+    def _reset(self):
+        self._entries.clear()
+        self._row_keys = [None] * self.max_entries
+        self._row_scopes[:] = None
+        self._free_rows = []
+        self._rows_used = 0
+
+    def _remove(self, key):
+        _, row, _ = self._entries.pop(key)
+        self._row_keys[row] = None
+        self._row_scopes[row] = None
+        self._free_rows.append(row)
+
+    def _evict_expired(self):
+        now = time.monotonic()
+        expired = [key for key, (_, _, expires_at) in self._entries.items() if expires_at <= now]
+        for key in expired:
+            self._remove(key)
+
+    def get_exact(self, query: str, version, scope: str = ""):
+        """Returns the cached answer for this exact (normalized) query, or None."""
+        key = (scope, normalize_query(query))
+        with self._lock:
+            if not self._is_current(version):
+                return None
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.stats["exact_hits"] += 1
+                return entry[0]
+        return None
+
+    def get_semantic(self, query_vector: np.ndarray, version, scope: str = ""):
+        """
+        Returns the answer of the most similar cached query if it is within the
+        cosine threshold, or None. A None result is counted as a cache miss, so
+        call this after get_exact.
+        """
+        with self._lock:
+            if self._is_current(version):
+                self._evict_expired()
+                if self._entries:
+                    used = self._rows_used
+                    similarities = self._matrix[:used] @ normalize_rows(np.asarray(query_vector, dtype=np.float32))
+                    similarities[self._row_scopes[:used] != scope] = -np.inf
+                    best = int(np.argmax(similarities))
+                    if similarities[best] >= self.semantic_threshold:
+                        key = self._row_keys[best]
+                        self._entries.move_to_end(key)
+                        self.stats["semantic_hits"] += 1
+                        return self._entries[key][0]
+            self.stats["misses"] += 1
+        return None
+
+    def put(self, query: str, query_vector: np.ndarray, answer: str, version, scope: str = ""):
+        """Caches an answer for a query and its embedding; answers of an older version are dropped."""
+        key = (scope, normalize_query(query))
+        vector = normalize_rows(np.asarray(query_vector, dtype=np.float32))
+        with self._lock:
+            if not self._is_current(version) or self.max_entries <= 0:
+                return
+            if key in self._entries:
+                row = self._entries[key][1]
+            else:
+                while len(self._entries) >= self.max_entries:
+                    self._remove(next(iter(self._entries)))
+                if self._free_rows:
+                    row = self._free_rows.pop()
+                else:
+                    row = self._rows_used
+                    self._rows_used += 1
+                self._row_keys[row] = key
+                self._row_scopes[row] = scope
+            if self._matrix is None:
+                self._matrix = np.zeros((self.max_entries, vector.shape[-1]), dtype=np.float32)
+            self._matrix[row] = vector
+            self._entries[key] = (answer, row, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+
+    def clear(self):
+        with self._lock:
+            self._reset()
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            lookups = self.stats["exact_hits"] + self.stats["semantic_hits"] + self.stats["misses"]
+            hits = self.stats["exact_hits"] + self.stats["semantic_hits"]
+            return {
+                **self.stats,
+                "entries": len(self._entries),
+                "hit_rate": hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,70 @@
+import numpy as np
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """Scales each row to unit length (rows of zeros are left as they are)."""
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1.0, norms)
+
+def maximal_marginal_relevance(query_vector: np.ndarray, candidate_vectors: np.ndarray, k: int = 4, lambda_mult: float = 0.5,
+                               relevance: np.ndarray = None) -> list:
+    """
+    Selects `k` candidates using Maximal Marginal Relevance.
+
+    Each step picks the candidate that maximises
+        lambda_mult * sim(query, doc) - (1 - lambda_mult) * max(sim(doc, already selected))
+    using cosine similarity. All similarities are computed up front with two matrix
+    products, and the "closest selected document" term is updated incrementally, so
+    the selection loop only does O(fetch_k) NumPy work per pick.
+
+    Args:
+        query_vector (np.ndarray): The query embedding, shape (dim,).
+        candidate_vectors (np.ndarray): Candidate embeddings, shape (n, dim).
+        k (int): The number of candidates to select.
+        lambda_mult (float): 1 favours relevance only, 0 favours diversity only.
+        relevance (np.ndarray): Optional relevance per candidate in [0, 1] to use
+                                instead of cosine similarity to the query (e.g.
+                                fused hybrid scores).
+
+    Returns:
+        list: Indices into `candidate_vectors`, in selection order.
+    """
+    n = len(candidate_vectors)
+    if n == 0 or k <= 0:
+        return []
+    candidates = normalize_rows(np.asarray(candidate_vectors, dtype=np.float32))
+    query = normalize_rows(np.asarray(query_vector, dtype=np.float32))
+    query_similarity = candidates @ query if relevance is None else np.asarray(relevance, dtype=np.float32)
+    pairwise_similarity = candidates @ candidates.T
+
+    first = int(np.argmax(query_similarity))
+    selected = [first]
+    closest_selected = pairwise_similarity[first].copy()
+    available = np.ones(n, dtype=bool)
+    available[first] = False
+    while len(selected) < min(k, n):
+        scores = lambda_mult * query_similarity - (1 - lambda_mult) * closest_selected
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        np.maximum(closest_selected, pairwise_similarity[best], out=closest_selected)
+    return selected
+
+def reciprocal_rank_fusion(rankings, k: int = 60) -> list:
+    """
+    Fuses several rankings of the same items with Reciprocal Rank Fusion: each
+    item scores sum(1 / (k + rank)) over the rankings it appears in (rank from 1).
+    Only ranks are used, so rankings with incomparable scores (BM25, cosine) mix.
+
+    Args:
+        rankings: Lists of hashable items, best first.
+        k (int): Damping constant; larger values flatten the influence of top ranks.
+
+    Returns:
+        list: (item, fused score) tuples, best first.
+    """
+    scores = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda entry: entry[1], reverse=True)
@@ -0,0 +1,38 @@
+"""
+Sentence and line segmentation shared by the chunker and the context packer.
+
+Pure regular expressions, so the API's context packer can use it without
+importing the tokenizer machinery of chunking.py.
+"""
+import re
+
+# A sentence ends at ., ! or ? (plus any closing quotes or brackets) followed by
+# whitespace; a line ends at a line break.
+_BOUNDARY = re.compile(r"[.!?][\"')\]]*\s+|\s*\n\s*")
+_TERMINAL_PUNCTUATION = tuple(".!?:;,")
+_HEADING_MAX_WORDS = 12
+
+def _is_heading(line: str) -> bool:
+    return not line.endswith(_TERMINAL_PUNCTUATION) and len(line.split()) <= _HEADING_MAX_WORDS
+
+def split_segments(text: str) -> list:
+    """
+    Cuts text into sentences and lines.
+
+    Returns:
+        list: (start, end, is_heading) character spans, in order, without
+        whitespace-only segments.
+    """
+    segments, start = [], 0
+    for match in _BOUNDARY.finditer(text):
+        if match.group()[0] in ".!?":
+            end, heading = match.end(), False
+        else:
+            end = match.start()
+            heading = _is_heading(text[start:end].strip())
+        if text[start:end].strip():
+            segments.append((start, end, heading))
+        start = match.end()
+    if text[start:].strip():
+        segments.append((start, len(text), False))
+    return segments
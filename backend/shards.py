@@ -0,0 +1,120 @@
+"""
+Sharded vector store layout and metadata filters.
+
+A store version can be partitioned into shards by chunk metadata (see
+SHARD_KEYS): each shard is a complete store of its own under shards/<name>/,
+and shards.json lists the shards together with the metadata values they hold.
+A search narrowed by filters then only touches the shards that can match, and
+ingestion can rebuild (or reuse) each shard on its own.
+"""
+import hashlib
+import json
+import re
+from pathlib import Path
+from urllib.parse import urlparse
+
+SHARDS_FILE = "shards.json"
+SHARDS_DIR = "shards"
+# Metadata keys that stores can be sharded and queries filtered by.
+FILTER_KEYS = ("content_type", "section")
+
+def url_section(url: str) -> str:
+    """Returns the top-level section of a URL: its first path segment, or 'home'."""
+    segments = [segment for segment in urlparse(url).path.split("/") if segment]
+    return segments[0].lower() if segments else "home"
+
+def shard_values(metadata: dict, shard_keys) -> dict:
+    """The metadata values that decide which shard a chunk belongs to."""
+    return {key: metadata.get(key, "") for key in shard_keys}
+
+def shard_name(values: dict) -> str:
+    """
+    A directory-safe name for the shard holding chunks with these metadata values.
+    Sanitizing can map different values to the same text ("Ocean Data" and
+    "ocean-data"), so a short hash of the raw values keeps the names apart.
+    """
+    if not values:
+        return "all"
+    parts = [re.sub(r"[^a-z0-9_.-]+", "_", str(value).lower()) or "_" for value in values.values()]
+    digest = hashlib.sha1(json.dumps([str(value) for value in values.values()]).encode("utf-8")).hexdigest()[:8]
+    return "-".join(parts + [digest])
+
+def normalize_filters(filters) -> dict:
+    """
+    Validates query filters and returns them as {key: sorted tuple of allowed values}.
+    A filter value may be a single string or a list of strings.
+
+    Raises:
+        ValueError: If a filter key is not one of FILTER_KEYS.
+    """
+    normalized = {}
+    for key, value in (filters or {}).items():
+        if key not in FILTER_KEYS:
+            raise ValueError(f"Unknown filter '{key}'. Choose from: {', '.join(FILTER_KEYS)}.")
+        values = [value] if isinstance(value, str) else list(value)
+        normalized[key] = tuple(sorted(str(v).lower() for v in values))
+    return normalized
+
+def filters_key(filters) -> str:
+    """A canonical string for a set of filters ('' for none), usable as a cache key."""
+    normalized = normalize_filters(filters)
+    return json.dumps(normalized, sort_keys=True) if normalized else ""
+
+def matches_filters(metadata: dict, filters: dict) -> bool:
+    """Whether a chunk's metadata satisfies normalized filters."""
+    return all(str(metadata.get(key, "")).lower() in values for key, values in filters.items())
+
+def split_filters(shard: dict, filters: dict):
+    """
+    Decides a shard's part in a filtered search.
+
+    Returns:
+        tuple: (whether the shard can hold matching chunks at all, the filters that
+               still have to be checked per chunk because the shard is not
+               partitioned by those keys)
+    """
+    residual = {}
+    for key, values in filters.items():
+        if key in shard:
+            if str(shard[key]).lower() not in values:
+                return False, {}
+        else:
+            residual[key] = values
+    return True, residual
+
+def save_shard_list(path, shard_keys, index_type: str, embedding_model: str, embedding_backend: str, shards: list):
+    """
+    Writes shards.json. `shards` is a list of {"name": ..., <shard key>: value, ...};
+    `index_type` is the type that was requested for every shard.
+    """
+    manifest = {
+        "shard_keys": list(shard_keys),
+        "index_type": index_type,
+        "embedding_model": embedding_model,
+        "embedding_backend": embedding_backend,
+        "shards": shards,
+    }
+    with open(Path(path) / SHARDS_FILE, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+
+def load_shard_list(path):
+    """Reads shards.json, or returns None for a store that is not sharded."""
+    shards_file = Path(path) / SHARDS_FILE
+    if not shards_file.exists():
+        return None
+    with open(shards_file, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def store_dirs(path) -> list:
+    """
+    Returns [(shard info, directory), ...] for every store under `path`. An
+    unsharded store is a single entry with an info of {"name": "all"}; a missing
+    store is an empty list.
+    """
+    path = Path(path)
+    shard_list = load_shard_list(path)
+    if shard_list is not None:
+        return [(shard, path / SHARDS_DIR / shard["name"]) for shard in shard_list["shards"]]
+    if (path / "index.faiss").exists():
+        return [({"name": "all"}, path)]
+    return []
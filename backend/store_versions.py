@@ -0,0 +1,93 @@
+"""
+Versioned vector store directories.
+
+Every ingestion run writes a complete store into a new directory under
+VECTOR_STORE_PATH/versions/ and then publishes it by atomically replacing the
+CURRENT pointer file. Readers resolve CURRENT once and keep using that directory,
+so they never see a half-written store, and a running API can switch to a newer
+version without a restart. A version being built holds a BUILDING marker file
+until it is published, so a concurrent run never prunes it. Stores written before
+versioning existed (files directly in VECTOR_STORE_PATH, no CURRENT file) are
+still treated as current.
+"""
+import os
+import shutil
+from datetime import datetime
+from pathlib import Path
+
+try:
+    # Try relative import first (when run as module)
+    from .config import VECTOR_STORE_PATH, STORE_VERSIONS_TO_KEEP
+except ImportError:
+    # Fall back to absolute import (when run directly)
+    from config import VECTOR_STORE_PATH, STORE_VERSIONS_TO_KEEP
+
+CURRENT_FILE = "CURRENT"
+VERSIONS_DIR = "versions"
+BUILDING_FILE = "BUILDING"
+
+def current_version(base=VECTOR_STORE_PATH):
+    """Returns the published version name, or None for an unversioned (legacy) store."""
+    pointer = Path(base) / CURRENT_FILE
+    if not pointer.exists():
+        return None
+    return pointer.read_text(encoding="utf-8").strip() or None
+
+def current_store_path(base=VECTOR_STORE_PATH) -> Path:
+    """Returns the directory holding the currently published store."""
+    version = current_version(base)
+    if version is None:
+        return Path(base)
+    return Path(base) / VERSIONS_DIR / version
+
+def new_version_path(base=VECTOR_STORE_PATH) -> Path:
+    """Creates and returns an empty directory for a new, not yet published, version."""
+    name = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+    path = Path(base) / VERSIONS_DIR / name
+    path.mkdir(parents=True)
+    (path / BUILDING_FILE).touch()
+    return path
+
+def discard_version(path):
+    """Deletes a version directory that was never published (a failed or no-op build)."""
+    shutil.rmtree(path, ignore_errors=True)
+
+def link_files(src, dst):
+    """
+    Fills `dst` with the files of `src` as hard links, so an unchanged part of a
+    store is carried into a new version without copying. Files are copied where
+    hard links are not supported.
+    """
+    dst = Path(dst)
+    dst.mkdir(parents=True, exist_ok=True)
+    for path in Path(src).iterdir():
+        if path.is_file():
+            try:
+                os.link(path, dst / path.name)
+            except OSError:
+                shutil.copy2(path, dst / path.name)
+
+def publish_version(path, base=VECTOR_STORE_PATH):
+    """Atomically makes `path` (a directory created by new_version_path) the current version."""
+    base = Path(base)
+    (Path(path) / BUILDING_FILE).unlink(missing_ok=True)
+    tmp_pointer = base / (CURRENT_FILE + ".tmp")
+    tmp_pointer.write_text(Path(path).name, encoding="utf-8")
+    os.replace(tmp_pointer, base / CURRENT_FILE)
+    print(f"Published vector store version {Path(path).name}")
+
+def prune_versions(base=VECTOR_STORE_PATH, keep=STORE_VERSIONS_TO_KEEP):
+    """
+    Deletes all but the `keep` newest versions (never the current one, nor one
+    another ingestion run is still building). Older versions may still be
+    memory-mapped by an API process that has not switched yet; where the OS
+    refuses to delete them, they are left for the next run.
+    """
+    versions_dir = Path(base) / VERSIONS_DIR
+    if not versions_dir.exists():
+        return
+    current = current_version(base)
+    finished = [path for path in sorted(versions_dir.iterdir(), reverse=True) if not (path / BUILDING_FILE).exists()]
+    for path in finished[keep:]:
+        if path.name != current:
+            shutil.rmtree(path, ignore_errors=True)
@@ -0,0 +1,102 @@
+"""
+ANN Index Benchmark
+
+Builds every supported FAISS index type over the same vectors and reports, per
+index and search setting: recall@k against exact (Flat) search, p50/p99
+single-query search latency, and index memory (serialized size).
+
+Usage:
+    python benchmark_ann_indexes.py [--vectors 100000] [--queries 500] [--k 10]
+
+Vectors come from the built vector store when it exists (a flat index), otherwise
+a synthetic clustered corpus with the MiniLM dimension (384) is generated.
+"""
+
+import argparse
+import time
+
+import faiss
+import numpy as np
+
+from backend.config import INDEX_PARAMS
+from backend.index_factory import create_index, set_search_params
+from backend.shards import store_dirs
+from backend.store_versions import current_store_path
+
+# Search settings swept per index type: (label, nprobe, efSearch).
+SWEEPS = {
+    "flat": [("exact", None, None)],
+    "ivf_flat": [(f"nprobe={n}", n, None) for n in (1, 4, 16, 64)],
+    "hnsw": [(f"efSearch={ef}", None, ef) for ef in (16, 64, 256)],
+    "ivf_pq": [(f"nprobe={n}", n, None) for n in (1, 4, 16, 64)],
+}
+
+def load_vectors(n_vectors, dim=384):
+    shard_vectors = []
+    for _, store_path in store_dirs(current_store_path()):
+        index = faiss.read_index(str(store_path / "index.faiss"))
+        if isinstance(index, faiss.IndexFlat) and index.ntotal:
+            shard_vectors.append(index.reconstruct_n(0, index.ntotal))
+    if shard_vectors:
+        vectors = np.vstack(shard_vectors)
+        print(f"Using {len(vectors)} vectors from {current_store_path()}")
+        return vectors[:n_vectors]
+
+    print(f"Using {n_vectors} synthetic clustered vectors (dim={dim})")
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(256, dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, len(centers), n_vectors)] + 0.3 * rng.normal(size=(n_vectors, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def make_queries(vectors, n_queries):
+    rng = np.random.default_rng(1)
+    queries = vectors[rng.integers(0, len(vectors), n_queries)]
+    queries = queries + 0.05 * rng.normal(size=queries.shape).astype(np.float32)
+    return np.ascontiguousarray(queries, dtype=np.float32)
+
+def search_latencies_ms(index, queries, k):
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        index.search(query.reshape(1, -1), k)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return np.percentile(latencies, 50), np.percentile(latencies, 99)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    vectors = np.ascontiguousarray(load_vectors(args.vectors), dtype=np.float32)
+    queries = make_queries(vectors, args.queries)
+    dim = vectors.shape[1]
+
+    print("\n📐 ANN Index Benchmark")
+    print("=" * 78)
+    print(f"{'index':<10} {'setting':<14} {'recall@' + str(args.k):>10} {'p50 ms':>9} {'p99 ms':>9} {'memory MB':>11} {'build s':>9}")
+
+    ground_truth = None
+    for index_type, sweep in SWEEPS.items():
+        start = time.perf_counter()
+        index = create_index(index_type, dim, INDEX_PARAMS, n_train=len(vectors))
+        if not index.is_trained:
+            index.train(vectors)
+        index.add(vectors)
+        build_seconds = time.perf_counter() - start
+        memory_mb = len(faiss.serialize_index(index)) / 1024 / 1024
+
+        for label, nprobe, ef_search in sweep:
+            set_search_params(index, nprobe=nprobe, ef_search=ef_search)
+            _, found = index.search(queries, args.k)
+            if ground_truth is None:
+                ground_truth = found  # Flat runs first and defines the exact answer.
+            recall = np.mean([
+                len(set(found[i]) & set(ground_truth[i])) / args.k for i in range(len(queries))
+            ])
+            p50, p99 = search_latencies_ms(index, queries, args.k)
+            print(f"{index_type:<10} {label:<14} {recall:>10.3f} {p50:>9.3f} {p99:>9.3f} {memory_mb:>11.1f} {build_seconds:>9.1f}")
+
+if __name__ == "__main__":
+    main()
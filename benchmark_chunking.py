@@ -0,0 +1,86 @@
+"""
+Chunking Benchmark
+
+Splits the same corpus with the previous 800-character RecursiveCharacterTextSplitter
+and with the token-aware TokenChunker, and reports throughput (MB/sec, chunks/sec)
+and the token length of the resulting chunks, counted with the embedding model's
+tokenizer: median, p95, maximum and the share of chunks the encoder would
+truncate (longer than its window).
+
+Usage:
+    python benchmark_chunking.py [--docs 2000] [--repeat 3]
+
+Documents are taken from mosdac_scraper/scraped_data.jsonl when it exists,
+otherwise a synthetic corpus of long, flattened PDF-like pages is generated.
+"""
+
+import argparse
+import itertools
+import statistics
+import time
+
+import numpy as np
+from langchain.docstore.document import Document
+
+from backend.config import SCRAPED_DATA_FILE, CHUNK_MAX_TOKENS
+from backend.data_ingestion import iter_docs_from_jsonl, iter_chunks, _get_text_splitter
+
+def load_docs(n_docs):
+    """Returns `n_docs` scraped documents, or synthetic ones."""
+    if SCRAPED_DATA_FILE.exists():
+        docs = list(itertools.islice(iter_docs_from_jsonl(SCRAPED_DATA_FILE), n_docs))
+        if docs:
+            return docs
+
+    words = ("INSAT-3D satellite ocean rainfall product download HDF5 archive "
+             "SCATSAT-1 wind vector calibration sea surface temperature MOSDAC").split()
+    rng = np.random.default_rng(0)
+    docs = []
+    for i in range(n_docs):
+        sentences = [" ".join(rng.choice(words, size=rng.integers(6, 40))).capitalize() + "."
+                     for _ in range(rng.integers(20, 400))]
+        docs.append(Document(page_content=" ".join(sentences), metadata={"source": f"synthetic/{i}.pdf"}))
+    return docs
+
+def run(splitter, docs, repeat):
+    """Chunks `docs` `repeat` times and returns (chunks, best seconds)."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        chunks = list(iter_chunks(docs, splitter))
+        best = min(best, time.perf_counter() - start)
+    return chunks, best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    docs = load_docs(args.docs)
+    megabytes = sum(len(doc.page_content.encode("utf-8")) for doc in docs) / (1024 * 1024)
+    token_chunker = _get_text_splitter("token")
+    tokenizer = token_chunker.tokenizer
+    splitters = [("recursive (800 chars)", _get_text_splitter("recursive")),
+                 (f"token ({CHUNK_MAX_TOKENS} tokens)", token_chunker)]
+    # Warm up both splitters (and the tokenizer's thread pool) before timing.
+    for _, splitter in splitters:
+        list(iter_chunks(docs[:8], splitter))
+
+    print("\n✂️  Chunking Benchmark")
+    print("=" * 96)
+    print(f"{len(docs)} documents, {megabytes:.1f} MB of text; "
+          f"token counts include special tokens, encoder window {CHUNK_MAX_TOKENS}\n")
+    print(f"{'splitter':<24} {'MB/sec':>8} {'chunks/sec':>11} {'chunks':>8} "
+          f"{'p50 tok':>8} {'p95 tok':>8} {'max tok':>8} {'truncated':>10}")
+    for label, splitter in splitters:
+        chunks, seconds = run(splitter, docs, args.repeat)
+        lengths = sorted(len(ids) for ids in tokenizer([chunk.page_content for chunk in chunks], verbose=False)["input_ids"])
+        truncated = sum(length > CHUNK_MAX_TOKENS for length in lengths) / len(lengths)
+        print(f"{label:<24} {megabytes / seconds:>8.2f} {len(chunks) / seconds:>11.0f} {len(chunks):>8} "
+              f"{statistics.median(lengths):>8.0f} {lengths[int(len(lengths) * 0.95) - 1]:>8} "
+              f"{lengths[-1]:>8} {truncated:>10.1%}")
+    print("\nTruncated: share of chunks longer than the encoder window, whose tail is never embedded.")
+
+if __name__ == "__main__":
+    main()
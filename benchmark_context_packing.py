@@ -0,0 +1,85 @@
+"""
+Context Packing Benchmark
+
+Retrieves context for a set of typical MOSDAC questions from the current vector
+store and compares the prompt context sent to the LLM with and without packing:
+estimated tokens, passages, dropped sentences and packing time. With --llm, each
+question is also answered by Gemini with both contexts to compare end-to-end
+latency (needs GOOGLE_API_KEY and costs two API calls per question).
+
+Usage:
+    python benchmark_context_packing.py [--k 4 8] [--budget 1500] [--llm]
+"""
+
+import argparse
+import statistics
+import time
+
+from backend.config import CONTEXT_TOKEN_BUDGET
+from backend.context_packer import estimate_tokens, format_unpacked, pack_context
+from backend.embeddings import build_embeddings
+from backend.knowledge_base import KnowledgeBase
+
+QUERIES = [
+    "What is MOSDAC?",
+    "How do I download INSAT-3DR imager data?",
+    "Which products are available from SCATSAT-1?",
+    "How can I register for a MOSDAC account?",
+    "What is the spatial resolution of the INSAT-3D sounder?",
+    "Which file formats are satellite products delivered in?",
+    "Where can I find rainfall estimates over India?",
+    "What ocean products does Oceansat-2 provide?",
+]
+
+def answer_ms(llm, query, context):
+    """Answers `query` with a fixed context string and returns the latency in milliseconds."""
+    start = time.perf_counter()
+    llm.chain.invoke({"question": query, "context": context})
+    return (time.perf_counter() - start) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--k", type=int, nargs="+", default=[4, 8])
+    parser.add_argument("--budget", type=int, default=CONTEXT_TOKEN_BUDGET)
+    parser.add_argument("--llm", action="store_true", help="also time Gemini answers with both contexts")
+    args = parser.parse_args()
+
+    kb = KnowledgeBase(embeddings=build_embeddings(cache=False))
+    llm = None
+    if args.llm:
+        from backend.llm_handler import LLMHandler
+        llm = LLMHandler()
+
+    print("\n📦 Context Packing Benchmark")
+    print("=" * 92)
+    print(f"{len(QUERIES)} questions, budget {args.budget} tokens (estimated), {kb.ntotal} chunks in the store\n")
+    header = f"{'k':>3} {'unpacked tok':>13} {'packed tok':>11} {'saved':>7} {'passages':>9} {'dropped':>8} {'pack (ms)':>10}"
+    if llm:
+        header += f" {'LLM before (ms)':>16} {'LLM after (ms)':>15}"
+    print(header)
+    for k in args.k:
+        unpacked, packed, passages, dropped, pack_ms, before_ms, after_ms = [], [], [], [], [], [], []
+        for query in QUERIES:
+            docs = kb.query(query, k=k, fetch_k=max(20, 5 * k))
+            start = time.perf_counter()
+            context, stats = pack_context(docs, args.budget)
+            pack_ms.append((time.perf_counter() - start) * 1000)
+            raw_context = format_unpacked(docs)
+            unpacked.append(estimate_tokens(raw_context))
+            packed.append(stats["context_tokens"])
+            passages.append(stats["passages"])
+            dropped.append(stats["dropped_sentences"])
+            if llm:
+                before_ms.append(answer_ms(llm, query, raw_context))
+                after_ms.append(answer_ms(llm, query, context))
+        line = (f"{k:>3} {statistics.mean(unpacked):>13.0f} {statistics.mean(packed):>11.0f} "
+                f"{1 - sum(packed) / max(sum(unpacked), 1):>7.1%} {statistics.mean(passages):>9.1f} "
+                f"{statistics.mean(dropped):>8.1f} {statistics.median(pack_ms):>10.2f}")
+        if llm:
+            line += f" {statistics.median(before_ms):>16.0f} {statistics.median(after_ms):>15.0f}"
+        print(line)
+    print("\nTokens are per question (mean), estimated from characters; latencies are medians.")
+    kb.close()
+
+if __name__ == "__main__":
+    main()
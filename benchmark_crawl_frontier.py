@@ -0,0 +1,213 @@
+"""
+Crawl Frontier Benchmark
+
+Serves a local mock of the MOSDAC site with the usual waste for a crawler: links
+with fragments, tracking parameters and trailing-slash variants, login and search
+pages, and an endless event calendar, next to the pages worth indexing (product
+pages, FAQ entries and PDFs). Crawls it twice under the same page budget:
+
+- baseline: no canonicalization or prioritization, fixed DOWNLOAD_DELAY,
+- frontier: canonical URLs, skip patterns, prioritized frontier and AutoThrottle
+  (the settings in mosdac_scraper/settings.py),
+
+and reports pages downloaded, unique content collected, how many of the content
+pages were reached, and the crawl time.
+
+Usage:
+    python benchmark_crawl_frontier.py [--budget 150] [--products 60] [--faq 40] [--latency 0.05] [--scale 0.1]
+
+--scale multiplies every delay (DOWNLOAD_DELAY and the AutoThrottle delays) of
+both runs, so the benchmark finishes in reasonable time; the server answers each
+request after --latency seconds.
+"""
+
+import argparse
+import hashlib
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import fitz
+from scrapy import signals
+from scrapy.crawler import CrawlerRunner
+from scrapy.settings import Settings
+from twisted.internet import defer, reactor
+
+from backend.config import MOSDAC_SCRAPER_DIR
+
+sys.path.insert(0, str(MOSDAC_SCRAPER_DIR))
+from mosdac_scraper.spiders.mosdac_spider import MosdacSpider  # noqa: E402
+
+WORDS = ("INSAT-3D satellite ocean rainfall product download HDF5 archive SCATSAT-1 wind vector "
+         "calibration sea surface temperature MOSDAC imager sounder radiance channel").split()
+
+def text(seed, n=200):
+    return " ".join(WORDS[(seed * 7 + j) % len(WORDS)] for j in range(n)) + f" {seed}."
+
+def html(title, body, links):
+    anchors = "".join(f"<a href='{link}'>{link}</a> " for link in links)
+    return f"<html><head><title>{title}</title></head><body><main><p>{body}</p>{anchors}</main></body></html>".encode()
+
+def make_pdf(seed):
+    doc = fitz.open()
+    for p in range(3):
+        doc.new_page().insert_text((36, 36), text(seed * 10 + p, 120), fontsize=7)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+class MockSite:
+    def __init__(self, n_products, n_faq):
+        self.n_products, self.n_faq = n_products, n_faq
+        self.pdfs = {i: make_pdf(i) for i in range(n_products)}
+
+    def page(self, path, query):
+        """Returns (content type, body) for a request, or None for a 404."""
+        path = path.rstrip("/") or "/"
+        parts = path.strip("/").split("/")
+        if path == "/":
+            return "text/html", html("MOSDAC", text(0), [
+                "/news/", "/calendar?month=0", "/user/login?destination=/", "/search?q=insat",
+                "/?utm_source=home", "/products/", "/faq#top"])
+        if path == "/products":
+            links = [f"/products/p{i}/" for i in range(self.n_products)]
+            links += [f"/products/p{i}?utm_source=list" for i in range(self.n_products)]
+            return "text/html", html("Products", text(1), links)
+        if parts[0] == "products" and len(parts) == 2:
+            i = int(parts[1][1:])
+            return "text/html", html(f"Product {i}", text(100 + i), [
+                f"/docs/p{i}.pdf", f"/products/p{i}#specs", "/products/", f"/calendar?month={i}"])
+        if parts[0] == "docs":
+            return "application/pdf", self.pdfs[int(parts[1][1:-4])]
+        if path == "/faq":
+            links = [f"/faq/q{j}" for j in range(self.n_faq)] + [f"/faq#q{j}" for j in range(self.n_faq)]
+            return "text/html", html("FAQ", text(2), links)
+        if parts[0] == "faq" and len(parts) == 2:
+            j = int(parts[1][1:])
+            return "text/html", html(f"FAQ {j}", text(1000 + j), ["/faq/"])
+        if path == "/calendar":
+            # An endless calendar: every month links to the next and previous one and to its events.
+            month = int(query.get("month", ["0"])[0])
+            links = [f"/calendar?month={month + 1}", f"/calendar?month={month - 1}"]
+            links += [f"/events/{month}/e{k}" for k in range(5)]
+            return "text/html", html(f"Calendar {month}", f"Events in month {month}.", links)
+        if parts[0] == "events":
+            return "text/html", html("Event", f"Event {parts[1]} {parts[2]}.", ["/calendar?month=0"])
+        if path == "/news":
+            return "text/html", html("News", text(3), [f"/news/n{i}?utm_source=news" for i in range(30)])
+        if parts[0] == "news":
+            return "text/html", html("News item", f"News item {parts[1]}.", ["/news/"])
+        if parts[0] in ("user", "search"):
+            return "text/html", html("Form", "Please log in.", ["/"])
+        return None
+
+    def is_content(self, path):
+        """Whether a page is one worth indexing (a product page, FAQ entry or PDF)."""
+        parts = urlsplit(path).path.rstrip("/").strip("/").split("/")
+        return len(parts) == 2 and parts[0] in ("products", "faq", "docs")
+
+    def n_content(self):
+        return 2 * self.n_products + self.n_faq
+
+def serve(site, latency):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(latency)
+            url = urlsplit(self.path)
+            try:
+                page = site.page(url.path, parse_qs(url.query))
+            except (ValueError, KeyError, IndexError):
+                page = None
+            if page is None:
+                self.send_error(404)
+                return
+            content_type, body = page
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+class BenchmarkSpider(MosdacSpider):
+    name = "mosdac_benchmark"
+    allowed_domains = ["127.0.0.1"]
+
+@defer.inlineCallbacks
+def crawl(base_url, frontier, budget, scale):
+    settings = Settings()
+    settings.setmodule("mosdac_scraper.settings")
+    overrides = {"ROBOTSTXT_OBEY": False, "LOG_LEVEL": "WARNING"}
+    if frontier:
+        overrides.update({
+            "CRAWL_BUDGET": budget,
+            "DOWNLOAD_DELAY": settings.getfloat("DOWNLOAD_DELAY") * scale,
+            "AUTOTHROTTLE_START_DELAY": settings.getfloat("AUTOTHROTTLE_START_DELAY") * scale,
+            "AUTOTHROTTLE_MAX_DELAY": settings.getfloat("AUTOTHROTTLE_MAX_DELAY") * scale,
+        })
+    else:
+        # The previous crawl: every link as found, depth-first, a fixed one-second delay.
+        overrides.update({
+            "FRONTIER_ENABLED": False, "AUTOTHROTTLE_ENABLED": False, "CLOSESPIDER_PAGECOUNT": budget,
+            "DOWNLOAD_DELAY": 1.0 * scale, "CONCURRENT_REQUESTS_PER_DOMAIN": 8,
+            "SCHEDULER_MEMORY_QUEUE": "scrapy.squeues.LifoMemoryQueue",
+            "SCHEDULER_DISK_QUEUE": "scrapy.squeues.PickleLifoDiskQueue",
+        })
+    settings.setdict(overrides, priority="cmdline")
+    runner = CrawlerRunner(settings)
+    crawler = runner.create_crawler(BenchmarkSpider)
+    items = []
+    crawler.signals.connect(lambda item, **_: items.append(dict(item)), signal=signals.item_scraped)
+    start = time.perf_counter()
+    yield runner.crawl(crawler, start_urls=[base_url + "/"])
+    elapsed = time.perf_counter() - start
+    return {"time": elapsed, "pages": crawler.stats.get_value("response_received_count", 0), "items": items}
+
+@defer.inlineCallbacks
+def run_all(base_url, budget, scale, results):
+    try:
+        results["baseline"] = yield crawl(base_url, False, budget, scale)
+        results["frontier"] = yield crawl(base_url, True, budget, scale)
+    finally:
+        reactor.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget", type=int, default=150, help="pages each crawl may download")
+    parser.add_argument("--products", type=int, default=60)
+    parser.add_argument("--faq", type=int, default=40)
+    parser.add_argument("--latency", type=float, default=0.05, help="server response time in seconds")
+    parser.add_argument("--scale", type=float, default=0.1, help="multiplier applied to all crawl delays")
+    args = parser.parse_args()
+
+    site = MockSite(args.products, args.faq)
+    server = serve(site, args.latency)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    results = {}
+    reactor.callWhenRunning(run_all, base_url, args.budget, args.scale, results)
+    reactor.run()
+    server.shutdown()
+
+    print("\n🧭 Crawl Frontier Benchmark")
+    print("=" * 86)
+    print(f"Budget {args.budget} pages; {site.n_content()} content pages on the site "
+          f"({args.products} products + their PDFs, {args.faq} FAQ entries)\n")
+    print(f"{'crawl':<10} {'time (s)':>9} {'pages':>7} {'items':>7} {'unique':>7} {'content':>9} {'unique/sec':>11}")
+    for label in ("baseline", "frontier"):
+        result = results[label]
+        unique = {hashlib.sha1(item["content"].encode("utf-8")).hexdigest(): item["url"] for item in result["items"]}
+        content = sum(site.is_content(url[len(base_url):]) for url in unique.values())
+        print(f"{label:<10} {result['time']:>9.2f} {result['pages']:>7} {len(result['items']):>7} {len(unique):>7} "
+              f"{content:>4}/{site.n_content():<4} {len(unique) / result['time']:>11.1f}")
+    print("\nunique: items with distinct content; content: distinct product pages, PDFs and FAQ entries collected.")
+
+if __name__ == "__main__":
+    main()
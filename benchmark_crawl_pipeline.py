@@ -0,0 +1,185 @@
+"""
+Crawl Pipeline Benchmark
+
+Serves a local mock of the MOSDAC site (HTML pages, some of them exact copies of
+others under a different URL) and measures the way from crawl to embedded chunks
+three times:
+
+- feed:           the previous flow; items go to one uncompressed JSON Lines feed,
+                  which ingestion then reads, chunks and embeds,
+- pipeline:       CrawlOutputPipeline chunks and dedupes during the crawl into gzip
+                  shards, which ingestion reads and embeds without chunking,
+- pipeline+embed: the pipeline also embeds the chunks during the crawl
+                  (CRAWL_OUTPUT_EMBED), so ingestion finds them in the embedding cache.
+
+Reports crawl time, output size, chunks, the ingestion work left after the crawl
+(reading + chunking, embedding) and the total time until every chunk has a vector.
+
+Usage:
+    python benchmark_crawl_pipeline.py [--pages 200] [--words 1500] [--duplicates 0.1] [--latency 0.05]
+
+Crawl-time embedding writes to a temporary embedding cache, not the project's.
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Must be set before the backend config is imported.
+CACHE_DIR = tempfile.mkdtemp(prefix="mosdac-benchmark-cache-")
+os.environ["EMBEDDING_CACHE_PATH"] = os.path.join(CACHE_DIR, "embeddings.sqlite3")
+
+from scrapy.crawler import CrawlerRunner  # noqa: E402
+from scrapy.settings import Settings  # noqa: E402
+from twisted.internet import defer, reactor  # noqa: E402
+
+from backend.config import MOSDAC_SCRAPER_DIR, INGEST_BATCH_SIZE  # noqa: E402
+from backend.crawl_output import crawl_output_path, load_manifest  # noqa: E402
+from backend.data_ingestion import (  # noqa: E402
+    iter_docs_from_jsonl, iter_chunks, iter_batches, _get_text_splitter, _is_prechunked,
+)
+from backend.embeddings import build_embeddings  # noqa: E402
+
+sys.path.insert(0, str(MOSDAC_SCRAPER_DIR))
+from mosdac_scraper.spiders.mosdac_spider import MosdacSpider  # noqa: E402
+
+WORDS = ("INSAT-3D satellite ocean rainfall product download HDF5 archive SCATSAT-1 wind vector "
+         "calibration sea surface temperature MOSDAC imager sounder radiance channel").split()
+
+def page_text(i, n_words):
+    sentences = []
+    for s in range(n_words // 15):
+        sentences.append(" ".join(WORDS[(i * 31 + s * 7 + j * 3) % len(WORDS)] for j in range(15)) + f" {i}-{s}.")
+    return " ".join(sentences)
+
+class MockSite:
+    def __init__(self, n_pages, n_words, duplicates):
+        n_copies = int(n_pages * duplicates)
+        self.bodies = {}
+        for i in range(n_pages):
+            # The last pages repeat the content of the first ones under their own URL.
+            source = i - (n_pages - n_copies) if i >= n_pages - n_copies else i
+            self.bodies[f"/page/{i}"] = (f"<html><head><title>Page {i}</title></head><body><main>"
+                                         f"<p>{page_text(source, n_words)}</p></main></body></html>").encode()
+        links = "".join(f"<li><a href='{path}'>{path}</a></li>" for path in self.bodies)
+        self.bodies["/"] = f"<html><head><title>MOSDAC</title></head><body><main><ul>{links}</ul></main></body></html>".encode()
+
+def serve(site, latency):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(latency)
+            body = site.bodies.get(self.path)
+            if body is None:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+class BenchmarkSpider(MosdacSpider):
+    name = "mosdac_benchmark"
+    allowed_domains = ["127.0.0.1"]
+
+@defer.inlineCallbacks
+def crawl(base_url, flow, output):
+    settings = Settings()
+    settings.setmodule("mosdac_scraper.settings")
+    overrides = {
+        "ROBOTSTXT_OBEY": False, "DOWNLOAD_DELAY": 0, "AUTOTHROTTLE_ENABLED": False,
+        "CONCURRENT_REQUESTS_PER_DOMAIN": 8, "LOG_LEVEL": "ERROR",
+    }
+    if flow == "feed":
+        overrides.update({"CRAWL_OUTPUT_ENABLED": False, "FEEDS": {str(output): {"format": "jsonlines"}}})
+    else:
+        overrides.update({"CRAWL_OUTPUT_DIR": str(output), "CRAWL_OUTPUT_EMBED": flow == "pipeline+embed"})
+    settings.setdict(overrides, priority="cmdline")
+    runner = CrawlerRunner(settings)
+    crawler = runner.create_crawler(BenchmarkSpider)
+    start = time.perf_counter()
+    yield runner.crawl(crawler, start_urls=[base_url + "/"])
+    return time.perf_counter() - start
+
+@defer.inlineCallbacks
+def run_all(base_url, tmp, results):
+    try:
+        for flow, output in (("feed", tmp / "scraped_data.jsonl"), ("pipeline", tmp / "crawl_output"),
+                             ("pipeline+embed", tmp / "crawl_output_embedded")):
+            elapsed = yield crawl(base_url, flow, output)
+            # A crawl output directory is read through its published run.
+            results[flow] = {"crawl": elapsed, "output": output if flow == "feed" else crawl_output_path(output)}
+    finally:
+        reactor.stop()
+
+def ingest(source, embeddings):
+    """Returns (chunks, seconds reading and chunking, seconds embedding) for the chunks of `source`."""
+    start = time.perf_counter()
+    docs = iter_docs_from_jsonl(source)
+    chunks = list(docs) if _is_prechunked(source) else list(iter_chunks(docs, _get_text_splitter()))
+    read = time.perf_counter() - start
+    start = time.perf_counter()
+    for batch in iter_batches(chunks, batch_size=INGEST_BATCH_SIZE):
+        embeddings.embed_documents([chunk.page_content for chunk in batch])
+    return len(chunks), read, time.perf_counter() - start
+
+def output_mb(output):
+    if output.is_file():
+        return output.stat().st_size / (1024 * 1024)
+    return sum(shard["bytes"] for shard in load_manifest(output)["shards"]) / (1024 * 1024)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--words", type=int, default=1500, help="words per page")
+    parser.add_argument("--duplicates", type=float, default=0.1, help="share of pages copying another page")
+    parser.add_argument("--latency", type=float, default=0.05, help="server response time in seconds")
+    args = parser.parse_args()
+
+    site = MockSite(args.pages, args.words, args.duplicates)
+    server = serve(site, args.latency)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    results = {}
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            reactor.callWhenRunning(run_all, base_url, Path(tmp), results)
+            reactor.run()
+            server.shutdown()
+
+            print("Loading the embedding model...")
+            uncached, cached = build_embeddings(cache=False, remote=False), build_embeddings(cache=True, remote=False)
+            for flow, result in results.items():
+                embeddings = cached if flow == "pipeline+embed" else uncached
+                result["mb"] = output_mb(result["output"])
+                result["chunks"], result["read"], result["embed"] = ingest(result["output"], embeddings)
+            cached.close()
+    finally:
+        shutil.rmtree(CACHE_DIR, ignore_errors=True)
+
+    print("\n🧱 Crawl Pipeline Benchmark")
+    print("=" * 86)
+    print(f"{args.pages} pages of ~{args.words} words, {args.duplicates:.0%} exact copies; "
+          f"{args.latency * 1000:.0f} ms per response\n")
+    print(f"{'flow':<15} {'crawl (s)':>10} {'output (MB)':>12} {'chunks':>8} {'read+chunk (s)':>15} "
+          f"{'embed (s)':>10} {'total (s)':>10}")
+    for flow, result in results.items():
+        total = result["crawl"] + result["read"] + result["embed"]
+        print(f"{flow:<15} {result['crawl']:>10.2f} {result['mb']:>12.2f} {result['chunks']:>8} "
+              f"{result['read']:>15.2f} {result['embed']:>10.2f} {total:>10.2f}")
+    print("\nread+chunk and embed: ingestion work left once the crawl has finished.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Near-Duplicate Dedupe Benchmark
+
+Chunks the scraped JSONL exactly like ingestion, runs the SimHash near-duplicate
+stage, and compares embedding every chunk with embedding only the canonical
+chunks: dedupe ratio, time spent fingerprinting, embedding time and the size of
+the resulting flat FAISS index.
+
+Usage:
+    python benchmark_dedupe.py [--limit 5000] [--max-hamming 3]
+
+Requires scraped data (mosdac_scraper/scraped_data.jsonl). The embedding cache is
+disabled so both runs pay for the encoder.
+"""
+
+import argparse
+import itertools
+import time
+
+import faiss
+import numpy as np
+
+from backend.config import SCRAPED_DATA_FILE, DEDUPE_SHINGLE_SIZE
+from backend.data_ingestion import _get_text_splitter, iter_chunks, iter_docs_from_jsonl
+from backend.dedupe import NearDuplicateIndex
+from backend.embeddings import build_embeddings
+
+def embed_and_index(embeddings, texts, batch_size=64):
+    """Embeds `texts` in batches and returns (seconds, serialized flat index size in MB)."""
+    start = time.perf_counter()
+    vectors = []
+    for i in range(0, len(texts), batch_size):
+        vectors.extend(embeddings.embed_documents(texts[i:i + batch_size]))
+    seconds = time.perf_counter() - start
+    vectors = np.asarray(vectors, dtype=np.float32)
+    index = faiss.IndexFlatL2(vectors.shape[1])
+    index.add(vectors)
+    return seconds, len(faiss.serialize_index(index)) / (1024 * 1024)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--limit", type=int, default=5000, help="number of chunks to benchmark on")
+    parser.add_argument("--max-hamming", type=int, default=3)
+    args = parser.parse_args()
+
+    if not SCRAPED_DATA_FILE.exists():
+        print(f"❌ {SCRAPED_DATA_FILE} not found. Run the scraper first.")
+        return
+    chunks = list(itertools.islice(iter_chunks(iter_docs_from_jsonl(SCRAPED_DATA_FILE), _get_text_splitter()), args.limit))
+    texts = [chunk.page_content for chunk in chunks]
+
+    index = NearDuplicateIndex(max_hamming=args.max_hamming, shingle_size=DEDUPE_SHINGLE_SIZE)
+    start = time.perf_counter()
+    canonical = [text for i, text in enumerate(texts) if index.add(str(i), text) == str(i)]
+    dedupe_seconds = time.perf_counter() - start
+
+    embeddings = build_embeddings(cache=False)
+    embeddings.embed_documents(texts[:8])  # Load and warm up the encoder before timing.
+    all_seconds, all_mb = embed_and_index(embeddings, texts)
+    dedup_seconds, dedup_mb = embed_and_index(embeddings, canonical)
+
+    print("\n🧬 Near-Duplicate Dedupe Benchmark")
+    print("=" * 70)
+    print(f"Chunks: {len(texts)}, canonical after dedupe: {len(canonical)} "
+          f"(dedupe ratio {index.ratio:.1%}, max Hamming distance {args.max_hamming})")
+    print(f"Fingerprinting: {dedupe_seconds:.2f}s ({len(texts) / dedupe_seconds:.0f} chunks/sec)\n")
+    print(f"{'pipeline':<20} {'chunks':>8} {'embed (s)':>10} {'index (MB)':>11}")
+    print(f"{'no dedupe':<20} {len(texts):>8} {all_seconds:>10.1f} {all_mb:>11.2f}")
+    print(f"{'SimHash dedupe':<20} {len(canonical):>8} {dedup_seconds + dedupe_seconds:>10.1f} {dedup_mb:>11.2f}")
+    print(f"\nEmbedding time saved: {1 - (dedup_seconds + dedupe_seconds) / all_seconds:.1%} "
+          f"(fingerprinting included), index size saved: {1 - dedup_mb / all_mb:.1%}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Docstore Load Benchmark
+
+Compares loading the vector store's documents from the pickled LangChain
+docstore (index.pkl) with opening the memory-mapped docstore.bin. Each variant
+runs in a fresh Python process and reports load time, resident memory split
+into private (anonymous) and shared (file-backed) pages, and the latency of
+reading random documents by position.
+
+Usage:
+    python benchmark_docstore.py [--lookups 2000]
+
+Run `python -m backend.docstore migrate` first if docstore.bin does not exist.
+Memory figures are read from /proc and are only available on Linux.
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+
+from backend.shards import store_dirs
+from backend.store_versions import current_store_path
+
+# Runs inside a child process; prints one JSON line of measurements.
+CHILD_SCRIPT = r"""
+import json, pickle, random, sys, time
+
+def memory_kb():
+    fields = {}
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key in ("RssAnon", "RssFile", "VmRSS"):
+                    fields[key] = int(value.split()[0])
+    except OSError:
+        pass
+    return fields
+
+variant, path, lookups = sys.argv[1], sys.argv[2], int(sys.argv[3])
+import langchain.docstore.document  # Import cost is excluded from the load time.
+sys.path.insert(0, ".")
+from backend.docstore import MmapDocstore
+before = memory_kb()
+start = time.perf_counter()
+if variant == "pickle":
+    with open(path + "/index.pkl", "rb") as f:
+        docstore, index_to_id = pickle.load(f)
+    count = len(index_to_id)
+    get = lambda i: docstore.search(index_to_id[i])
+else:
+    store = MmapDocstore(path + "/docstore.bin")
+    count = len(store)
+    get = store.get
+load_seconds = time.perf_counter() - start
+positions = [random.randrange(count) for _ in range(lookups)]
+start = time.perf_counter()
+for i in positions:
+    get(i)
+lookup_us = (time.perf_counter() - start) / lookups * 1e6
+after = memory_kb()
+print(json.dumps({
+    "count": count,
+    "load_ms": load_seconds * 1000,
+    "lookup_us": lookup_us,
+    "anon_mb": (after.get("RssAnon", 0) - before.get("RssAnon", 0)) / 1024,
+    "file_mb": (after.get("RssFile", 0) - before.get("RssFile", 0)) / 1024,
+}))
+"""
+
+def run_variant(variant, store_path, lookups):
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD_SCRIPT, variant, str(store_path), str(lookups)],
+        check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lookups", type=int, default=2000)
+    args = parser.parse_args()
+
+    dirs = store_dirs(current_store_path())
+    if not dirs:
+        print(f"❌ No vector store found at {current_store_path()}.")
+        return
+    # Measure the largest shard; the others behave the same, only smaller.
+    store_path = max((path for _, path in dirs), key=lambda path: (path / "index.faiss").stat().st_size)
+    for required in ("index.pkl", "docstore.bin"):
+        if not (store_path / required).exists():
+            print(f"❌ {store_path / required} not found.")
+            return
+
+    print("🗄️ Docstore Load Benchmark")
+    print("=" * 70)
+    print(f"{'docstore':<10} {'docs':>8} {'load ms':>10} {'lookup µs':>11} {'private MB':>12} {'shared MB':>11}")
+    for variant, label in (("pickle", "index.pkl"), ("mmap", "mmap")):
+        r = run_variant(variant, store_path, args.lookups)
+        print(f"{label:<10} {r['count']:>8} {r['load_ms']:>10.1f} {r['lookup_us']:>11.1f} "
+              f"{r['anon_mb']:>12.1f} {r['file_mb']:>11.1f}")
+    print("\nPrivate memory is per worker process; shared (file-backed) pages are shared by all workers.")
+
+if __name__ == "__main__":
+    main()
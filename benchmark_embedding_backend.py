@@ -0,0 +1,125 @@
+"""
+Embedding Backend Benchmark
+
+Compares the embedding backends (see EMBEDDING_BACKEND in backend/config.py) on
+the same corpus and queries:
+
+- query latency: p50 / p95 of embedding one query (what every API request pays),
+- ingestion throughput: chunks/sec embedding the corpus,
+- vector agreement: mean cosine similarity of each chunk's vector with torch's,
+- retrieval agreement: mean overlap of the exact top-k chunks per query with the
+  top-k of the torch backend, both for a store built with the same backend and
+  for torch-built vectors queried with this backend (a mixed store, which the
+  KnowledgeBase refuses across vector spaces).
+
+Usage:
+    python benchmark_embedding_backend.py [--backends torch onnx onnx_int8] [--chunks 2000] [--queries 200] [--k 10]
+
+Chunks are taken from mosdac_scraper/scraped_data.jsonl when it exists, otherwise
+a synthetic corpus is generated. ONNX models are exported on first use.
+"""
+
+import argparse
+import itertools
+import os
+import statistics
+import time
+
+import numpy as np
+
+from backend.config import SCRAPED_DATA_FILE
+from backend.data_ingestion import iter_docs_from_jsonl, iter_chunks, _get_text_splitter
+from backend.embeddings import EMBEDDING_BACKENDS, build_embeddings
+
+QUERIES = [
+    "How do I download INSAT-3D data?",
+    "How to register for a MOSDAC account?",
+    "What is the spatial resolution of SCATSAT-1 wind products?",
+    "Which file formats are available for satellite products?",
+    "Where can I find sea surface temperature data?",
+    "What services does MOSDAC provide?",
+    "How is rainfall estimated from INSAT-3DR?",
+    "Who do I contact for data access problems?",
+]
+
+def load_texts(n_chunks):
+    """Returns `n_chunks` chunk texts from the scraped data, or synthetic ones."""
+    if SCRAPED_DATA_FILE.exists():
+        chunks = iter_chunks(iter_docs_from_jsonl(SCRAPED_DATA_FILE), _get_text_splitter())
+        texts = list(dict.fromkeys(chunk.page_content for chunk in itertools.islice(chunks, n_chunks)))
+        if texts:
+            return texts
+
+    words = ("INSAT-3D satellite ocean rainfall product download HDF5 archive "
+             "SCATSAT-1 wind vector calibration sea surface temperature MOSDAC").split()
+    rng = np.random.default_rng(0)
+    return [" ".join(rng.choice(words, size=120)) for _ in range(n_chunks)]
+
+def make_queries(texts, n_queries):
+    """The sample questions, topped up with the opening words of random chunks."""
+    rng = np.random.default_rng(1)
+    picked = rng.choice(len(texts), size=max(0, n_queries - len(QUERIES)), replace=len(texts) < n_queries)
+    return QUERIES + [" ".join(texts[i].split()[:12]) for i in picked]
+
+def run(backend, texts, queries, repeat):
+    """Embeds the corpus and the queries with `backend`; returns their vectors, chunks/sec and query latencies."""
+    embeddings = build_embeddings(cache=False, remote=False, backend=backend)
+    # Warm up so model loading and first-call allocations are not measured.
+    embeddings.embed_documents(texts[:64])
+    start = time.perf_counter()
+    doc_vectors = np.asarray(embeddings.embed_documents(texts), dtype=np.float32)
+    rate = len(texts) / (time.perf_counter() - start)
+
+    latencies, query_vectors = [], []
+    for _ in range(repeat):
+        query_vectors = []
+        for query in queries:
+            start = time.perf_counter()
+            query_vectors.append(embeddings.embed_query(query))
+            latencies.append((time.perf_counter() - start) * 1000)
+    return doc_vectors, np.asarray(query_vectors, dtype=np.float32), rate, sorted(latencies)
+
+def top_k(query_vectors, doc_vectors, k):
+    """Exact top-k chunk positions per query by inner product (the vectors are normalized)."""
+    scores = query_vectors @ doc_vectors.T
+    return np.argsort(-scores, axis=1)[:, :k]
+
+def overlap(a, b):
+    k = a.shape[1]
+    return float(np.mean([len(set(x) & set(y)) / k for x, y in zip(a, b)]))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", choices=list(EMBEDDING_BACKENDS), default=list(EMBEDDING_BACKENDS))
+    parser.add_argument("--chunks", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=3, help="times each query is embedded for the latency")
+    args = parser.parse_args()
+
+    texts = load_texts(args.chunks)
+    queries = make_queries(texts, args.queries)
+    backends = ["torch"] + [backend for backend in args.backends if backend != "torch"]
+    results = {backend: run(backend, texts, queries, args.repeat) for backend in backends}
+    torch_docs, torch_queries = results["torch"][0], results["torch"][1]
+    reference = top_k(torch_queries, torch_docs, args.k)
+
+    print("\n🧮 Embedding Backend Benchmark")
+    print("=" * 92)
+    print(f"Chunks: {len(texts)} | Queries: {len(queries)} | k = {args.k} | CPU cores: {os.cpu_count()}\n")
+    print(f"{'backend':<10} {'query p50 (ms)':>15} {'query p95 (ms)':>15} {'speedup':>8} {'chunks/sec':>11} "
+          f"{'cosine':>8} {f'top-{args.k} own':>11} {f'top-{args.k} mixed':>13}")
+    torch_p50 = statistics.median(results["torch"][3])
+    for backend in backends:
+        docs, query_vectors, rate, latencies = results[backend]
+        p50, p95 = statistics.median(latencies), latencies[int(len(latencies) * 0.95) - 1]
+        cosine = float(np.mean(np.sum(docs * torch_docs, axis=1)))
+        own = overlap(top_k(query_vectors, docs, args.k), reference)
+        mixed = overlap(top_k(query_vectors, torch_docs, args.k), reference)
+        print(f"{backend:<10} {p50:>15.2f} {p95:>15.2f} {torch_p50 / p50:>7.2f}x {rate:>11.1f} "
+              f"{cosine:>8.4f} {own:>11.1%} {mixed:>13.1%}")
+    print(f"\nown: store and queries both embedded by the backend; mixed: torch-built store, queries by the backend.\n"
+          f"Agreement is measured against torch's own top-{args.k}.")
+
+if __name__ == "__main__":
+    main()
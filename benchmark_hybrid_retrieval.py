@@ -0,0 +1,102 @@
+"""
+Hybrid Retrieval Benchmark
+
+Runs identifier-heavy queries (satellite names, product codes, file formats)
+against the current vector store in three configurations:
+
+- vector search with the default k / fetch_k,
+- vector search with a raised k / fetch_k (the usual workaround today),
+- hybrid BM25 + vector search with the default k / fetch_k,
+
+and reports search latency (query embedding excluded, it is the same for all three)
+and hit rate: the share of queries for which at least one retrieved chunk contains
+the identifier the query asks about.
+
+Usage:
+    python benchmark_hybrid_retrieval.py [--repeat 5] [--k 4] [--fetch-k 20]
+
+Requires a store built with lexical indexes (python backend/data_ingestion.py,
+or python -m backend.lexical_index build for an existing store).
+"""
+
+import argparse
+import re
+import statistics
+import time
+
+from backend.embeddings import build_embeddings
+from backend.knowledge_base import KnowledgeBase
+
+# (query, identifier that a relevant chunk must mention)
+QUERIES = [
+    ("INSAT-3DR imager level 1B data download", "INSAT-3DR"),
+    ("INSAT-3D sounder temperature profiles", "INSAT-3D"),
+    ("SCATSAT-1 wind vector product resolution", "SCATSAT-1"),
+    ("Oceansat-2 OCM chlorophyll product", "Oceansat-2"),
+    ("Megha-Tropiques SAPHIR humidity", "SAPHIR"),
+    ("Kalpana-1 VHRR archive", "Kalpana-1"),
+    ("SARAL AltiKa significant wave height", "AltiKa"),
+    ("EOS-06 ocean colour monitor data", "EOS-06"),
+    ("INSAT-3DS products", "INSAT-3DS"),
+    ("3RIMG_L1B_STD file naming", "3RIMG"),
+    ("Are products available in HDF5?", "HDF5"),
+    ("Can I get data as NetCDF?", "NetCDF"),
+    ("GeoTIFF export of satellite images", "GeoTIFF"),
+    ("OSCAT scatterometer winds", "OSCAT"),
+    ("LST land surface temperature INSAT-3D", "LST"),
+    ("Hydro-Estimator rainfall HEM product", "HEM"),
+]
+
+def squash(text):
+    """Lowercases and drops separators, so 'INSAT 3DR' and 'insat-3dr' compare equal."""
+    return re.sub(r"[^a-z0-9]", "", text.lower())
+
+def run(kb, vectors, k, fetch_k, hybrid, repeat):
+    latencies, hits = [], 0
+    for _ in range(repeat):
+        hits = 0
+        for (query, identifier), vector in zip(QUERIES, vectors):
+            start = time.perf_counter()
+            docs = kb.search_by_vector(vector, k=k, fetch_k=fetch_k, query_text=query if hybrid else None)
+            latencies.append((time.perf_counter() - start) * 1000)
+            target = squash(identifier)
+            if any(target in squash(doc.metadata.get("title", "") + doc.page_content) for doc, _ in docs):
+                hits += 1
+    latencies.sort()
+    return statistics.median(latencies), latencies[int(len(latencies) * 0.95) - 1], hits / len(QUERIES)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--fetch-k", type=int, default=20)
+    parser.add_argument("--wide-k", type=int, default=10, help="k of the raised vector configuration")
+    parser.add_argument("--wide-fetch-k", type=int, default=80, help="fetch_k of the raised vector configuration")
+    args = parser.parse_args()
+
+    kb = KnowledgeBase(embeddings=build_embeddings(cache=False), mode="hybrid")
+    if not kb.hybrid:
+        print("❌ The current store has no lexical index. Run: python -m backend.lexical_index build")
+        return
+    vectors = kb.embed_queries([query for query, _ in QUERIES])
+    # Warm up every path before timing anything.
+    run(kb, vectors, args.k, args.fetch_k, hybrid=True, repeat=1)
+    run(kb, vectors, args.wide_k, args.wide_fetch_k, hybrid=False, repeat=1)
+
+    configs = [
+        (f"vector k={args.k} fetch_k={args.fetch_k}", args.k, args.fetch_k, False),
+        (f"vector k={args.wide_k} fetch_k={args.wide_fetch_k}", args.wide_k, args.wide_fetch_k, False),
+        (f"hybrid k={args.k} fetch_k={args.fetch_k}", args.k, args.fetch_k, True),
+    ]
+    print("\n🔤 Hybrid Retrieval Benchmark")
+    print("=" * 72)
+    print(f"{len(QUERIES)} identifier queries, {kb.ntotal} chunks in {len(kb.shards)} shards")
+    print(f"{'configuration':<32} {'p50 (ms)':>10} {'p95 (ms)':>10} {'hit rate':>10}")
+    for label, k, fetch_k, hybrid in configs:
+        p50, p95, hit_rate = run(kb, vectors, k, fetch_k, hybrid, args.repeat)
+        print(f"{label:<32} {p50:>10.2f} {p95:>10.2f} {hit_rate:>10.0%}")
+    print("\nHit rate: share of queries with at least one retrieved chunk naming the identifier.")
+    kb.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""
+Incremental Crawl Benchmark
+
+Serves a local stand-in for the MOSDAC site (an index page, HTML pages and PDFs,
+with ETag / Last-Modified support) and compares a full crawl with an incremental
+one after part of the site changed:
+
+1. an incremental crawl with empty state, which records the site,
+2. some pages are modified, some removed and some added; one removed page stays
+   linked from the index (a dead link, answered with 404) and one unchanged page
+   starts failing with 503,
+3. a full crawl of the changed site (the previous behaviour),
+4. an incremental crawl of the changed site.
+
+Reports time, bytes downloaded and items emitted for 3 and 4, and checks that the
+incremental crawl emitted exactly the modified, added and removed pages; the page
+answering 503 must not be reported as removed.
+
+Usage:
+    python benchmark_incremental_crawl.py [--pages 300] [--pdfs 20] [--change 0.05] [--no-validators]
+
+With --no-validators the server sends no ETag / Last-Modified, so unchanged pages
+are still downloaded and only their parsing is skipped (by body hash).
+"""
+
+import argparse
+import email.utils
+import hashlib
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import fitz
+from scrapy import signals
+from scrapy.crawler import CrawlerRunner
+from scrapy.settings import Settings
+from twisted.internet import defer, reactor
+
+from backend.config import MOSDAC_SCRAPER_DIR
+
+sys.path.insert(0, str(MOSDAC_SCRAPER_DIR))
+from mosdac_scraper.spiders.mosdac_spider import MosdacSpider  # noqa: E402
+
+WORDS = ("INSAT-3D satellite ocean rainfall product download HDF5 archive SCATSAT-1 wind vector "
+         "calibration sea surface temperature MOSDAC imager sounder radiance channel").split()
+
+def page_html(i, revision, n_pdfs):
+    text = " ".join(WORDS[(i + j + revision) % len(WORDS)] for j in range(3000))
+    return (f"<html><head><title>Page {i}</title></head><body><main><h1>Page {i} rev {revision}</h1>"
+            f"<p>{text}.</p><a href='/docs/doc_{i % n_pdfs}.pdf'>Handbook</a></main></body></html>").encode()
+
+def make_pdf(i, n_pages=30):
+    doc = fitz.open()
+    for p in range(n_pages):
+        page = doc.new_page()
+        page.insert_text((36, 36), "\n".join(" ".join(WORDS[(i + p + k) % len(WORDS)] for k in range(14))
+                                             for _ in range(60)), fontsize=7)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+class Site:
+    """The mock site's pages, {path: (content type, body, last modified)}, replaceable while serving."""
+    def __init__(self, n_pages, n_pdfs):
+        self.n_pdfs = n_pdfs
+        now = time.time() - 86400
+        self.pages = {f"/docs/doc_{i}.pdf": ("application/pdf", make_pdf(i), now) for i in range(n_pdfs)}
+        self.revisions = {i: 0 for i in range(n_pages)}
+        self.dead_links = []
+        self.failing = set()
+        for i in self.revisions:
+            self.pages[f"/page/{i}"] = ("text/html", page_html(i, 0, n_pdfs), now)
+        self.update_index(now)
+
+    def update_index(self, modified):
+        links = "".join(f"<li><a href='/page/{i}'>Page {i}</a></li>" for i in sorted(self.revisions) + self.dead_links)
+        body = f"<html><head><title>MOSDAC</title></head><body><main><ul>{links}</ul></main></body></html>"
+        self.pages["/"] = ("text/html", body.encode(), modified)
+
+    def mutate(self, change):
+        """
+        Modifies, removes and adds `change` of the pages each, keeps a link to the first
+        removed page and makes the first untouched page fail with 503. Returns the sets
+        of modified, removed and added paths and the failing path.
+        """
+        now = time.time()
+        n = max(1, int(len(self.revisions) * change))
+        ids = sorted(self.revisions)
+        modified, removed = ids[:n], ids[n:2 * n]
+        added = list(range(ids[-1] + 1, ids[-1] + 1 + n))
+        for i in modified:
+            self.revisions[i] += 1
+            self.pages[f"/page/{i}"] = ("text/html", page_html(i, self.revisions[i], self.n_pdfs), now)
+        for i in removed:
+            del self.revisions[i]
+            del self.pages[f"/page/{i}"]
+        for i in added:
+            self.revisions[i] = 0
+            self.pages[f"/page/{i}"] = ("text/html", page_html(i, 0, self.n_pdfs), now)
+        self.dead_links = removed[:1]
+        self.failing = {f"/page/{ids[2 * n]}"}
+        self.update_index(now)
+        paths = lambda ids: {f"/page/{i}" for i in ids}
+        return paths(modified) | {"/"}, paths(removed), paths(added), next(iter(self.failing))
+
+def serve(site, validators):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path in site.failing:
+                self.send_error(503)
+                return
+            page = site.pages.get(self.path)
+            if page is None:
+                self.send_error(404)
+                return
+            content_type, body, modified = page
+            etag = '"' + hashlib.sha1(body).hexdigest()[:16] + '"'
+            if validators and self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            if validators:
+                self.send_header("ETag", etag)
+                self.send_header("Last-Modified", email.utils.formatdate(modified, usegmt=True))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+class BenchmarkSpider(MosdacSpider):
+    name = "mosdac_benchmark"
+    allowed_domains = ["127.0.0.1"]
+
+@defer.inlineCallbacks
+def crawl(base_url, incremental, state_path):
+    settings = Settings()
+    settings.setmodule("mosdac_scraper.settings")
+    settings.setdict({
+        "ROBOTSTXT_OBEY": False, "DOWNLOAD_DELAY": 0, "CONCURRENT_REQUESTS": 16,
+        "CONCURRENT_REQUESTS_PER_DOMAIN": 16, "LOG_LEVEL": "WARNING",
+        "INCREMENTAL_CRAWL": incremental, "CRAWL_STATE_PATH": str(state_path),
+    }, priority="cmdline")
+    runner = CrawlerRunner(settings)
+    crawler = runner.create_crawler(BenchmarkSpider)
+    items = []
+    crawler.signals.connect(lambda item, **_: items.append(dict(item)), signal=signals.item_scraped)
+    start = time.perf_counter()
+    yield runner.crawl(crawler, start_urls=[base_url + "/"])
+    elapsed = time.perf_counter() - start
+    return {"time": elapsed, "bytes": crawler.stats.get_value("downloader/response_bytes", 0), "items": items}
+
+@defer.inlineCallbacks
+def run_all(site, base_url, change, results):
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            state_path = Path(tmp) / "crawl_state.sqlite3"
+            yield crawl(base_url, True, state_path)
+            results["expected"] = site.mutate(change)
+            results["full"] = yield crawl(base_url, False, state_path)
+            results["incremental"] = yield crawl(base_url, True, state_path)
+    finally:
+        reactor.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=300)
+    parser.add_argument("--pdfs", type=int, default=20)
+    parser.add_argument("--change", type=float, default=0.05, help="share of pages modified, removed and added")
+    parser.add_argument("--no-validators", action="store_true", help="serve without ETag / Last-Modified")
+    args = parser.parse_args()
+
+    site = Site(args.pages, args.pdfs)
+    server = serve(site, validators=not args.no_validators)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    results = {}
+    reactor.callWhenRunning(run_all, site, base_url, args.change, results)
+    reactor.run()
+    server.shutdown()
+
+    modified, removed, added, failing = results["expected"]
+    full, incremental = results["full"], results["incremental"]
+    print("\n🔁 Incremental Crawl Benchmark")
+    print("=" * 70)
+    print(f"{args.pages} pages + {args.pdfs} PDFs; {len(modified) - 1} modified, {len(removed)} removed, "
+          f"{len(added)} added, 1 failing with 503; validators {'off' if args.no_validators else 'on'}\n")
+    print(f"{'crawl':<14} {'time (s)':>9} {'downloaded (MB)':>16} {'items':>7}")
+    for label, result in (("full", full), ("incremental", incremental)):
+        print(f"{label:<14} {result['time']:>9.2f} {result['bytes'] / (1024 * 1024):>16.2f} {len(result['items']):>7}")
+    print(f"\nSaved: {1 - incremental['time'] / full['time']:.1%} of the time, "
+          f"{1 - incremental['bytes'] / max(full['bytes'], 1):.1%} of the bytes downloaded")
+
+    emitted_changed = {item["url"][len(base_url):] for item in incremental["items"] if not item.get("removed")}
+    emitted_removed = {item["url"][len(base_url):] for item in incremental["items"] if item.get("removed")}
+    if emitted_changed == modified | added and emitted_removed == removed:
+        print("✅ The incremental crawl emitted exactly the modified, added and removed pages.")
+        print(f"✅ The page answering 503 ({failing}) was kept, not reported as removed.")
+    else:
+        print(f"❌ Mismatch: emitted {sorted(emitted_changed ^ (modified | added))} changed and "
+              f"{sorted(emitted_removed ^ removed)} removed pages unexpectedly (or missed them).")
+        if failing in emitted_removed:
+            print(f"❌ The page answering 503 ({failing}) was reported as removed.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Parallel Embedding Benchmark
+
+Measures ingestion embedding throughput (chunks/sec) for an increasing number of
+encoder worker processes and checks that every parallel run produces the same
+vectors, in the same order, as the single-process encoder.
+
+Usage:
+    python benchmark_parallel_embedding.py [--chunks 4000] [--workers 1 2 4 8]
+
+Chunks are taken from mosdac_scraper/scraped_data.jsonl when it exists,
+otherwise a synthetic corpus is generated.
+"""
+
+import argparse
+import itertools
+import os
+import time
+
+import numpy as np
+
+from backend.config import SCRAPED_DATA_FILE
+from backend.data_ingestion import iter_docs_from_jsonl, iter_chunks, _get_text_splitter
+from backend.embeddings import build_embeddings
+
+# Workers may batch texts differently from the single process (different padding),
+# which can perturb the last float bits; anything beyond this is a real mismatch.
+IDENTICAL_TOLERANCE = 1e-5
+
+def load_texts(n_chunks):
+    """Returns `n_chunks` chunk texts from the scraped data, or synthetic ones."""
+    if SCRAPED_DATA_FILE.exists():
+        chunks = iter_chunks(iter_docs_from_jsonl(SCRAPED_DATA_FILE), _get_text_splitter())
+        texts = [chunk.page_content for chunk in itertools.islice(chunks, n_chunks)]
+        if texts:
+            # Repeat the real chunks if the crawl is smaller than the requested corpus.
+            return list(itertools.islice(itertools.cycle(texts), n_chunks))
+
+    words = ("INSAT-3D satellite ocean rainfall product download HDF5 archive "
+             "SCATSAT-1 wind vector calibration sea surface temperature MOSDAC").split()
+    rng = np.random.default_rng(0)
+    return [" ".join(rng.choice(words, size=120)) for _ in range(n_chunks)]
+
+def run(texts, workers):
+    """Embeds `texts` with the given worker count and returns (vectors, chunks/sec)."""
+    embeddings = build_embeddings(workers=workers, cache=False)
+    try:
+        # Warm up the encoder(s) so model loading is not counted as throughput.
+        embeddings.embed_documents(texts[: max(1, workers) * 2])
+        start = time.perf_counter()
+        vectors = embeddings.embed_documents(texts)
+        elapsed = time.perf_counter() - start
+    finally:
+        close = getattr(embeddings, "close", None)
+        if close is not None:
+            close()
+    return np.asarray(vectors, dtype=np.float32), len(texts) / elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=4000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    texts = load_texts(args.chunks)
+    print("⚡ Parallel Embedding Benchmark")
+    print("=" * 60)
+    print(f"Chunks: {len(texts)} | CPU cores: {os.cpu_count()}")
+    print()
+    print(f"{'workers':>8} {'chunks/sec':>12} {'speedup':>9} {'max |diff|':>12} {'identical':>10}")
+
+    baseline_vectors, baseline_rate = run(texts, 1)
+    print(f"{1:>8} {baseline_rate:>12.1f} {1.0:>8.2f}x {0.0:>12.2e} {'yes':>10}")
+
+    for workers in sorted(set(args.workers) - {1}):
+        vectors, rate = run(texts, workers)
+        max_diff = float(np.abs(vectors - baseline_vectors).max())
+        # Vectors are compared position by position, so a shuffled merge shows up as a large diff.
+        identical = vectors.shape == baseline_vectors.shape and max_diff < IDENTICAL_TOLERANCE
+        print(f"{workers:>8} {rate:>12.1f} {rate / baseline_rate:>8.2f}x {max_diff:>12.2e} "
+              f"{'yes' if identical else 'NO':>10}")
+
+if __name__ == "__main__":
+    main()
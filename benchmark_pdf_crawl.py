@@ -0,0 +1,168 @@
+"""
+PDF Crawl Benchmark
+
+Serves a local mock MOSDAC site (HTML pages plus a few heavy, many-page PDFs)
+and crawls it with MosdacSpider twice: once extracting PDF text inline on the
+reactor thread (PDF_EXTRACT_WORKERS = 0, the previous behaviour) and once with
+the worker-process pool. Reports crawl time, pages/sec, and the longest reactor
+stall, i.e. how long the longest blocked window kept every other request waiting.
+
+Usage:
+    python benchmark_pdf_crawl.py [--html-pages 300] [--pdfs 8] [--pdf-pages 200] [--workers 2]
+
+Requires scrapy and PyMuPDF. Download delay and robots.txt are disabled for the
+local site.
+"""
+
+import argparse
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import fitz
+import scrapy
+from scrapy import signals
+from scrapy.crawler import CrawlerRunner
+from scrapy.settings import Settings
+from twisted.internet import defer, reactor, task
+
+from backend.config import MOSDAC_SCRAPER_DIR
+
+sys.path.insert(0, str(MOSDAC_SCRAPER_DIR))
+from mosdac_scraper.spiders.mosdac_spider import MosdacSpider  # noqa: E402
+
+WORDS = ("INSAT-3D satellite ocean rainfall product download HDF5 archive SCATSAT-1 wind vector "
+         "calibration sea surface temperature MOSDAC imager sounder radiance channel").split()
+
+def make_pdf(n_pages, seed):
+    """Returns the bytes of a text-heavy PDF of `n_pages` pages."""
+    doc = fitz.open()
+    for p in range(n_pages):
+        page = doc.new_page()
+        lines = [" ".join(WORDS[(seed + p + i * 7 + j) % len(WORDS)] for j in range(14)) for i in range(70)]
+        page.insert_text((36, 36), "\n".join(lines), fontsize=7)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+def make_site(n_html, n_pdfs, pdf_pages):
+    """Returns {path: (content type, body)} for the mock site."""
+    site = {}
+    for i in range(n_html):
+        text = " ".join(WORDS[(i + j) % len(WORDS)] for j in range(300))
+        site[f"/page/{i}"] = ("text/html", f"<html><head><title>Page {i}</title></head>"
+                                           f"<body><main><p>{text}.</p></main></body></html>".encode())
+    print(f"Generating {n_pdfs} PDFs of {pdf_pages} pages...")
+    for i in range(n_pdfs):
+        site[f"/docs/handbook_{i}.pdf"] = ("application/pdf", make_pdf(pdf_pages, i))
+    return site
+
+def serve(site):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            content_type, body = site.get(self.path, ("text/html", None))
+            if body is None:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+class BenchmarkSpider(MosdacSpider):
+    """Requests every page of the mock site directly, interleaving PDFs with HTML pages."""
+    name = "mosdac_benchmark"
+    allowed_domains = ["127.0.0.1"]
+
+    def start_requests(self):
+        for path in self.paths:
+            if path.endswith(".pdf"):
+                yield scrapy.Request(self.base_url + path, callback=self.parse_pdf)
+            else:
+                yield scrapy.Request(self.base_url + path, callback=self.parse)
+
+@defer.inlineCallbacks
+def crawl(base_url, paths, workers, results):
+    settings = Settings()
+    settings.setmodule("mosdac_scraper.settings")
+    settings.setdict({
+        "ROBOTSTXT_OBEY": False, "DOWNLOAD_DELAY": 0, "CONCURRENT_REQUESTS": 16,
+        "CONCURRENT_REQUESTS_PER_DOMAIN": 16, "LOG_LEVEL": "WARNING", "PDF_EXTRACT_WORKERS": workers,
+    }, priority="cmdline")
+    runner = CrawlerRunner(settings)
+    crawler = runner.create_crawler(BenchmarkSpider)
+    counts = {"html": 0, "pdf": 0}
+    crawler.signals.connect(lambda item, **_: counts.__setitem__(item["content_type"], counts[item["content_type"]] + 1),
+                            signal=signals.item_scraped)
+
+    # A 10 ms heartbeat on the reactor; any gap beyond that is time the reactor was blocked.
+    stall = {"last": time.perf_counter(), "max": 0.0}
+    def beat():
+        now = time.perf_counter()
+        stall["max"] = max(stall["max"], now - stall["last"] - 0.01)
+        stall["last"] = now
+    heartbeat = task.LoopingCall(beat)
+    heartbeat.start(0.01)
+
+    start = time.perf_counter()
+    yield runner.crawl(crawler, base_url=base_url, paths=paths)
+    elapsed = time.perf_counter() - start
+    heartbeat.stop()
+    results.append((workers, elapsed, counts, stall["max"]))
+
+@defer.inlineCallbacks
+def run_all(base_url, paths, worker_counts, results):
+    try:
+        for workers in worker_counts:
+            yield crawl(base_url, paths, workers, results)
+    finally:
+        reactor.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--html-pages", type=int, default=300)
+    parser.add_argument("--pdfs", type=int, default=8)
+    parser.add_argument("--pdf-pages", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args()
+
+    site = make_site(args.html_pages, args.pdfs, args.pdf_pages)
+    server = serve(site)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    html = [path for path in site if not path.endswith(".pdf")]
+    pdfs = [path for path in site if path.endswith(".pdf")]
+    # Spread the PDFs evenly through the crawl.
+    step = max(1, len(html) // max(1, len(pdfs)))
+    paths = []
+    for i, path in enumerate(html):
+        if i % step == 0 and pdfs:
+            paths.append(pdfs.pop())
+        paths.append(path)
+    paths.extend(pdfs)
+
+    results = []
+    reactor.callWhenRunning(run_all, base_url, paths, [0, args.workers], results)
+    reactor.run()
+    server.shutdown()
+
+    pdf_mb = sum(len(body) for path, (_, body) in site.items() if path.endswith(".pdf")) / (1024 * 1024)
+    print("\n📄 PDF Crawl Benchmark")
+    print("=" * 78)
+    print(f"{args.html_pages} HTML pages, {args.pdfs} PDFs x {args.pdf_pages} pages ({pdf_mb:.1f} MB)\n")
+    print(f"{'PDF extraction':<22} {'time (s)':>9} {'pages/sec':>10} {'HTML items':>11} {'PDF items':>10} {'max stall (s)':>14}")
+    for workers, elapsed, counts, max_stall in results:
+        label = "inline (reactor)" if workers == 0 else f"{workers} worker processes"
+        total = counts["html"] + counts["pdf"]
+        print(f"{label:<22} {elapsed:>9.2f} {total / elapsed:>10.1f} {counts['html']:>11} {counts['pdf']:>10} {max_stall:>14.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Retrieval Latency Benchmark
+
+Compares KnowledgeBase.query (one query embedding, one FAISS search, vectorized
+MMR over the fetched candidates) with the previous implementation, which ran
+similarity_search_with_score and then a separate as_retriever(search_type="mmr")
+call, embedding the query and searching the index twice.
+
+Usage:
+    python benchmark_retrieval.py [--repeat 5]
+
+Requires a built vector store (python backend/data_ingestion.py). The embedding
+cache is disabled so both paths pay for the encoder.
+"""
+
+import argparse
+import statistics
+import time
+
+from langchain_community.vectorstores import FAISS
+
+from backend.embeddings import build_embeddings
+from backend.knowledge_base import KnowledgeBase
+from backend.shards import store_dirs
+from backend.store_versions import current_store_path
+
+QUERIES = [
+    "How do I download INSAT-3D data?",
+    "How to register for a MOSDAC account?",
+    "What is the spatial resolution of SCATSAT-1 wind products?",
+    "Which file formats are available for satellite products?",
+    "Where can I find sea surface temperature data?",
+    "What services does MOSDAC provide?",
+    "How is rainfall estimated from INSAT-3DR?",
+    "Who do I contact for data access problems?",
+]
+
+def legacy_query(vector_store, query_text, k=4):
+    """The pre-refactor KnowledgeBase.query: two embeddings, two searches, dummy scores."""
+    vector_store.similarity_search_with_score(query=query_text, k=k)
+    retriever = vector_store.as_retriever(search_type="mmr", search_kwargs={'k': k, 'fetch_k': 20})
+    return [(doc, 0.0) for doc in retriever.invoke(query_text)]
+
+def measure(func, repeat):
+    latencies = []
+    for _ in range(repeat):
+        for query in QUERIES:
+            start = time.perf_counter()
+            func(query)
+            latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    return statistics.median(latencies), latencies[int(len(latencies) * 0.95) - 1]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    embeddings = build_embeddings(cache=False)
+    # Both sides search the same single store: the largest shard of the current version.
+    store_path = max(
+        (path for _, path in store_dirs(current_store_path())), key=lambda path: (path / "index.faiss").stat().st_size
+    )
+    # Vector-only, like the legacy path (see benchmark_hybrid_retrieval.py for hybrid search).
+    kb = KnowledgeBase(embeddings=embeddings, path=store_path, mode="vector")
+    vector_store = FAISS.load_local(str(store_path), embeddings, allow_dangerous_deserialization=True)
+    # Warm up the encoder and the index before timing anything.
+    for query in QUERIES:
+        kb.query(query)
+        legacy_query(vector_store, query)
+
+    print("\n🔎 Retrieval Latency Benchmark")
+    print("=" * 60)
+    legacy_p50, legacy_p95 = measure(lambda q: legacy_query(vector_store, q), args.repeat)
+    new_p50, new_p95 = measure(lambda q: kb.query(q), args.repeat)
+    print(f"{'implementation':<28} {'p50 (ms)':>10} {'p95 (ms)':>10}")
+    print(f"{'legacy (2 embeds, 2 searches)':<28} {legacy_p50:>10.2f} {legacy_p95:>10.2f}")
+    print(f"{'single-pass + NumPy MMR':<28} {new_p50:>10.2f} {new_p95:>10.2f}")
+    print(f"\nSpeedup at p50: {legacy_p50 / new_p50:.2f}x")
+
+    # Both implementations should agree on which documents they return.
+    overlaps = []
+    for query in QUERIES:
+        legacy_ids = {doc.page_content for doc, _ in legacy_query(vector_store, query)}
+        new_ids = {doc.page_content for doc, _ in kb.query(query)}
+        overlaps.append(len(legacy_ids & new_ids) / max(1, len(legacy_ids)))
+    print(f"Result overlap with legacy MMR: {statistics.mean(overlaps):.0%}")
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,25 @@
+import json
+import time
 import streamlit as st
 import requests
 
 st.set_page_config(page_title="MOSDAC AI Help Bot", page_icon="🛰️", layout="wide")
 
 API_URL = "http://127.0.0.1:8000/query"
+STREAM_API_URL = f"{API_URL}/stream"
+
+def iter_sse_events(response):
+    """Yields (event, data) pairs from a server-sent events response."""
+    event, data_lines = "message", []
+    for line in response.iter_lines(decode_unicode=True):
+        if not line:
+            if data_lines:
+                yield event, json.loads("\n".join(data_lines))
+            event, data_lines = "message", []
+        elif line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data_lines.append(line[len("data:"):].strip())
 
 st.title("🛰️ MOSDAC AI Help Bot")
 st.caption("Your intelligent assistant for navigating MOSDAC data and services")
@@ -24,15 +40,37 @@ if prompt := st.chat_input("Ask about satellites, data products, or documentatio
 
     with st.chat_message("assistant"):
         message_placeholder = st.empty()
+        timing_placeholder = st.empty()
         message_placeholder.markdown("Thinking... 🧠")
         
         try:
-            response = requests.post(API_URL, json={"query": prompt}, timeout=120)
-            response.raise_for_status()
-            full_response = response.json()["answer"]
-            message_placeholder.markdown(full_response)
+            started = time.perf_counter()
+            first_token_at = None
+            full_response = ""
+            event = None
+            with requests.post(STREAM_API_URL, json={"query": prompt}, stream=True, timeout=120) as response:
+                response.raise_for_status()
+                for event, data in iter_sse_events(response):
+                    if event in ("error", "done"):
+                        break
+                    if first_token_at is None:
+                        first_token_at = time.perf_counter()
+                    full_response += data["token"]
+                    # Show the answer as it is generated, with a cursor while more is coming.
+                    message_placeholder.markdown(full_response + "▌")
+            finished = time.perf_counter()
+            if event == "error":
+                full_response = data["error"]
+                message_placeholder.error(full_response)
+            else:
+                message_placeholder.markdown(full_response)
+            if first_token_at is not None:
+                timing_placeholder.caption(
+                    f"First token after {(first_token_at - started) * 1000:.0f} ms · "
+                    f"complete after {(finished - started) * 1000:.0f} ms"
+                )
         except requests.exceptions.RequestException as e:
             full_response = f"Error: Could not connect to the backend. Please ensure it's running. Details: {e}"
             message_placeholder.error(full_response)
 
-    st.session_state.messages.append({"role": "assistant", "content": full_response})
\ No newline at end of file
+    st.session_state.messages.append({"role": "assistant", "content": full_response})
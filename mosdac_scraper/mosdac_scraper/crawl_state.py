@@ -0,0 +1,170 @@
+"""
+Crawl state persisted between runs, for incremental crawls.
+
+For every URL the last crawl fetched, the state records its validators (ETag,
+Last-Modified), a hash of the response body, a hash of the extracted content,
+the body size and the links found on it. An incremental crawl uses them to send
+conditional GETs, to skip re-parsing pages whose body has not changed, and to
+emit only items whose content changed. A page recorded by an earlier crawl has
+been removed from the site when it answers 404 or 410, or when a completed crawl
+neither reached it nor found a link to it any more; a page whose fetch merely
+failed (a 5xx, timeout, DNS error or robots.txt block) is kept.
+
+Usage (from mosdac_scraper/):
+    scrapy crawl mosdac -s INCREMENTAL_CRAWL=1 -O changes.jsonl
+    python -m mosdac_scraper.crawl_state merge changes.jsonl scraped_data.jsonl
+
+The merge applies the changed and removed items to the full scrape, which
+`python backend/data_ingestion.py --incremental` then picks up.
+"""
+import argparse
+import json
+import sqlite3
+from pathlib import Path
+
+# Uncommitted writes are flushed after this many, so an interrupted crawl keeps most of its state.
+_COMMIT_EVERY = 100
+
+class CrawlState:
+    """The per-URL state of previous crawls, in an SQLite file. Each open() starts a new run."""
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.path))
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                body_hash TEXT,
+                content_hash TEXT,
+                size INTEGER NOT NULL DEFAULT 0,
+                links TEXT NOT NULL DEFAULT '[]',
+                run INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+        """)
+        row = self._db.execute("SELECT value FROM meta WHERE key = 'run'").fetchone()
+        self.run = (int(row[0]) if row else 0) + 1
+        self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('run', ?)", (str(self.run),))
+        self._db.commit()
+        self._pending = 0
+        self._gone = set()
+
+    def get(self, url: str):
+        """Returns the recorded state of `url` as a dict, or None if it was never crawled."""
+        row = self._db.execute(
+            "SELECT etag, last_modified, body_hash, content_hash, size FROM pages WHERE url = ?", (url,)
+        ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("etag", "last_modified", "body_hash", "content_hash", "size"), row))
+
+    def touch(self, url: str):
+        """Marks `url` as seen by this run without changing what is recorded for it."""
+        self._write("UPDATE pages SET run = ? WHERE url = ?", (self.run, url))
+
+    def mark_gone(self, url: str):
+        """Records that `url` answered 404 or 410 in this run, so it is reported as removed."""
+        self._gone.add(url)
+
+    def record_response(self, url: str, etag, last_modified, body_hash: str, size: int):
+        self._write("""
+            INSERT INTO pages (url, etag, last_modified, body_hash, size, run) VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(url) DO UPDATE SET etag = excluded.etag, last_modified = excluded.last_modified,
+                body_hash = excluded.body_hash, size = excluded.size, run = excluded.run
+        """, (url, etag, last_modified, body_hash, size, self.run))
+
+    def update_content_hash(self, url: str, content_hash: str) -> bool:
+        """Records the hash of the content extracted from `url`. Returns True if it changed."""
+        row = self._db.execute("SELECT content_hash FROM pages WHERE url = ?", (url,)).fetchone()
+        if row is not None and row[0] == content_hash:
+            return False
+        self._write("UPDATE pages SET content_hash = ? WHERE url = ?", (content_hash, url))
+        return True
+
+    def links(self, url: str) -> list:
+        row = self._db.execute("SELECT links FROM pages WHERE url = ?", (url,)).fetchone()
+        return json.loads(row[0]) if row else []
+
+    def set_links(self, url: str, links: list):
+        self._write("UPDATE pages SET links = ? WHERE url = ?", (json.dumps(links), url))
+
+    def removed(self, canonical=None) -> list:
+        """
+        URLs recorded by earlier runs that are gone from the site: those that answered
+        404 or 410 in this run, and those this run did not reach that no page fetched
+        in this run links to any more. Links are compared in their `canonical` form
+        if given (the form requests were made in). Pages whose fetch failed were
+        touched by this run and are not reported.
+        """
+        canonical = canonical or (lambda url: url)
+        linked = set()
+        for (links,) in self._db.execute("SELECT links FROM pages WHERE run = ?", (self.run,)):
+            linked.update(canonical(link) for link in json.loads(links))
+        unreached = {
+            url for (url,) in self._db.execute("SELECT url FROM pages WHERE run < ?", (self.run,))
+            if url not in linked
+        }
+        return sorted(unreached | self._gone)
+
+    def forget(self, urls):
+        self._db.executemany("DELETE FROM pages WHERE url = ?", [(url,) for url in urls])
+        self._db.commit()
+
+    def _write(self, sql, params):
+        self._db.execute(sql, params)
+        self._pending += 1
+        if self._pending >= _COMMIT_EVERY:
+            self._db.commit()
+            self._pending = 0
+
+    def close(self):
+        self._db.commit()
+        self._db.close()
+
+def merge_changes(changes_path, data_path) -> dict:
+    """
+    Applies the items of an incremental crawl to a full scrape in JSON Lines: items
+    marked "removed" are dropped, changed items replace the previous item for their
+    URL and new ones are appended. The file is rewritten next to its location and
+    moved into place, one line at a time, so memory use depends on the changes only.
+
+    Returns:
+        dict: The number of "changed", "removed" and "kept" items.
+    """
+    changes_path, data_path = Path(changes_path), Path(data_path)
+    changes = {}
+    with open(changes_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            item = json.loads(line)
+            changes[item["url"]] = None if item.get("removed") else item
+
+    counts = {"changed": sum(item is not None for item in changes.values()),
+              "removed": sum(item is None for item in changes.values()), "kept": 0}
+    tmp_path = data_path.with_suffix(data_path.suffix + ".tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as out:
+        if data_path.exists():
+            with open(data_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if json.loads(line).get("url") not in changes:
+                        out.write(line)
+                        counts["kept"] += 1
+        for item in changes.values():
+            if item is not None:
+                out.write(json.dumps(item, ensure_ascii=False) + "\n")
+    tmp_path.replace(data_path)
+    return counts
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage incremental MOSDAC crawls.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    merge_parser = subparsers.add_parser("merge", help="Apply an incremental crawl's items to the full scrape.")
+    merge_parser.add_argument("changes")
+    merge_parser.add_argument("data", nargs="?", default="scraped_data.jsonl")
+    args = parser.parse_args()
+    if args.command == "merge":
+        counts = merge_changes(args.changes, args.data)
+        print(f"Merged {args.changes} into {args.data}: {counts['changed']} changed or new, "
+              f"{counts['removed']} removed, {counts['kept']} unchanged.")
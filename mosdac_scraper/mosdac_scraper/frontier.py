@@ -0,0 +1,61 @@
+"""
+URL canonicalization and prioritization for the crawl frontier.
+
+Links on the MOSDAC site reach the same page through many URLs: with and without
+"www.", with fragments, trailing slashes, tracking or session parameters and
+Drupal "destination" redirects. Each variant costs a download (and the download
+delay). canonicalize_url maps them to one URL, so the scheduler's duplicate
+filter sees them as one request and the stored item URL is stable across crawls.
+
+url_priority ranks URLs for Scrapy's priority queue: content-like URLs (PDFs,
+FAQ, product and documentation pages) first, shallow before deep, so a budgeted
+crawl spends its budget on the pages most worth indexing.
+"""
+import fnmatch
+import re
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+from w3lib.url import canonicalize_url as w3lib_canonicalize_url
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+# Java/PHP-style session IDs embedded in the path: /page;jsessionid=ABC
+_PATH_SESSION = re.compile(r";(jsessionid|phpsessid|sid)=[^/?#]*", re.IGNORECASE)
+
+def canonicalize_url(url: str, host_aliases: dict = None, drop_params=()) -> str:
+    """
+    Returns the canonical form of `url`: lowercase scheme and host (mapped through
+    `host_aliases`), no default port, fragment, path session ID or trailing slash,
+    and sorted query parameters without those matching a `drop_params` pattern
+    (fnmatch-style, case-insensitive, e.g. "utm_*").
+    """
+    # Sorts the query, normalizes percent-encoding and drops the fragment.
+    parts = urlsplit(w3lib_canonicalize_url(url))
+    scheme = parts.scheme.lower()
+    host = parts.hostname or ""
+    host = (host_aliases or {}).get(host, host)
+    netloc = host if parts.port in (None, _DEFAULT_PORTS.get(scheme)) else f"{host}:{parts.port}"
+
+    path = _PATH_SESSION.sub("", parts.path) or "/"
+    if len(path) > 1:
+        path = path.rstrip("/") or "/"
+    query = [
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not any(fnmatch.fnmatch(key.lower(), pattern) for pattern in drop_params)
+    ]
+    return urlunsplit((scheme, netloc, path, urlencode(query), ""))
+
+def compile_patterns(patterns):
+    """Compiles [(regex, weight), ...] or [regex, ...] settings, case-insensitively."""
+    return [
+        (re.compile(pattern[0], re.IGNORECASE), pattern[1]) if isinstance(pattern, (list, tuple))
+        else re.compile(pattern, re.IGNORECASE)
+        for pattern in patterns
+    ]
+
+def url_priority(url: str, depth: int, patterns: list, depth_penalty: int) -> int:
+    """
+    Scheduling priority of `url` found at link `depth` (higher is crawled first):
+    the largest weight among the matching compiled `patterns` (0 if none match,
+    negative weights push pages back), minus `depth_penalty` per link of depth.
+    """
+    weights = [weight for pattern, weight in patterns if pattern.search(url)]
+    return (max(weights) if weights else 0) - depth * depth_penalty
@@ -4,4 +4,6 @@ class MosdacItem(scrapy.Item):
     url = scrapy.Field()
     title = scrapy.Field()
     content = scrapy.Field()
-    content_type = scrapy.Field()
\ No newline at end of file
+    content_type = scrapy.Field()
+    # Set (to True) on the items an incremental crawl emits for pages removed from the site.
+    removed = scrapy.Field()
@@ -0,0 +1,176 @@
+import hashlib
+from urllib.parse import urlparse
+from scrapy import Request, signals
+from scrapy.exceptions import NotConfigured
+from mosdac_scraper.frontier import canonicalize_url, compile_patterns, url_priority
+
+class IncrementalCrawlMiddleware:
+    """
+    Downloader middleware for incremental crawls (INCREMENTAL_CRAWL = True).
+
+    Requests for URLs crawled before are sent as conditional GETs with the
+    recorded ETag / Last-Modified. Every response is compared with the spider's
+    CrawlState and tagged in `meta["crawl_status"]`:
+
+    - "not_modified": the server answered 304,
+    - "unchanged":    the body hashes the same as last time,
+    - "changed" / "new": the page has to be parsed.
+
+    The spider skips parsing the first two. A page answering 404 or 410 is marked
+    as gone. Any other failure (a 5xx, a download error or a robots.txt block) says
+    nothing about whether the page still exists, so the page is kept as seen by
+    this run and not reported as removed. Bytes not downloaded thanks to 304s (the
+    size recorded for the page) are counted in the "incremental/bytes_saved" stat.
+    """
+    def __init__(self, stats):
+        self.stats = stats
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool("INCREMENTAL_CRAWL"):
+            raise NotConfigured
+        middleware = cls(crawler.stats)
+        crawler.signals.connect(middleware.spider_closed, signal=signals.spider_closed)
+        return middleware
+
+    @staticmethod
+    def _tracked(request):
+        # robots.txt and internal (data:) requests are not pages of the site.
+        parsed = urlparse(request.url)
+        return parsed.scheme in ("http", "https") and parsed.path != "/robots.txt"
+
+    def process_request(self, request, spider):
+        if not self._tracked(request):
+            return None
+        page = spider.crawl_state.get(request.url)
+        if page is not None:
+            if page["etag"]:
+                request.headers.setdefault("If-None-Match", page["etag"])
+            if page["last_modified"]:
+                request.headers.setdefault("If-Modified-Since", page["last_modified"])
+        return None
+
+    def process_response(self, request, response, spider):
+        if not self._tracked(request):
+            return response
+        state = spider.crawl_state
+        page = state.get(request.url)
+        if response.status == 304 and page is not None:
+            state.touch(request.url)
+            request.meta["crawl_status"] = "not_modified"
+            self.stats.inc_value("incremental/not_modified")
+            self.stats.inc_value("incremental/bytes_saved", page["size"])
+        elif response.status == 200:
+            body_hash = hashlib.sha1(response.body).hexdigest()
+            if page is None:
+                status = "new"
+            else:
+                status = "unchanged" if page["body_hash"] == body_hash else "changed"
+            state.record_response(
+                request.url,
+                etag=response.headers.get("ETag", b"").decode("latin-1") or None,
+                last_modified=response.headers.get("Last-Modified", b"").decode("latin-1") or None,
+                body_hash=body_hash,
+                size=len(response.body),
+            )
+            request.meta["crawl_status"] = status
+            self.stats.inc_value(f"incremental/{status}")
+        elif response.status in (404, 410) and page is not None:
+            state.mark_gone(request.url)
+        elif page is not None:
+            self._keep(request, state)
+        return response
+
+    def process_exception(self, request, exception, spider):
+        if self._tracked(request) and spider.crawl_state.get(request.url) is not None:
+            self._keep(request, spider.crawl_state)
+        return None
+
+    def _keep(self, request, state):
+        state.touch(request.url)
+        self.stats.inc_value("incremental/fetch_failed")
+
+    def spider_closed(self, spider):
+        saved = self.stats.get_value("incremental/bytes_saved", 0)
+        spider.logger.info(
+            f"Incremental crawl: {self.stats.get_value('incremental/not_modified', 0)} not modified (304), "
+            f"{self.stats.get_value('incremental/unchanged', 0)} unchanged, "
+            f"{self.stats.get_value('incremental/changed', 0)} changed, {self.stats.get_value('incremental/new', 0)} new, "
+            f"{self.stats.get_value('incremental/removed', 0)} removed, "
+            f"{self.stats.get_value('incremental/fetch_failed', 0)} failed fetches of known pages kept; "
+            f"{saved / (1024 * 1024):.1f} MB not downloaded."
+        )
+
+class CrawlFrontierMiddleware:
+    """
+    Spider middleware that shapes the crawl frontier (FRONTIER_ENABLED = True).
+
+    Every request the spider yields is rewritten to its canonical URL, so variants
+    of one page are fetched once, dropped if it matches URL_SKIP_PATTERNS, and
+    given a priority from URL_PRIORITY_PATTERNS and its link depth (see
+    frontier.py). With CRAWL_BUDGET set, the spider is closed once that many pages
+    have been downloaded; the highest-priority pages have been fetched by then.
+    """
+    def __init__(self, crawler):
+        settings = crawler.settings
+        self.crawler = crawler
+        self.stats = crawler.stats
+        self.host_aliases = settings.getdict("CANONICAL_HOST_ALIASES")
+        self.drop_params = [pattern.lower() for pattern in settings.getlist("URL_DROP_PARAMS")]
+        self.skip_patterns = compile_patterns(settings.getlist("URL_SKIP_PATTERNS"))
+        self.priority_patterns = compile_patterns(settings.getlist("URL_PRIORITY_PATTERNS"))
+        self.depth_penalty = settings.getint("FRONTIER_DEPTH_PENALTY", 5)
+        self.budget = settings.getint("CRAWL_BUDGET", 0)
+        self.pages = 0
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool("FRONTIER_ENABLED", True):
+            raise NotConfigured
+        middleware = cls(crawler)
+        if middleware.budget:
+            crawler.signals.connect(middleware.response_received, signal=signals.response_received)
+        return middleware
+
+    def _prepare(self, request, depth):
+        if urlparse(request.url).scheme not in ("http", "https"):
+            return request
+        url = canonicalize_url(request.url, self.host_aliases, self.drop_params)
+        if any(pattern.search(url) for pattern in self.skip_patterns):
+            self.stats.inc_value("frontier/skipped")
+            return None
+        if url != request.url:
+            self.stats.inc_value("frontier/canonicalized")
+        priority = request.priority + url_priority(url, depth, self.priority_patterns, self.depth_penalty)
+        return request.replace(url=url, priority=priority)
+
+    def process_start_requests(self, start_requests, spider):
+        for request in start_requests:
+            request = self._prepare(request, 0)
+            if request is not None:
+                yield request
+
+    def process_spider_output(self, response, result, spider):
+        depth = response.meta.get("depth", 0) + 1
+        for entry in result:
+            if isinstance(entry, Request):
+                entry = self._prepare(entry, depth)
+            if entry is not None:
+                yield entry
+
+    async def process_spider_output_async(self, response, result, spider):
+        # The same for async callbacks (parse_pdf).
+        depth = response.meta.get("depth", 0) + 1
+        async for entry in result:
+            if isinstance(entry, Request):
+                entry = self._prepare(entry, depth)
+            if entry is not None:
+                yield entry
+
+    def response_received(self, response, request, spider):
+        if urlparse(request.url).scheme not in ("http", "https") or urlparse(request.url).path == "/robots.txt":
+            return
+        self.pages += 1
+        if self.pages == self.budget:
+            spider.logger.info(f"Crawl budget of {self.budget} pages reached, closing the spider.")
+            self.crawler.engine.close_spider(spider, "crawl_budget")
@@ -0,0 +1,186 @@
+"""
+PDF text extraction off the Twisted reactor thread.
+
+fitz (PyMuPDF) extraction is CPU-bound and runs for seconds on a large product
+handbook. Done inside a spider callback it blocks the reactor, so every other
+download and parse in the crawl waits for it. PdfExtractor runs it in a bounded
+set of worker processes instead and hands the result back as a Deferred, which
+a coroutine callback awaits through scrapy.utils.defer.maybe_deferred_to_future
+(awaiting the bare Deferred fails under the asyncio reactor).
+"""
+import multiprocessing
+import threading
+import time
+from twisted.internet import defer, threads
+from twisted.python.threadpool import ThreadPool
+
+def extract_pdf_text(body: bytes, max_pages: int, timeout: float) -> dict:
+    """
+    Extracts the text of a PDF page by page, normalizing each page's whitespace
+    as it goes rather than building one string of the raw text first. Stops
+    after `max_pages` pages or once `timeout` seconds have passed.
+
+    Returns:
+        dict: "title" (from the PDF metadata, or None), "pages" (the non-empty
+        page texts), "page_count" and "truncated" (why extraction stopped early,
+        or None).
+    """
+    import fitz  # PyMuPDF; imported here so worker processes load it on first use.
+
+    started = time.monotonic()
+    pages, truncated = [], None
+    with fitz.open(stream=body, filetype="pdf") as doc:
+        title = (doc.metadata or {}).get("title") or None
+        for number, page in enumerate(doc):
+            if number >= max_pages:
+                truncated = f"page limit ({max_pages} of {doc.page_count} pages)"
+                break
+            if time.monotonic() - started > timeout:
+                truncated = f"timeout after {number} of {doc.page_count} pages"
+                break
+            text = " ".join(page.get_text().split())
+            if text:
+                pages.append(text)
+        page_count = doc.page_count
+    return {"title": title, "pages": pages, "page_count": page_count, "truncated": truncated}
+
+def _worker_main(conn):
+    """Entry point of a worker process: extracts the PDFs it receives until its pipe is closed."""
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            return
+        try:
+            conn.send(("ok", extract_pdf_text(*job)))
+        except Exception as e:
+            conn.send(("error", f"{type(e).__name__}: {e}"))
+
+class _Worker:
+    """One extraction process and the pipe it is driven through."""
+    def __init__(self, context):
+        self.conn, child_conn = context.Pipe()
+        # 'spawn' rather than forking a process that runs the Twisted reactor and its threads.
+        self.process = context.Process(target=_worker_main, args=(child_conn,), daemon=True)
+        self.process.start()
+        child_conn.close()
+
+    def run(self, job, timeout):
+        """Sends `job` and waits up to `timeout` seconds for its result."""
+        self.conn.send(job)
+        if not self.conn.poll(timeout):
+            raise TimeoutError(f"PDF extraction did not return within {timeout:.0f}s")
+        try:
+            status, value = self.conn.recv()
+        except EOFError:
+            raise RuntimeError(f"PDF worker process exited with code {self.process.exitcode}") from None
+        if status == "error":
+            raise RuntimeError(value)
+        return value
+
+    def stop(self):
+        """Lets an idle worker exit on its own."""
+        self.conn.close()
+        self.process.join(timeout=5)
+
+    def kill(self):
+        """Ends a worker that may be stuck in an extraction."""
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+class PdfExtractor:
+    """
+    Extracts PDF text in `workers` processes (0 extracts inline on the calling
+    thread). At most `workers` PDFs are extracted at a time, so each timeout
+    measures extraction rather than time spent queued. A PDF whose extraction
+    has not returned `grace` seconds after its cooperative `timeout` fails with
+    a TimeoutError, and its worker process is killed and replaced, so a PDF that
+    hangs fitz cannot hold a worker for the rest of the crawl.
+    """
+    def __init__(self, workers: int = 2, max_pages: int = 500, max_bytes: int = 50 * 1024 * 1024,
+                 timeout: float = 120, grace: float = 30):
+        self.workers = workers
+        self.max_pages = max_pages
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.grace = grace
+        self._threads = None
+        if workers > 0:
+            self._context = multiprocessing.get_context("spawn")
+            # Each extraction waits on its worker from a thread of this pool, not the
+            # reactor's, so long extractions do not hold up DNS lookups.
+            self._threads = ThreadPool(minthreads=0, maxthreads=workers, name="pdf-extraction")
+            self._lock = threading.Lock()
+            # Worker processes are started on first use and reused while healthy.
+            self._idle = []
+            self._busy = set()
+            self._closed = False
+
+    @classmethod
+    def from_settings(cls, settings):
+        return cls(
+            workers=settings.getint("PDF_EXTRACT_WORKERS", 2),
+            max_pages=settings.getint("PDF_MAX_PAGES", 500),
+            max_bytes=settings.getint("PDF_MAX_BYTES", 50 * 1024 * 1024),
+            timeout=settings.getfloat("PDF_EXTRACT_TIMEOUT", 120),
+        )
+
+    def extract(self, body: bytes) -> defer.Deferred:
+        """Returns a Deferred that fires with the extract_pdf_text() result for `body`."""
+        if self._threads is None:
+            return defer.maybeDeferred(extract_pdf_text, body, self.max_pages, self.timeout)
+        from twisted.internet import reactor
+
+        if not self._threads.started:
+            self._threads.start()
+        return threads.deferToThreadPool(reactor, self._threads, self._extract_in_worker, body)
+
+    def _extract_in_worker(self, body):
+        """Runs on a pool thread: extracts `body` in an idle (or new) worker process."""
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("PdfExtractor is closed")
+            worker = self._idle.pop() if self._idle else None
+        if worker is None:
+            worker = _Worker(self._context)
+        with self._lock:
+            self._busy.add(worker)
+        try:
+            result = worker.run((body, self.max_pages, self.timeout), self.timeout + self.grace)
+        except (TimeoutError, RuntimeError, OSError) as e:
+            with self._lock:
+                self._busy.discard(worker)
+            if isinstance(e, RuntimeError) and worker.process.is_alive():
+                # An extraction error reported by a healthy worker.
+                self._release(worker)
+            else:
+                worker.kill()
+            raise
+        with self._lock:
+            self._busy.discard(worker)
+        self._release(worker)
+        return result
+
+    def _release(self, worker):
+        with self._lock:
+            if not self._closed:
+                self._idle.append(worker)
+                return
+        worker.stop()
+
+    def close(self):
+        """Stops the worker processes, killing those still extracting."""
+        if self._threads is None or self._closed:
+            return
+        with self._lock:
+            self._closed = True
+            idle, busy = self._idle, list(self._busy)
+            self._idle = []
+        for worker in idle:
+            worker.stop()
+        for worker in busy:
+            # Their pool threads see the process exit, fail the extraction and clean up.
+            worker.process.kill()
+        if self._threads.started:
+            self._threads.stop()
@@ -0,0 +1,216 @@
+"""
+Item pipeline that prepares the crawl for ingestion while it runs.
+
+Every item is chunked with the backend's configured chunker as it arrives (on a
+small pool of threads, so tokenizing never blocks the reactor), pages
+whose content exactly repeats an earlier page are dropped, and the chunks are
+written to rotating gzip shards with a manifest (see backend/crawl_output.py),
+which backend/data_ingestion.py streams without chunking again. Optionally,
+batches of chunks are embedded on a background thread into the backend's
+embedding cache, so the vector store can be built during the crawl or right
+after it without waiting for the encoder.
+"""
+import hashlib
+import queue
+import sys
+import threading
+from pathlib import Path
+from scrapy import signals
+from scrapy.exceptions import DropItem, NotConfigured
+from twisted.internet import threads
+from twisted.python.threadpool import ThreadPool
+
+# The backend package lives at the repository root, next to this Scrapy project.
+_REPO_ROOT = Path(__file__).resolve().parents[2]
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+from backend.crawl_output import CrawlOutputWriter  # noqa: E402
+
+# Close reasons of a crawl that ran to its intended end; only these are published.
+_PUBLISH_REASONS = {"finished", "crawl_budget", "closespider_pagecount", "closespider_itemcount"}
+
+class EmbeddingQueue:
+    """
+    Embeds batches of texts on a background thread, so the reactor never waits for
+    the encoder. The vectors themselves are discarded: embedding through the
+    backend's cache (or the shared embedding server, which has its own) is what
+    makes ingestion find them later. When `max_batches` are already waiting, new
+    batches are skipped and left to ingestion rather than slowing the crawl down.
+    """
+    def __init__(self, max_batches, logger):
+        self.logger = logger
+        self.embedded = self.skipped = 0
+        self._queue = queue.Queue(maxsize=max_batches)
+        self._thread = threading.Thread(target=self._run, name="crawl-embeddings", daemon=True)
+        self._thread.start()
+
+    def put(self, texts):
+        """Queues a batch of texts, or skips it if the queue is full."""
+        try:
+            self._queue.put_nowait(texts)
+        except queue.Full:
+            self.skipped += len(texts)
+
+    def _run(self):
+        from backend.embeddings import build_embeddings
+
+        embeddings = build_embeddings()
+        try:
+            while True:
+                texts = self._queue.get()
+                if texts is None:
+                    return
+                try:
+                    embeddings.embed_documents(texts)
+                    self.embedded += len(texts)
+                except Exception as e:
+                    self.skipped += len(texts)
+                    self.logger.warning(f"Embedding a batch of {len(texts)} chunks failed: {e}")
+        finally:
+            close = getattr(embeddings, "close", None)
+            if close is not None:
+                close()
+
+    def close(self):
+        """Waits for the queued batches to be embedded."""
+        if self._queue.qsize():
+            self.logger.info(f"Waiting for {self._queue.qsize()} queued batches of chunks to be embedded...")
+        self._queue.put(None)
+        self._thread.join()
+
+class CrawlOutputPipeline:
+    """
+    Chunks, dedupes and writes items to a new run under CRAWL_OUTPUT_DIR
+    (CRAWL_OUTPUT_ENABLED = True), which is published for ingestion once the
+    crawl has finished; an interrupted crawl leaves the previous one current.
+
+    Not used for incremental crawls: their items are only the changes, which are
+    merged into scraped_data.jsonl instead (see crawl_state.py).
+    """
+    def __init__(self, settings, stats):
+        self.stats = stats
+        self.directory = settings.get("CRAWL_OUTPUT_DIR")
+        self.chunk = settings.getbool("CRAWL_OUTPUT_CHUNK", True)
+        self.chunk_threads = max(1, settings.getint("CRAWL_OUTPUT_CHUNK_THREADS", 2))
+        self.max_records = settings.getint("CRAWL_OUTPUT_SHARD_RECORDS", 10_000)
+        self.max_mb = settings.getfloat("CRAWL_OUTPUT_SHARD_MB", 32)
+        self.embed = settings.getbool("CRAWL_OUTPUT_EMBED")
+        self.embed_batch = settings.getint("CRAWL_OUTPUT_EMBED_BATCH", 64)
+        self.embed_queue_size = settings.getint("CRAWL_OUTPUT_EMBED_QUEUE", 16)
+        self.writer = None
+        self.embed_queue = None
+        self._threads = None
+        self._local = threading.local()
+        self._document = self._make_splitter = None
+        self._pending = []
+        self._seen = set()
+        self._duplicates = 0
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.getbool("CRAWL_OUTPUT_ENABLED", True) or settings.getbool("INCREMENTAL_CRAWL"):
+            raise NotConfigured
+        pipeline = cls(settings, crawler.stats)
+        # The close reason is only known to the spider_closed signal, which follows close_spider.
+        crawler.signals.connect(pipeline.spider_closed, signal=signals.spider_closed)
+        return pipeline
+
+    def open_spider(self, spider):
+        chunker = None
+        if self.chunk:
+            # The ingestion module pulls in LangChain and FAISS, so it is only imported to chunk.
+            from langchain.docstore.document import Document
+            from backend.data_ingestion import chunker_settings, make_text_splitter
+            self._document, self._make_splitter = Document, make_text_splitter
+            chunker = chunker_settings()
+            # Not the reactor's thread pool, which also resolves DNS for the downloader.
+            self._threads = ThreadPool(minthreads=0, maxthreads=self.chunk_threads, name="crawl-output-chunking")
+            self._threads.start()
+        if self.embed:
+            from backend.config import EMBEDDING_CACHE_ENABLED, EMBEDDING_SERVER_ENABLED
+            if EMBEDDING_CACHE_ENABLED or EMBEDDING_SERVER_ENABLED:
+                self.embed_queue = EmbeddingQueue(self.embed_queue_size, spider.logger)
+            else:
+                spider.logger.warning("CRAWL_OUTPUT_EMBED needs the backend's embedding cache "
+                                      "(EMBEDDING_CACHE_ENABLED) to keep the vectors; not embedding.")
+                self.embed = False
+        self.writer = CrawlOutputWriter(self.directory, self.max_records, self.max_mb, chunker=chunker)
+        spider.logger.info(f"Writing the crawl to {self.writer.directory}"
+                           f"{' in chunks' if self.chunk else ''}{', embedding them as it goes' if self.embed else ''}.")
+
+    def process_item(self, item, spider):
+        content = item.get("content")
+        if item.get("removed") or not content:
+            return item
+        digest = hashlib.sha1(content.encode("utf-8")).digest()
+        if digest in self._seen:
+            self._duplicates += 1
+            self.stats.inc_value("crawl_output/duplicates")
+            raise DropItem(f"Same content as an earlier page: {item['url']}")
+        self._seen.add(digest)
+
+        if self._threads is None:
+            return self._write(((content, None),), item)
+        from twisted.internet import reactor
+
+        chunks = threads.deferToThreadPool(reactor, self._threads, self._chunks, content)
+        return chunks.addCallback(self._write, item)
+
+    def _chunks(self, content):
+        """Runs on a chunking thread: returns (text, start index) for the chunks of one page."""
+        # Each thread has its own splitter, so no tokenizer is used by two threads at once.
+        splitter = getattr(self._local, "splitter", None)
+        if splitter is None:
+            splitter = self._local.splitter = self._make_splitter()
+        return [(chunk.page_content, chunk.metadata.get("start_index"))
+                for chunk in splitter.split_documents([self._document(page_content=content)])]
+
+    def _write(self, chunks, item):
+        """Writes the (text, start index or None) chunks of `item`; runs on the reactor thread."""
+        record = {"url": item["url"], "title": item.get("title"), "content_type": item.get("content_type")}
+        for text, start_index in chunks:
+            entry = dict(record, content=text)
+            if start_index is not None:
+                entry["start_index"] = start_index
+            self.writer.write(entry)
+            self.stats.inc_value("crawl_output/records")
+            if self.embed_queue is not None:
+                self._pending.append(text)
+                if len(self._pending) >= self.embed_batch:
+                    self._flush_embeddings()
+        return item
+
+    def _flush_embeddings(self):
+        if self._pending:
+            self.embed_queue.put(self._pending)
+        self._pending = []
+
+    def close_spider(self, spider):
+        # Scrapy has waited for every item to pass the pipeline, so the chunking threads are idle.
+        if self._threads is not None:
+            self._threads.stop()
+        if self.embed_queue is not None:
+            self._flush_embeddings()
+            self.embed_queue.close()
+            self.stats.set_value("crawl_output/embedded", self.embed_queue.embedded)
+            self.stats.set_value("crawl_output/embed_skipped", self.embed_queue.skipped)
+        self.writer.close(duplicates=self._duplicates)
+        manifest = self.writer.manifest
+        spider.logger.info(
+            f"Crawl output: {manifest['records']} records in {len(manifest['shards'])} shards "
+            f"({sum(shard['bytes'] for shard in manifest['shards']) / (1024 * 1024):.1f} MB), "
+            f"{self._duplicates} duplicate pages dropped"
+            + (f", {self.embed_queue.embedded} chunks embedded during the crawl." if self.embed_queue else ".")
+        )
+
+    def spider_closed(self, spider, reason):
+        if self.writer is None:
+            return
+        if reason in _PUBLISH_REASONS:
+            self.writer.publish()
+            spider.logger.info(f"Published the crawl output {self.writer.directory}.")
+        else:
+            spider.logger.warning(f"The crawl was closed ({reason}); its output in {self.writer.directory} "
+                                  "is left unpublished and ingestion keeps reading the previous crawl.")
@@ -1,3 +1,5 @@
+from pathlib import Path
+
 BOT_NAME = "mosdac_scraper"
 
 SPIDER_MODULES = ["mosdac_scraper.spiders"]
@@ -8,7 +10,104 @@ ROBOTSTXT_OBEY = True
 
 # Be a good web citizen: set a user agent and a download delay
 USER_AGENT = "MOSDAC AI Bot Scraper (for academic/demonstration project)"
+# The minimum delay between requests to a host; AutoThrottle raises it as needed but
+# never goes below it. Scrapy would otherwise randomize each delay to 0.5-1.5 times
+# its value; without that, request starts to the site are always at least one second
+# apart, however many requests are in flight (CONCURRENT_REQUESTS_PER_DOMAIN).
 DOWNLOAD_DELAY = 1
+RANDOMIZE_DOWNLOAD_DELAY = False
+
+# --- Adaptive Throttling ---
+# AutoThrottle adapts the delay per host to its response times, aiming at
+# AUTOTHROTTLE_TARGET_CONCURRENCY parallel requests (at most 1, so the server is not asked
+# to handle requests in parallel on average), starting at AUTOTHROTTLE_START_DELAY, never
+# faster than DOWNLOAD_DELAY and never more than CONCURRENT_REQUESTS_PER_DOMAIN at once.
+# A slow or struggling server is therefore crawled more gently than a fast one.
+AUTOTHROTTLE_ENABLED = True
+AUTOTHROTTLE_START_DELAY = 1
+AUTOTHROTTLE_MAX_DELAY = 10
+AUTOTHROTTLE_TARGET_CONCURRENCY = 1.0
+CONCURRENT_REQUESTS_PER_DOMAIN = 4
+
+# --- Crawl Frontier ---
+# Requests are rewritten to canonical URLs (see frontier.py), so fragment, query-string,
+# trailing-slash and host variants of a page are fetched once. URLs matching
+# URL_SKIP_PATTERNS are never requested. The rest are crawled highest priority first:
+# the best matching URL_PRIORITY_PATTERNS weight minus FRONTIER_DEPTH_PENALTY per link
+# of depth. CRAWL_BUDGET > 0 stops the crawl after that many pages
+# (scrapy crawl mosdac -s CRAWL_BUDGET=500).
+FRONTIER_ENABLED = True
+CANONICAL_HOST_ALIASES = {"mosdac.gov.in": "www.mosdac.gov.in"}
+URL_DROP_PARAMS = ["utm_*", "fbclid", "gclid", "sessionid", "phpsessid", "jsessionid", "sid", "destination"]
+URL_SKIP_PATTERNS = [
+    r"/(user|login|logout|register|password)(/|$|\?)",
+    r"/search(/|$|\?)",
+    r"[?&](print|format)=",
+    r"\.(jpe?g|png|gif|svg|ico|css|js|zip|gz|tar|rar|mp4|avi|hdf5?|h5|nc|tif{1,2})$",
+]
+URL_PRIORITY_PATTERNS = [
+    (r"\.pdf$", 30),
+    (r"faq", 30),
+    (r"(product|catalog|mission|satellite|sensor|data-?access)", 20),
+    (r"(doc|manual|handbook|guide|tutorial|about)", 10),
+    (r"(calendar|event|archive|news|gallery|tender|career)", -20),
+]
+FRONTIER_DEPTH_PENALTY = 5
+CRAWL_BUDGET = 0
+SPIDER_MIDDLEWARES = {
+    "mosdac_scraper.middlewares.CrawlFrontierMiddleware": 800,
+}
+# Requests of equal priority are crawled breadth-first.
+SCHEDULER_MEMORY_QUEUE = "scrapy.squeues.FifoMemoryQueue"
+SCHEDULER_DISK_QUEUE = "scrapy.squeues.PickleFifoDiskQueue"
+
+# --- PDF Extraction ---
+# PDF text is extracted in a pool of this many worker processes, so a large PDF does
+# not stall the rest of the crawl; 0 extracts on the reactor thread instead.
+PDF_EXTRACT_WORKERS = 2
+# PDFs larger than PDF_MAX_BYTES are not downloaded, only the first PDF_MAX_PAGES pages
+# are extracted, and extraction of one PDF stops after PDF_EXTRACT_TIMEOUT seconds; a
+# worker that has not returned 30 seconds later is killed and replaced.
+PDF_MAX_BYTES = 50 * 1024 * 1024
+PDF_MAX_PAGES = 500
+PDF_EXTRACT_TIMEOUT = 120
+
+# --- Incremental Crawling ---
+# With INCREMENTAL_CRAWL (scrapy crawl mosdac -s INCREMENTAL_CRAWL=1), pages crawled
+# before are fetched with conditional GETs, unchanged pages are not re-parsed and only
+# changed, new and removed pages are emitted as items (see crawl_state.py). The state
+# of previous crawls is kept in CRAWL_STATE_PATH.
+INCREMENTAL_CRAWL = False
+CRAWL_STATE_PATH = str(Path(__file__).resolve().parent.parent / "crawl_state.sqlite3")
+DOWNLOADER_MIDDLEWARES = {
+    # Below HttpCompressionMiddleware (590), so it hashes decompressed bodies.
+    "mosdac_scraper.middlewares.IncrementalCrawlMiddleware": 580,
+}
+
+# --- Crawl Output ---
+# Items are chunked as they arrive (with the backend's configured chunker, on
+# CRAWL_OUTPUT_CHUNK_THREADS threads off the reactor), pages whose
+# content exactly repeats an earlier page are dropped, and the chunks are written to
+# gzip-compressed JSON Lines shards in a new run under CRAWL_OUTPUT_DIR, listed in its
+# manifest.json (see backend/crawl_output.py). A shard is completed every
+# CRAWL_OUTPUT_SHARD_RECORDS records or CRAWL_OUTPUT_SHARD_MB megabytes of JSON. The run is
+# published for ingestion (backend/data_ingestion.py --source crawl_output) when the crawl
+# finishes; an interrupted crawl leaves the previous run current. With CRAWL_OUTPUT_EMBED,
+# batches of CRAWL_OUTPUT_EMBED_BATCH chunks are also embedded on a background thread
+# into the backend's embedding cache; batches beyond CRAWL_OUTPUT_EMBED_QUEUE waiting
+# ones are left to ingestion. Incremental crawls do not write crawl output.
+CRAWL_OUTPUT_ENABLED = True
+CRAWL_OUTPUT_DIR = str(Path(__file__).resolve().parent.parent / "crawl_output")
+CRAWL_OUTPUT_CHUNK = True
+CRAWL_OUTPUT_CHUNK_THREADS = 2
+CRAWL_OUTPUT_SHARD_RECORDS = 10_000
+CRAWL_OUTPUT_SHARD_MB = 32
+CRAWL_OUTPUT_EMBED = False
+CRAWL_OUTPUT_EMBED_BATCH = 64
+CRAWL_OUTPUT_EMBED_QUEUE = 16
+ITEM_PIPELINES = {
+    "mosdac_scraper.pipelines.CrawlOutputPipeline": 300,
+}
 
 # Increase logging level to reduce noise, show only important messages
 LOG_LEVEL = 'INFO'
\ No newline at end of file
@@ -1,18 +1,102 @@
+import functools
+import hashlib
 import scrapy
-import fitz  # PyMuPDF
+from scrapy import signals
+from scrapy.exceptions import DontCloseSpider
+from scrapy.utils.defer import maybe_deferred_to_future
+from mosdac_scraper.crawl_state import CrawlState
+from mosdac_scraper.frontier import canonicalize_url
 from mosdac_scraper.items import MosdacItem
+from mosdac_scraper.pdf_extraction import PdfExtractor
 from urllib.parse import urlparse
 
 class MosdacSpider(scrapy.Spider):
     name = "mosdac"
     allowed_domains = ["mosdac.gov.in"]
     start_urls = ["https://www.mosdac.gov.in/"]
+    # Incremental crawls send conditional GETs; their 304 answers reach the callbacks.
+    handle_httpstatus_list = [304]
+
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        # PDF text is extracted in worker processes (see PDF_EXTRACT_* in settings.py).
+        spider.pdf_extractor = PdfExtractor.from_settings(crawler.settings)
+        # In incremental mode, what earlier crawls saw (see crawl_state.py and IncrementalCrawlMiddleware).
+        spider.crawl_state = None
+        if crawler.settings.getbool("INCREMENTAL_CRAWL"):
+            spider.crawl_state = CrawlState(crawler.settings.get("CRAWL_STATE_PATH"))
+            spider.removals_emitted = False
+            # Requests (and so the recorded URLs) are canonical when the frontier is on.
+            spider.canonical_url = None
+            if crawler.settings.getbool("FRONTIER_ENABLED", True):
+                spider.canonical_url = functools.partial(
+                    canonicalize_url,
+                    host_aliases=crawler.settings.getdict("CANONICAL_HOST_ALIASES"),
+                    drop_params=[pattern.lower() for pattern in crawler.settings.getlist("URL_DROP_PARAMS")],
+                )
+            crawler.signals.connect(spider.spider_idle, signal=signals.spider_idle)
+        return spider
+
+    def closed(self, reason):
+        self.pdf_extractor.close()
+        if self.crawl_state is not None:
+            self.crawl_state.close()
+
+    def _in_domain(self, url):
+        host = urlparse(url).hostname or ''
+        return any(host == domain or host.endswith('.' + domain) for domain in self.allowed_domains)
+
+    def _follow(self, links):
+        for link in links:
+            if link.lower().endswith('.pdf'):
+                # If it's a PDF, send it to the PDF parser. Oversized PDFs are not downloaded at all.
+                yield scrapy.Request(link, callback=self.parse_pdf,
+                                     meta={'download_maxsize': self.pdf_extractor.max_bytes})
+            else:
+                # If it's another HTML page, follow it recursively
+                yield scrapy.Request(link, callback=self.parse)
+
+    def _unchanged(self, response):
+        """True if an incremental crawl found the page unchanged since the last crawl, so it needs no parsing."""
+        return response.meta.get('crawl_status') in ('not_modified', 'unchanged')
+
+    def _content_changed(self, item):
+        """In incremental mode, only items whose extracted content changed are emitted."""
+        if self.crawl_state is None:
+            return True
+        content_hash = hashlib.sha1(f"{item['title']}\n{item['content']}".encode('utf-8')).hexdigest()
+        return self.crawl_state.update_content_hash(item['url'], content_hash)
+
+    def spider_idle(self, spider):
+        """
+        Once an incremental crawl has run out of requests, the pages removed from the
+        site (see CrawlState.removed) are emitted as {"url", "removed": True} items
+        from one last internal request, which keeps the spider open until then.
+        """
+        if self.removals_emitted:
+            return
+        self.removals_emitted = True
+        self.crawler.engine.crawl(scrapy.Request("data:,", callback=self.emit_removals, dont_filter=True))
+        raise DontCloseSpider
+
+    def emit_removals(self, response):
+        removed = self.crawl_state.removed(self.canonical_url)
+        for url in removed:
+            yield MosdacItem(url=url, removed=True)
+        self.crawl_state.forget(removed)
+        self.crawler.stats.set_value('incremental/removed', len(removed))
 
     def parse(self, response):
         """
         Parses HTML pages, extracts content, and follows links to other pages and PDFs.
         This version is improved to avoid boilerplate content.
         """
+        if self._unchanged(response):
+            # The page is as the last crawl saw it: follow the links it had then without re-parsing it.
+            yield from self._follow(self.crawl_state.links(response.url))
+            return
+
         # --- Handle HTML Pages ---
         if response.headers.get('Content-Type', b'').decode('utf-8').startswith('text/html'):
             item = MosdacItem()
@@ -55,41 +139,43 @@ class MosdacSpider(scrapy.Spider):
             item['content'] = content
             
             # Yield the item only if we successfully extracted content
-            if item['content']:
+            if item['content'] and self._content_changed(item):
                 yield item
 
         # --- Find and follow all links on the page ---
-        for a_tag in response.css('a::attr(href)').getall():
-            link = response.urljoin(a_tag)
-            
-            # Only follow links that are within the allowed domain
-            if urlparse(link).netloc == self.allowed_domains[0]:
-                if link.lower().endswith('.pdf'):
-                    # If it's a PDF, send it to the PDF parser
-                    yield scrapy.Request(link, callback=self.parse_pdf)
-                else:
-                    # If it's another HTML page, follow it recursively
-                    yield scrapy.Request(link, callback=self.parse)
-
-    def parse_pdf(self, response):
+        # Only follow links that are within the allowed domain (www.mosdac.gov.in included)
+        links = [response.urljoin(a_tag) for a_tag in response.css('a::attr(href)').getall()]
+        links = list(dict.fromkeys(link for link in links if self._in_domain(link)))
+        if self.crawl_state is not None:
+            self.crawl_state.set_links(response.url, links)
+        yield from self._follow(links)
+
+    async def parse_pdf(self, response):
         """
         This function handles PDF responses, extracts text using PyMuPDF.
+        Extraction runs in the PdfExtractor's worker processes, so a large PDF does
+        not hold up the downloads and parsing of every other page meanwhile.
         """
-        # This function remains the same as before, as it already extracts pure text.
+        if self._unchanged(response):
+            return
+
         item = MosdacItem()
         item['url'] = response.url
         item['content_type'] = 'pdf'
         item['title'] = urlparse(response.url).path.split('/')[-1]
 
         try:
-            with fitz.open(stream=response.body, filetype="pdf") as doc:
-                text = "".join(page.get_text() for page in doc)
-                item['content'] = " ".join(text.split())
-                if doc.metadata and doc.metadata.get('title'):
-                    item['title'] = doc.metadata['title']
+            # A Deferred cannot be awaited directly under the asyncio reactor (Scrapy's default).
+            result = await maybe_deferred_to_future(self.pdf_extractor.extract(response.body))
+            # Pages are joined with a space so the last word of a page does not run into the next.
+            item['content'] = " ".join(result['pages'])
+            if result['title']:
+                item['title'] = result['title']
+            if result['truncated']:
+                self.logger.warning(f"Extracted PDF {response.url} only partially: {result['truncated']}")
         except Exception as e:
             self.logger.error(f"Failed to parse PDF {response.url}: {e}")
             item['content'] = ""
 
-        if item['content']:
+        if item['content'] and self._content_changed(item):
             yield item
\ No newline at end of file
@@ -42,19 +42,24 @@ def check_vector_store():
     print("\n📚 Checking Vector Store")
     print("-" * 40)
     
-    vector_store_path = Path("vector_store")
+    from backend.shards import store_dirs
+    from backend.store_versions import current_store_path
+    # Ingestion publishes versions under vector_store/versions/; CURRENT names the live one,
+    # which may be split into shards.
+    vector_store_dirs = store_dirs(current_store_path())
     
-    if not vector_store_path.exists():
+    if not vector_store_dirs:
         print("   ❌ Vector store directory not found")
         return False
     
     required_files = ["index.faiss", "index.pkl"]
-    for file in required_files:
-        if not (vector_store_path / file).exists():
-            print(f"   ❌ Vector store file missing: {file}")
-            return False
+    for shard, vector_store_path in vector_store_dirs:
+        for file in required_files:
+            if not (vector_store_path / file).exists():
+                print(f"   ❌ Vector store file missing in shard '{shard['name']}': {file}")
+                return False
     
-    print("   ✅ Vector store is available")
+    print(f"   ✅ Vector store is available ({len(vector_store_dirs)} shards)")
     return True
 
 def check_scraped_data():
@@ -0,0 +1,77 @@
+"""
+Incremental Ingestion Test
+
+Runs backend.data_ingestion.update_vector_store (what --incremental does) against
+an empty vector store directory, which must fall back to a full build, then again
+on unchanged data, and once more after one page changed and one disappeared.
+
+Everything is written to a temporary directory; the project's scraped data,
+vector store and embedding cache are not touched.
+
+Requirements: the backend's ingestion dependencies (faiss, langchain,
+sentence-transformers).
+"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+# Must be set before the backend config is imported.
+TMP_DIR = Path(tempfile.mkdtemp(prefix="mosdac-ingestion-test-"))
+os.environ["EMBEDDING_CACHE_PATH"] = str(TMP_DIR / "embeddings.sqlite3")
+
+from backend import data_ingestion  # noqa: E402
+from backend.shards import load_shard_list  # noqa: E402
+from backend.store_versions import current_store_path  # noqa: E402
+
+PAGES = {
+    f"https://www.mosdac.gov.in/page-{i}": f"Page {i} describes the INSAT-3D imager product number {i}. " * 20
+    for i in range(6)
+}
+PAGES["https://www.mosdac.gov.in/docs/handbook.pdf"] = "The SCATSAT-1 handbook explains wind vector retrieval. " * 20
+
+def write_pages(path, pages):
+    with open(path, 'w', encoding='utf-8') as f:
+        for url, content in pages.items():
+            f.write(json.dumps({"url": url, "title": url.rsplit("/", 1)[1], "content": content}) + "\n")
+
+def check(label, passed, detail=""):
+    print(f"{'✅' if passed else '❌'} {label}{f': {detail}' if detail else ''}")
+    return passed
+
+def main():
+    scraped = TMP_DIR / "scraped_data.jsonl"
+    store = TMP_DIR / "vector_store"
+    data_ingestion.SCRAPED_DATA_FILE = scraped
+    data_ingestion.VECTOR_STORE_PATH = store
+
+    print("🧪 Incremental Ingestion Test")
+    print("=" * 50)
+    ok = True
+    try:
+        write_pages(scraped, PAGES)
+        first = data_ingestion.update_vector_store(workers=1, index_type="flat", source="jsonl")
+        shard_list = load_shard_list(current_store_path(store))
+        ok &= check("empty store falls back to a full build", shard_list is not None and first["added"] > 0,
+                    f"{first['added']} chunks added, shards {[shard['name'] for shard in shard_list['shards']]}")
+
+        second = data_ingestion.update_vector_store(workers=1, index_type="flat", source="jsonl")
+        ok &= check("unchanged data embeds nothing", second["added"] == 0 and second["removed"] == 0,
+                    f"{second['reused']} chunks reused")
+
+        changed = dict(PAGES)
+        changed["https://www.mosdac.gov.in/page-0"] = "Page 0 now covers the Oceansat-3 ocean colour monitor. " * 20
+        del changed["https://www.mosdac.gov.in/page-1"]
+        write_pages(scraped, changed)
+        third = data_ingestion.update_vector_store(workers=1, index_type="flat", source="jsonl")
+        ok &= check("a changed and a removed page are applied", third["added"] > 0 and third["removed"] > 0,
+                    f"{third['added']} added, {third['removed']} removed, {third['reused']} reused")
+    finally:
+        shutil.rmtree(TMP_DIR, ignore_errors=True)
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+Multi-worker Memory Test
+
+Starts the API with 1, 2 and 4 uvicorn workers and measures the total
+proportional set size (PSS) of all server processes, once in shared mode
+(memory-mapped FAISS index + one shared embedding server) and once in the
+classic mode (every worker loads its own index and model).
+
+PSS splits shared pages between the processes that map them, so the total only
+grows by what each extra worker really costs. In shared mode that marginal cost
+should be a small fraction of the classic one.
+
+Requirements: Linux (/proc), a built vector store and a valid .env file.
+"""
+
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import requests
+
+from backend.shards import store_dirs
+from backend.store_versions import current_store_path
+
+WORKER_COUNTS = (1, 2, 4)
+STARTUP_TIMEOUT = 300
+# Shared mode passes if each extra worker costs at most this fraction of a classic worker.
+MAX_SHARED_MARGINAL_RATIO = 0.5
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def descendants(pid):
+    """Returns pid and the PIDs of all its descendant processes."""
+    children = {}
+    for entry in Path("/proc").iterdir():
+        if entry.name.isdigit():
+            try:
+                ppid = int((entry / "stat").read_text().rsplit(")", 1)[1].split()[1])
+            except (OSError, IndexError, ValueError):
+                continue
+            children.setdefault(ppid, []).append(int(entry.name))
+    found, stack = [], [pid]
+    while stack:
+        current = stack.pop()
+        found.append(current)
+        stack.extend(children.get(current, []))
+    return found
+
+def pss_mb(pids):
+    total_kb = 0
+    for pid in pids:
+        try:
+            for line in Path(f"/proc/{pid}/smaps_rollup").read_text().splitlines():
+                if line.startswith("Pss:"):
+                    total_kb += int(line.split()[1])
+        except OSError:
+            pass
+    return total_kb / 1024
+
+def wait_until_ready(url, process):
+    deadline = time.time() + STARTUP_TIMEOUT
+    while time.time() < deadline:
+        if process.poll() is not None:
+            return False
+        try:
+            if requests.get(url, timeout=2).status_code == 200:
+                return True
+        except requests.exceptions.RequestException:
+            pass
+        time.sleep(1)
+    return False
+
+def stop(process):
+    process.send_signal(signal.SIGINT)
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+def measure(workers, shared, server_pid=None):
+    """Starts the API with `workers` workers and returns the total PSS in MB (or None)."""
+    env = dict(os.environ, EMBEDDING_SERVER_ENABLED="1" if shared else "0", INDEX_MMAP="1" if shared else "0")
+    port = free_port()
+    api = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.api:app", "--host", "127.0.0.1",
+         "--port", str(port), "--workers", str(workers)],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        if not wait_until_ready(f"http://127.0.0.1:{port}/readyz", api):
+            return None
+        # The first worker to report ready may be ahead of the others; give them time to finish loading.
+        time.sleep(5 * workers)
+        pids = descendants(api.pid) + ([server_pid] if server_pid else [])
+        return pss_mb(pids)
+    finally:
+        stop(api)
+
+def run_mode(shared):
+    label = "shared (mmap + embedding server)" if shared else "classic (per-worker copies)"
+    print(f"\n🧮 Measuring {label}")
+    print("-" * 50)
+    server = None
+    if shared:
+        server = subprocess.Popen([sys.executable, "-m", "backend.embedding_server"],
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        time.sleep(20)  # Model load.
+    try:
+        totals = {}
+        for workers in WORKER_COUNTS:
+            total = measure(workers, shared, server.pid if server else None)
+            if total is None:
+                print(f"   ❌ API with {workers} worker(s) did not start")
+                return None
+            totals[workers] = total
+            print(f"   {workers} worker(s): {total:8.1f} MB total PSS")
+        return totals
+    finally:
+        if server:
+            stop(server)
+
+def marginal_mb(totals):
+    """Average extra PSS per additional worker."""
+    first, last = WORKER_COUNTS[0], WORKER_COUNTS[-1]
+    return (totals[last] - totals[first]) / (last - first)
+
+def main():
+    print("🧪 MOSDAC AI Bot - Multi-worker Memory Test")
+    print("=" * 60)
+
+    if not Path("/proc/self/smaps_rollup").exists():
+        print("   ❌ This test needs Linux /proc/<pid>/smaps_rollup")
+        return False
+    if not store_dirs(current_store_path()):
+        print("   ❌ Vector store not found. Run: python backend/data_ingestion.py")
+        return False
+
+    classic = run_mode(shared=False)
+    shared = run_mode(shared=True)
+    if classic is None or shared is None:
+        return False
+
+    classic_marginal = marginal_mb(classic)
+    shared_marginal = marginal_mb(shared)
+    print("\n📊 Memory per additional worker")
+    print("=" * 60)
+    print(f"   classic: {classic_marginal:8.1f} MB")
+    print(f"   shared:  {shared_marginal:8.1f} MB")
+
+    passed = shared_marginal <= classic_marginal * MAX_SHARED_MARGINAL_RATIO
+    if passed:
+        print("   ✅ PASS - memory stays nearly flat as workers are added")
+    else:
+        print(f"   ❌ FAIL - shared mode costs more than {MAX_SHARED_MARGINAL_RATIO:.0%} of a classic worker")
+    return passed
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
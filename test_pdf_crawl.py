@@ -0,0 +1,127 @@
+"""
+PDF Crawl Test
+
+Crawls a small local mock of the MOSDAC site (an index page linking to HTML
+pages and PDFs) with MosdacSpider under the asyncio reactor, Scrapy's default
+since 2.13, and checks that every PDF is emitted as an item with its text, both
+with inline extraction (PDF_EXTRACT_WORKERS = 0) and with the worker processes.
+
+Requirements: scrapy and PyMuPDF.
+"""
+
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from scrapy.utils.reactor import install_reactor
+
+# Must be installed before anything imports twisted.internet.reactor.
+install_reactor("twisted.internet.asyncioreactor.AsyncioSelectorReactor")
+
+import fitz  # noqa: E402
+from scrapy import signals  # noqa: E402
+from scrapy.crawler import CrawlerRunner  # noqa: E402
+from scrapy.settings import Settings  # noqa: E402
+from twisted.internet import defer, reactor  # noqa: E402
+
+from backend.config import MOSDAC_SCRAPER_DIR  # noqa: E402
+
+sys.path.insert(0, str(MOSDAC_SCRAPER_DIR))
+from mosdac_scraper.spiders.mosdac_spider import MosdacSpider  # noqa: E402
+
+N_PDFS = 3
+N_PAGES = 3
+
+def make_pdf(i):
+    doc = fitz.open()
+    for p in range(3):
+        doc.new_page().insert_text((36, 36), f"INSAT-3D handbook {i} page {p}", fontsize=9)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+def make_site():
+    site = {}
+    links = [f"/page/{i}" for i in range(N_PAGES)] + [f"/docs/handbook_{i}.pdf" for i in range(N_PDFS)]
+    anchors = "".join(f"<a href='{link}'>{link}</a>" for link in links)
+    site["/"] = ("text/html", f"<html><head><title>MOSDAC</title></head><body><main>{anchors}</main></body></html>".encode())
+    for i in range(N_PAGES):
+        site[f"/page/{i}"] = ("text/html", f"<html><head><title>Page {i}</title></head>"
+                                           f"<body><main><p>Page {i} about SCATSAT-1.</p></main></body></html>".encode())
+    for i in range(N_PDFS):
+        site[f"/docs/handbook_{i}.pdf"] = ("application/pdf", make_pdf(i))
+    return site
+
+def serve(site):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            content_type, body = site.get(self.path, ("text/html", None))
+            if body is None:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+class TestSpider(MosdacSpider):
+    name = "mosdac_test"
+    allowed_domains = ["127.0.0.1"]
+
+@defer.inlineCallbacks
+def crawl(base_url, workers):
+    settings = Settings()
+    settings.setmodule("mosdac_scraper.settings")
+    settings.setdict({
+        "ROBOTSTXT_OBEY": False, "DOWNLOAD_DELAY": 0, "AUTOTHROTTLE_ENABLED": False, "LOG_LEVEL": "ERROR",
+        "PDF_EXTRACT_WORKERS": workers, "CRAWL_OUTPUT_ENABLED": False,
+        "TWISTED_REACTOR": "twisted.internet.asyncioreactor.AsyncioSelectorReactor",
+    }, priority="cmdline")
+    runner = CrawlerRunner(settings)
+    crawler = runner.create_crawler(TestSpider)
+    items = []
+    crawler.signals.connect(lambda item, **_: items.append(dict(item)), signal=signals.item_scraped)
+    yield runner.crawl(crawler, start_urls=[base_url + "/"])
+    return items
+
+@defer.inlineCallbacks
+def run_all(base_url, results):
+    try:
+        for workers in (0, 2):
+            results[workers] = yield crawl(base_url, workers)
+    finally:
+        reactor.stop()
+
+def main():
+    server = serve(make_site())
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    results = {}
+    reactor.callWhenRunning(run_all, base_url, results)
+    reactor.run()
+    server.shutdown()
+
+    print("🧪 PDF Crawl Test (asyncio reactor)")
+    print("=" * 50)
+    ok = True
+    for workers, items in results.items():
+        label = "inline extraction" if workers == 0 else f"{workers} worker processes"
+        pdfs = {item["url"]: item["content"] for item in items if item.get("content_type") == "pdf"}
+        expected = {f"{base_url}/docs/handbook_{i}.pdf": f"handbook {i}" for i in range(N_PDFS)}
+        missing = [url for url, text in expected.items() if text not in pdfs.get(url, "")]
+        if missing:
+            ok = False
+            print(f"❌ {label}: {len(pdfs)} of {N_PDFS} PDF items; missing or empty: {missing}")
+        else:
+            print(f"✅ {label}: all {N_PDFS} PDFs emitted with their text")
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()